@@ -0,0 +1,212 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Plots are only built, never shown
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import f1dataanalysistool.api.data_preprocessing as dp
+import f1dataanalysistool.api.json_handler as json_handler
+from f1dataanalysistool.analysis.analysis_main import run_analysis
+from f1dataanalysistool.enumeration.analysis_functions import AnalysisFunction
+from f1dataanalysistool.enumeration.plot_types import PlotMode, PlotType
+from f1dataanalysistool.visualisation.plot_generator import plot_chart
+from benchmarks.synthetic_data import SCALES, SyntheticData
+
+# Version of the result format, bumped when results are no longer comparable
+FORMAT_VERSION = 1
+
+# Stages of the processing pipeline, timed for every dataset
+PREPROCESSING_STAGES = ["preprocess_data", "convert_to_dataframe", "flatten_to_dataframe", "convert_to_numeric",
+                        "convert_to_ms"]
+
+# Dataset and columns analysed and plotted: lap times per lap and the position of the timing
+ANALYSIS_DATASET = "laps"
+COLUMN_1 = "Timings.time"
+COLUMN_2 = "Timings.position"
+X_COLUMN = "number"
+
+# Run a function repeatedly on fresh input and return its timings in seconds along with the last result
+def measure(function: Callable, make_input: Callable, repeat: int) -> tuple:
+    times, result = [], None
+    for _ in range(repeat):
+        argument = make_input()
+        start = time.perf_counter()
+        result = function(argument)
+        times.append(time.perf_counter() - start)
+    return times, result
+
+# Summarise the timings of a stage
+def summarise(stage: str, dataset: str, variant: Optional[str], rows: int, times: List[float],
+              error: Optional[str] = None) -> Dict[str, Any]:
+    summary = {"stage": stage, "dataset": dataset, "variant": variant, "rows": rows, "times": times,
+               "min": min(times), "median": statistics.median(times), "mean": statistics.mean(times)}
+    if error:
+        summary["error"] = error
+    return summary
+
+# Time the preprocessing stages of a dataset, each stage gets the output of the previous one. Returns the summaries
+# and the cleaned dataframe (numbers and times in milliseconds) used by the analysis and plotting stages.
+def benchmark_preprocessing(dataset: str, responses: List[Dict[str, Any]], repeat: int) -> tuple:
+    inner_key_path = json_handler.get_inner_key_path(responses[0], dataset)
+    inner_data = [entry for response in responses for entry in json_handler.get_inner_data(response, inner_key_path)]
+
+    summaries = []
+    stages = {
+        "preprocess_data": (dp.preprocess_data, lambda: inner_data),
+        "convert_to_dataframe": (dp.convert_to_dataframe, lambda: preprocessed),
+        "flatten_to_dataframe": (lambda data: dp.flatten_to_dataframe(data, dataset), lambda: inner_data),
+        "convert_to_numeric": (dp.convert_to_numeric, lambda: df.copy()),
+        "convert_to_ms": (dp.convert_to_ms, lambda: numeric.copy()),
+    }
+    preprocessed = df = numeric = None
+    for stage in PREPROCESSING_STAGES:
+        function, make_input = stages[stage]
+        times, result = measure(function, make_input, repeat)
+        if stage == "preprocess_data":
+            preprocessed = result
+        elif stage == "flatten_to_dataframe":
+            df = result
+        elif stage == "convert_to_numeric":
+            numeric = result
+        summaries.append(summarise(stage, dataset, None, len(result), times))
+    return summaries, result
+
+# Time run_analysis for every analysis function
+def benchmark_analysis(df: pd.DataFrame, repeat: int) -> List[Dict[str, Any]]:
+    summaries = []
+    for function in AnalysisFunction:
+        label = function.value["label"]
+        times, result = measure(lambda data: run_analysis(data, label, COLUMN_1, COLUMN_2, None), lambda: df, repeat)
+        summaries.append(summarise("run_analysis", ANALYSIS_DATASET, function.name, len(df), times,
+                                   result.get("error") if isinstance(result, dict) else None))
+    return summaries
+
+# Time plot_chart for every plot type in every mode, figures are closed so they do not accumulate
+def benchmark_plots(df: pd.DataFrame, repeat: int) -> List[Dict[str, Any]]:
+    summaries = []
+    numeric = df.select_dtypes(include=np.number)
+    for mode in PlotMode:
+        for plot_type in PlotType:
+            # The heatmap shows the correlation of all columns, only numeric columns can be correlated
+            data = numeric if plot_type == PlotType.HEATMAP else df
+            y_column = None if plot_type in [PlotType.HIST, PlotType.PIE] else COLUMN_1
+
+            def plot(data: pd.DataFrame) -> Optional[str]:
+                try:
+                    plot_chart(data, X_COLUMN if plot_type != PlotType.HIST else COLUMN_1, y_column,
+                               title="Benchmark", plot_type=(mode.value, plot_type.value))
+                    return None
+                except Exception as e:
+                    return str(e)
+                finally:
+                    plt.close("all")
+
+            times, error = measure(plot, lambda: data, repeat)
+            summaries.append(summarise("plot_chart", ANALYSIS_DATASET, f"{mode.value}_{plot_type.value}", len(data),
+                                       times, error))
+    return summaries
+
+# Returns the commit the benchmarks ran on, None outside a git checkout
+def get_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=Path(__file__).resolve().parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Run the benchmarks and return the results in the result format (see FORMAT_VERSION)
+def run(seasons: int, rounds: int, repeat: int = 3, analysis_rows: int = 10_000, seed: int = 0,
+        stages: Optional[List[str]] = None) -> Dict[str, Any]:
+    stages = stages or ["preprocessing", "analysis", "plots"]
+    start = time.perf_counter()
+    data = SyntheticData(seasons, rounds, seed=seed).generate()
+    generation_time = time.perf_counter() - start
+
+    results, cleaned = [], {}
+    for dataset, responses in data.items():
+        if "preprocessing" in stages or dataset == ANALYSIS_DATASET:
+            summaries, cleaned[dataset] = benchmark_preprocessing(dataset, responses, repeat)
+            results.extend(summaries if "preprocessing" in stages else [])
+
+    # Analysis and plots run on at most analysis_rows rows, like a selection in the application
+    df = cleaned[ANALYSIS_DATASET].head(analysis_rows)
+    if "analysis" in stages:
+        results.extend(benchmark_analysis(df, repeat))
+    if "plots" in stages:
+        results.extend(benchmark_plots(df, repeat))
+
+    return {
+        "version": FORMAT_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": {"commit": get_commit(), "python": platform.python_version(), "platform": platform.platform(),
+                        "pandas": pd.__version__, "numpy": np.__version__},
+        "config": {"seasons": seasons, "rounds": rounds, "repeat": repeat, "analysis_rows": analysis_rows,
+                   "seed": seed, "generation_time": generation_time},
+        "results": results,
+    }
+
+# Compare results with a baseline, returns the stages whose minimum time grew by more than the threshold (a fraction)
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    baseline_times = {(entry["stage"], entry["dataset"], entry["variant"]): entry["min"] for entry in baseline["results"]}
+    regressions = []
+    for entry in results["results"]:
+        key = (entry["stage"], entry["dataset"], entry["variant"])
+        if key in baseline_times and entry["min"] > baseline_times[key] * (1 + threshold):
+            regressions.append({"stage": entry["stage"], "dataset": entry["dataset"], "variant": entry["variant"],
+                                "baseline": baseline_times[key], "current": entry["min"],
+                                "change": entry["min"] / baseline_times[key] - 1})
+    return regressions
+
+# Command line entry point: python -m benchmarks.run_benchmarks --scale season --output results.json
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the processing pipeline on synthetic data")
+    parser.add_argument("--scale", choices=SCALES, default="season", help="Amount of generated data")
+    parser.add_argument("--seasons", type=int, help="Number of seasons, overrides the scale")
+    parser.add_argument("--rounds", type=int, help="Number of rounds per season, overrides the scale")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage, the minimum is compared")
+    parser.add_argument("--analysis-rows", type=int, default=10_000, help="Rows analysed and plotted")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", nargs="+", choices=["preprocessing", "analysis", "plots"], help="Stages to run")
+    parser.add_argument("--output", type=Path, help="File the results are written to (default: standard output)")
+    parser.add_argument("--baseline", type=Path, help="Results to compare with, regressions fail the run")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown relative to the baseline")
+    args = parser.parse_args(argv)
+
+    # Keep the per call logging of the pipeline and convergence warnings of the models out of the timings and the output
+    logging.getLogger().setLevel(logging.ERROR)
+    warnings.simplefilter("ignore")
+
+    seasons, rounds = SCALES[args.scale]
+    results = run(min(args.seasons or seasons, 70), args.rounds or rounds, args.repeat, args.analysis_rows, args.seed,
+                  args.stages)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression['stage']} {regression['dataset']} {regression['variant'] or ''} "
+                  f"{regression['baseline']:.4f}s -> {regression['current']:.4f}s ({regression['change']:+.0%})",
+                  file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+import random
+from typing import Any, Dict, List
+
+# Scales of generated data: number of seasons and rounds per season
+SCALES = {
+    "race": (1, 1),
+    "season": (1, 22),
+    "decade": (10, 22),
+    "all": (70, 22),
+}
+
+# Shape of a generated race
+DRIVERS = 20
+LAPS = 57
+STOPS = 2
+FIRST_SEASON = 1955
+
+STATUSES = ["Finished", "+1 Lap", "+2 Laps", "Engine", "Collision", "Gearbox", "Retired"]
+
+# Format milliseconds like the API, e.g. 1:32.456 (lap times) or 1:32:15.456 (race times)
+def format_time(ms: int) -> str:
+    hours, ms = divmod(ms, 3_600_000)
+    minutes, ms = divmod(ms, 60_000)
+    seconds = f"{ms / 1000:06.3f}"
+    return f"{hours}:{minutes:02d}:{seconds}" if hours else f"{minutes}:{seconds}"
+
+class SyntheticData:
+    """
+    Generates responses in the format of the Jolpica API with realistic values, sizes and nesting, so the processing
+    pipeline can be benchmarked without the API. The same seed always generates the same data.
+
+    :param seasons: Number of seasons (at most 70)
+    :param rounds: Number of rounds per season
+    :param drivers: Number of drivers per race
+    :param laps: Number of laps per race
+    :param seed: Seed of the random generator
+    """
+
+    def __init__(self, seasons: int = 1, rounds: int = 22, drivers: int = DRIVERS, laps: int = LAPS, seed: int = 0):
+        self.seasons = seasons
+        self.rounds = rounds
+        self.drivers = drivers
+        self.laps = laps
+        self.seed = seed
+        self.random = random.Random(seed)
+
+    # Drivers and constructors of a season, two drivers per constructor
+    def get_entrants(self, season: int) -> List[Dict[str, Any]]:
+        return [{
+            "Driver": {"driverId": f"driver_{season}_{number}", "permanentNumber": str(number), "code": f"D{number:02d}",
+                       "url": f"http://en.wikipedia.org/wiki/Driver_{number}", "givenName": f"Given{number}",
+                       "familyName": f"Family{number}", "dateOfBirth": f"{season - 25}-0{1 + number % 9}-1{number % 10}",
+                       "nationality": "British"},
+            "Constructor": {"constructorId": f"constructor_{number // 2}", "url": "http://en.wikipedia.org/wiki/Team",
+                            "name": f"Team {number // 2}", "nationality": "Italian"},
+            "number": str(number),
+        } for number in range(1, self.drivers + 1)]
+
+    # Race entry without results, as in every response of the race table
+    def get_race(self, season: int, round_number: int) -> Dict[str, Any]:
+        return {
+            "season": str(season), "round": str(round_number), "url": f"http://en.wikipedia.org/wiki/{season}_{round_number}",
+            "raceName": f"Grand Prix {round_number}",
+            "Circuit": {"circuitId": f"circuit_{round_number}", "url": "http://en.wikipedia.org/wiki/Circuit",
+                        "circuitName": f"Circuit {round_number}",
+                        "Location": {"lat": f"{self.random.uniform(-60, 60):.4f}",
+                                     "long": f"{self.random.uniform(-180, 180):.4f}",
+                                     "locality": f"City {round_number}", "country": "Country"}},
+            "date": f"{season}-{3 + round_number // 3:02d}-{1 + round_number % 28:02d}", "time": "14:00:00Z",
+        }
+
+    # Response in the format of the API holding the given races
+    @staticmethod
+    def get_response(season: int, races: List[Dict[str, Any]], total: int, round_number: int = None) -> Dict[str, Any]:
+        table = {"season": str(season), **({"round": str(round_number)} if round_number else {}), "Races": races}
+        return {"MRData": {"xmlns": "", "series": "f1", "url": "http://api.jolpi.ca/ergast/f1/", "limit": str(total),
+                           "offset": "0", "total": str(total), "RaceTable": table}}
+
+    # Results of a race, finishing order and times drawn at random
+    def get_results(self, season: int) -> List[Dict[str, Any]]:
+        entrants = self.get_entrants(season)
+        self.random.shuffle(entrants)
+        winner_ms = self.random.randint(5_200_000, 6_000_000)
+        results = []
+        for position, entrant in enumerate(entrants, start=1):
+            status = "Finished" if position <= self.drivers * 0.7 else self.random.choice(STATUSES[1:])
+            result = {**entrant, "position": str(position), "positionText": str(position),
+                      "points": str(max(0, 26 - position * 2) if position <= 10 else 0),
+                      "grid": str(self.random.randint(1, self.drivers)), "laps": str(self.laps), "status": status}
+            if status == "Finished":
+                gap = self.random.randint(0, 90_000) * (position - 1)
+                result["Time"] = {"millis": str(winner_ms + gap),
+                                  "time": format_time(winner_ms) if position == 1 else f"+{gap / 1000:.3f}"}
+            lap_ms = self.random.randint(80_000, 100_000)
+            result["FastestLap"] = {"rank": str(position), "lap": str(self.random.randint(1, self.laps)),
+                                    "Time": {"time": format_time(lap_ms)},
+                                    "AverageSpeed": {"units": "kph", "speed": f"{5_300_000 / lap_ms * 3.6:.3f}"}}
+            results.append(result)
+        return results
+
+    # Results of every season, one response per season like the results of a season requested from the API
+    def generate_results(self) -> List[Dict[str, Any]]:
+        responses = []
+        for season in range(FIRST_SEASON, FIRST_SEASON + self.seasons):
+            races = [{**self.get_race(season, round_number), "Results": self.get_results(season)}
+                     for round_number in range(1, self.rounds + 1)]
+            responses.append(self.get_response(season, races, self.drivers * self.rounds))
+        return responses
+
+    # Laps of every race, one response per race
+    def generate_laps(self) -> List[Dict[str, Any]]:
+        responses = []
+        for season in range(FIRST_SEASON, FIRST_SEASON + self.seasons):
+            for round_number in range(1, self.rounds + 1):
+                driver_ids = [entrant["Driver"]["driverId"] for entrant in self.get_entrants(season)]
+                pace = {driver_id: self.random.randint(80_000, 95_000) for driver_id in driver_ids}
+                laps = []
+                for number in range(1, self.laps + 1):
+                    times = {driver_id: pace[driver_id] + self.random.randint(0, 3_000) for driver_id in driver_ids}
+                    order = sorted(driver_ids, key=times.get)
+                    laps.append({"number": str(number), "Timings": [
+                        {"driverId": driver_id, "position": str(position), "time": format_time(times[driver_id])}
+                        for position, driver_id in enumerate(order, start=1)]})
+                race = {**self.get_race(season, round_number), "Laps": laps}
+                responses.append(self.get_response(season, [race], self.laps * self.drivers, round_number))
+        return responses
+
+    # Pit stops of every race, one response per race
+    def generate_pit_stops(self) -> List[Dict[str, Any]]:
+        responses = []
+        for season in range(FIRST_SEASON, FIRST_SEASON + self.seasons):
+            for round_number in range(1, self.rounds + 1):
+                stops = []
+                for entrant in self.get_entrants(season):
+                    for stop in range(1, STOPS + 1):
+                        lap = self.random.randint(stop * self.laps // (STOPS + 1) - 5, stop * self.laps // (STOPS + 1) + 5)
+                        stops.append({"driverId": entrant["Driver"]["driverId"], "lap": str(max(1, lap)),
+                                      "stop": str(stop), "time": f"14:{lap % 60:02d}:{self.random.randint(0, 59):02d}",
+                                      "duration": f"{self.random.uniform(19, 32):.3f}"})
+                stops.sort(key=lambda entry: int(entry["lap"]))
+                race = {**self.get_race(season, round_number), "PitStops": stops}
+                responses.append(self.get_response(season, [race], len(stops), round_number))
+        return responses
+
+    # Responses of every dataset by resource type
+    def generate(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {"results": self.generate_results(), "laps": self.generate_laps(), "pitstops": self.generate_pit_stops()}
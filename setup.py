@@ -5,4 +5,9 @@ setup(
     version="0.1.0",
     package_dir={"": "src"},
     packages=find_packages(where="src"),
+    entry_points={
+        "console_scripts": ["f1-warehouse=f1dataanalysistool.api.warehouse:main",
+                            "f1-import-dump=f1dataanalysistool.api.ergast_import:main",
+                            "f1-standin-server=f1dataanalysistool.api.standin_server:main"],
+    },
 )
\ No newline at end of file
@@ -1,6 +1,18 @@
+import time
+import f1dataanalysistool.api.metrics as metrics
 from f1dataanalysistool.enumeration.analysis_functions import AnalysisFunction
 
 def run_analysis(df, analysis_type, column_1, column_2, additional_param):
+    # Time every analysis, failed analyses return an error rather than raising. Unknown analysis types share a label
+    # so arbitrary input cannot grow the metrics.
+    start = time.perf_counter()
+    result = _run_analysis(df, analysis_type, column_1, column_2, additional_param)
+    function = analysis_type if analysis_type in AnalysisFunction.get_all_functions() else "unknown"
+    metrics.ANALYSIS_SECONDS.observe(time.perf_counter() - start, function=function,
+                                     outcome="error" if "error" in result else "success")
+    return result
+
+def _run_analysis(df, analysis_type, column_1, column_2, additional_param):
     try:
         # Get the corresponding analysis function using the analysis_type
         analysis_func = AnalysisFunction.get_function(analysis_type)
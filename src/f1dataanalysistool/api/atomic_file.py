@@ -0,0 +1,43 @@
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+# Suffix of files being written, readers and the cache index ignore them
+TEMP_SUFFIX = ".tmp"
+
+# Returns the temporary path a file is written to before it replaces the file, unique per process and thread
+def get_temp_path(file_path: Path) -> Path:
+    return file_path.with_name(f".{file_path.name}.{os.getpid()}.{threading.get_ident()}{TEMP_SUFFIX}")
+
+# Flush a file (or directory entry) to disk
+def fsync(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass  # Directories cannot be synced on every platform
+    finally:
+        os.close(fd)
+
+# Yields a temporary path to write the file to. Once the block completes the temporary file is synced to disk and
+# renamed over the file in a single step, so readers see either the previous or the new file and never a partial one.
+# The temporary file is removed if writing fails.
+@contextmanager
+def atomic_path(file_path: Path) -> Iterator[Path]:
+    file_path = Path(file_path)
+    temp_path = get_temp_path(file_path)
+    try:
+        yield temp_path
+        fsync(temp_path)
+        os.replace(temp_path, file_path)
+        fsync(file_path.parent)
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+# Write bytes to a file atomically
+def write_atomic(file_path: Path, data: bytes) -> None:
+    with atomic_path(file_path) as temp_path:
+        with open(temp_path, "wb") as f:
+            f.write(data)
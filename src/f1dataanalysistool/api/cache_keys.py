@@ -0,0 +1,157 @@
+import logging
+import re
+from typing import Any, Dict, Optional, Tuple
+import f1dataanalysistool.api.cache_manager as cache_manager
+from f1dataanalysistool.api.atomic_file import write_atomic
+from f1dataanalysistool.api.file_lock import FileLock
+from f1dataanalysistool.enumeration.resource_types import ResourceType
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Request parameters selecting a page rather than the data, these are not part of the key of a request
+PAGINATION_PARAMS = ["limit", "offset"]
+
+# Version of the key format, cache files are migrated once when it changes (see ensure_migrated)
+KEY_VERSION = "1"
+_migrated = False
+
+# Names of stored files: request key, kind of file (complete data, page or cleaned data) and codec suffix
+FILE_NAME_PATTERN = re.compile(r"^(?P<base>.+?)_(?P<kind>all\.json|\d+_\d+\.json|cleaned\.\w+)"
+                               r"(?P<codec>" + "|".join(re.escape(suffix) for suffix, _, _ in cache_manager.CODECS.values() if suffix) + r")?$")
+
+# Normalise the casing and spacing of a resource type (e.g. "driverStandings" and "driver standings")
+def normalise_resource_type(resource_type: str) -> str:
+    return resource_type.replace(" ", "").lower()
+
+# Normalise a filter or parameter value, identifiers are lower case and numbers lose their padding (e.g. "05")
+def normalise_value(value: Any) -> str:
+    value = str(value).strip().lower()
+    return str(int(value)) if value.isdigit() else value
+
+# Returns the parameters that are not used for pagination
+def get_query_params(params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {key: value for key, value in (params or {}).items() if key not in PAGINATION_PARAMS}
+
+# Returns the key of a request, identical for all requests of the same data. The layout follows the endpoint (season
+# and round first, then the other filters, the resource type and the position) with the other filters sorted, values
+# normalised and parameters other than pagination appended.
+def canonical_key(resource_type: str, filters: Optional[Dict[str, Any]] = None,
+                  params: Optional[Dict[str, Any]] = None) -> str:
+    filters = {key: normalise_value(value) for key, value in (filters or {}).items() if value}
+    parts = []
+
+    # Add season and round first if present, a round is only part of the endpoint with a season
+    season = filters.pop("season", None)
+    round_number = filters.pop("round", None)
+    if season:
+        parts.append(season)
+        if round_number:
+            parts.append(round_number)
+
+    # Add the other filters in a fixed order, then the resource type and the position
+    position = filters.pop("position", None)
+    for key in sorted(filters):
+        parts.extend([key, filters[key]])
+    parts.append(normalise_resource_type(resource_type))
+    if position:
+        parts.append(position)
+
+    query_params = get_query_params(params)
+    for key in sorted(query_params):
+        if query_params[key] is not None:
+            parts.append(f"{key}-{normalise_value(query_params[key])}")
+    return "_".join(parts)
+
+# Parse a request key (canonical or built from the endpoint before keys were canonical), returns the resource type and
+# filters or None if the key is ambiguous. Filter values may contain underscores, so a value runs until the next filter
+# key.
+def parse_key(key: str) -> Optional[Tuple[str, Dict[str, str]]]:
+    resource_types = {member.name.lower() for member in ResourceType}
+    filter_keys = set(ResourceType.get_all_filters())
+    parts = key.split("_")
+    filters = {}
+
+    if len(parts) > 1 and parts[-1].isdigit():
+        filters["position"] = parts.pop()
+    resource_type = parts.pop() if parts else ""
+    if normalise_resource_type(resource_type) not in resource_types:
+        return None
+
+    # Season and round are the leading values that are not filter keys
+    for key in ["season", "round"]:
+        if parts and parts[0] not in filter_keys:
+            filters[key] = parts.pop(0)
+
+    while parts:
+        key = parts.pop(0)
+        if key not in filter_keys or key in filters:
+            return None
+        value = []
+        while parts and parts[0] not in filter_keys:
+            value.append(parts.pop(0))
+        if not value:
+            return None
+        filters[key] = "_".join(value)
+
+    return resource_type, filters
+
+# Build the file name of a request the way it was built from the endpoint before keys were canonical
+def get_legacy_key(resource_type: str, filters: Dict[str, str]) -> str:
+    filters = filters.copy()
+    parts = [filters.pop(key) for key in ["season", "round"] if key in filters]
+    position = filters.pop("position", None)
+    for key, value in filters.items():
+        parts.extend([key, value])
+    parts.append(resource_type)
+    if position:
+        parts.append(position)
+    return "_".join(parts)
+
+# Rename stored files to the canonical key of their request. Files of the same request stored under different keys
+# are deduplicated, keeping the most recently written one. Returns the number of files renamed and removed.
+def migrate_cache_keys() -> Dict[str, int]:
+    renamed = removed = 0
+    for directory in cache_manager.MANAGED_DIRS:
+        for stored_path in sorted(directory.glob("*")) if directory.exists() else []:
+            match = FILE_NAME_PATTERN.match(stored_path.name)
+            if match is None or stored_path.name.startswith("."):
+                continue
+
+            # Only rename files whose name can be parsed back into the same request
+            request = parse_key(match["base"])
+            if request is None or get_legacy_key(*request) != match["base"]:
+                continue
+            key = canonical_key(*request)
+            if key == match["base"] or not stored_path.exists():
+                continue
+
+            # Keep the most recent copy if the request is already stored under its canonical key
+            file_path = cache_manager.get_file_path(stored_path)
+            target_path = stored_path.with_name(f"{key}_{match['kind']}")
+            stored_target_path = cache_manager.get_stored_path(target_path)
+            if stored_target_path.exists():
+                removed += 1
+                if stored_target_path.stat().st_mtime >= stored_path.stat().st_mtime:
+                    cache_manager.remove_cache(file_path)
+                    continue
+                cache_manager.remove_cache(target_path)
+
+            cache_manager.move_cache(stored_path, target_path.with_name(target_path.name + (match["codec"] or "")))
+            renamed += 1
+
+    if renamed or removed:
+        logging.info(f"Migrated cache keys: renamed {renamed} files and removed {removed} duplicates")
+    return {"renamed": renamed, "removed": removed}
+
+# Migrate the stored files once per data directory and process, other workers wait for a migration in progress
+def ensure_migrated() -> None:
+    global _migrated
+    if _migrated:
+        return
+    version_file = cache_manager.DATA_DIR / "cache_keys.version"
+    with FileLock(cache_manager.DATA_DIR / "locks/cache_keys.lock"):
+        if not version_file.exists() or version_file.read_text().strip() != KEY_VERSION:
+            migrate_cache_keys()
+            write_atomic(version_file, KEY_VERSION.encode())
+    _migrated = True
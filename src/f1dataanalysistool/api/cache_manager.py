@@ -1,23 +1,456 @@
+import gzip
 import json
 import logging
-from typing import Dict, Any
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Any, BinaryIO, Iterator, List, Optional
 from pathlib import Path
+from f1dataanalysistool.api.atomic_file import TEMP_SUFFIX, write_atomic
+from f1dataanalysistool.api.file_lock import FileLock
+
+# Optional faster JSON parser, the standard library is used when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional zstd compression, gzip is used when it is not installed
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Cache data function (does not check if cache folder is present)
-def cache_data(file_path: Path, data: Dict[str, Any]) -> None:
-    with open(file_path, "w") as f:
-        json.dump(data, f)
-    logging.info(f"Data cached to {file_path} successfully.")
+# Define the data directory, the directories managed by the cache index and the index file
+DATA_DIR = Path(__file__).resolve().parent.parent.parent / "data"
+MANAGED_DIRS = [DATA_DIR / "cache", DATA_DIR / "cleaned"]
+INDEX_FILE = DATA_DIR / "cache_index.json"
+INDEX_LOCK_FILE = DATA_DIR / "locks/cache_index.lock"
+ENTRY_LOCKS_DIR = DATA_DIR / "locks/entries"
+
+# Temporary files older than STALE_TEMP_AGE seconds were left behind by a crashed writer and are removed on eviction
+STALE_TEMP_AGE = 60 * 60
+
+# TTL classes: immutable entries (completed seasons) never expire, volatile entries expire after VOLATILE_TTL seconds
+TTL_IMMUTABLE = "immutable"
+TTL_VOLATILE = "volatile"
+VOLATILE_TTL = int(os.environ.get("F1_CACHE_VOLATILE_TTL", 6 * 60 * 60))
+
+# Disk budget in bytes for all managed directories
+MAX_CACHE_SIZE = int(os.environ.get("F1_CACHE_MAX_BYTES", 1024 ** 3))
+
+# Access times are buffered in memory and written to the index at most every ACCESS_FLUSH_INTERVAL seconds
+ACCESS_FLUSH_INTERVAL = 30
+_pending_access: Dict[str, float] = {}
+_last_flush = time.time()
+_access_lock = threading.Lock()
+
+# Parsed index of the last lookup and the identity of the index file it was read from (see _read_index)
+_index_cache: Optional[tuple] = None
+_index_cache_lock = threading.Lock()
+
+# Whether this process has reconciled the index with the files on disk (see _reconcile)
+_reconciled = False
+
+# Cache codecs: suffix appended to the cache file name, compression and decompression functions
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+CODECS = {
+    "json": ("", lambda raw: raw, lambda raw: raw),
+    "gzip": (".gz", lambda raw: gzip.compress(raw, compresslevel=GZIP_LEVEL), gzip.decompress),
+}
+if zstandard is not None:
+    CODECS["zstd"] = (".zst", lambda raw: zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw),
+                      lambda raw: zstandard.ZstdDecompressor().decompress(raw))
+
+# Decompressing readers of each codec wrapping an open binary file, used to stream cache files
+STREAM_READERS = {
+    "json": lambda f: f,
+    "gzip": lambda f: gzip.GzipFile(fileobj=f, mode="rb"),
+}
+if zstandard is not None:
+    STREAM_READERS["zstd"] = lambda f: zstandard.ZstdDecompressor().stream_reader(f)
+
+# Errors raised while reading a stream of a cache file, e.g. by truncated or invalid compressed data
+STREAM_ERRORS = (OSError, EOFError, zlib.error) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+# Codec used for new cache files, existing files are read with the codec matching their suffix
+CODEC = os.environ.get("F1_CACHE_CODEC", "zstd" if zstandard is not None else "gzip")
+if CODEC not in CODECS:
+    logging.warning(f"Cache codec {CODEC} is not available, using gzip instead.")
+    CODEC = "gzip"
+
+class CacheCorruptError(Exception):
+    """
+    Raised when a cache file cannot be read back (checksum mismatch, truncated or invalid data). The entry is removed
+    before raising so that the data can be fetched again.
+
+    :param file_path: Path of the cache file
+    :param reason: Why the file is considered corrupt
+    """
 
-# Load data function (does not check if cache file is present)
+    def __init__(self, file_path: Path, reason: str):
+        super().__init__(f"Cache file {file_path} is corrupt: {reason}")
+        self.file_path = file_path
+        self.reason = reason
+
+# Serialise data to JSON bytes
+def dumps(data: Dict[str, Any]) -> bytes:
+    return orjson.dumps(data) if orjson is not None else json.dumps(data).encode()
+
+# Parse JSON bytes
+def loads(raw: bytes) -> Dict[str, Any]:
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+# Returns the codec of a stored cache file from its suffix
+def get_codec(stored_path: Path) -> str:
+    for name, (suffix, _, _) in CODECS.items():
+        if suffix and stored_path.name.endswith(suffix):
+            return name
+    return "json"
+
+# Returns the stored file of a cache file (which may carry a codec suffix), or the path itself if nothing is stored
+def get_stored_path(file_path: Path) -> Path:
+    for name in [CODEC] + [name for name in CODECS if name != CODEC]:
+        stored_path = file_path.with_name(file_path.name + CODECS[name][0])
+        if stored_path.exists():
+            return stored_path
+    return file_path
+
+# Returns the cache file of a stored file, removing its codec suffix
+def get_file_path(stored_path: Path) -> Path:
+    suffix = CODECS[get_codec(stored_path)][0]
+    return stored_path.with_name(stored_path.name[:-len(suffix)]) if suffix else stored_path
+
+# Lock of a cache entry, shared by all codec variants of the file. Writers hold it exclusively while replacing the file
+# and updating its index entry, readers hold it shared while reading so the file matches its indexed checksum.
+def lock_entry(file_path: Path, shared: bool = False) -> FileLock:
+    file_path = Path(file_path)
+    return FileLock(ENTRY_LOCKS_DIR / f"{file_path.parent.name}_{file_path.name}.lock", shared=shared)
+
+# Returns the checksum of stored bytes
+def get_checksum(raw: bytes, value: int = 0) -> str:
+    return f"{zlib.crc32(raw, value):08x}"
+
+# Returns the checksum recorded in the index for a stored file, None if it is not indexed or has no checksum
+def _get_indexed_checksum(stored_path: Path) -> Optional[str]:
+    entry = _read_index().get(_get_key(stored_path))
+    return entry.get("checksum") if entry is not None else None
+
+# Cache data function (does not check if cache folder is present). The file is replaced atomically while holding the
+# exclusive lock of the entry, so readers see either the previous or the new data together with its checksum.
+def cache_data(file_path: Path, data: Dict[str, Any], ttl_class: str = TTL_VOLATILE) -> None:
+    suffix, compress, _ = CODECS[CODEC]
+    stored_path = file_path.with_name(file_path.name + suffix)
+    raw = dumps(data)
+    compressed = compress(raw)
+    with lock_entry(file_path):
+        write_atomic(stored_path, compressed)
+
+        # Remove copies stored with other codecs so only the latest data remains
+        for other_suffix, _, _ in CODECS.values():
+            if other_suffix != suffix:
+                file_path.with_name(file_path.name + other_suffix).unlink(missing_ok=True)
+
+        update_index(stored_path, ttl_class, raw_size=len(raw), checksum=get_checksum(compressed))
+    logging.info(f"Data cached to {stored_path} successfully.")
+
+# Load data function (does not check if cache file is present), plain .json files are read transparently. Raises
+# CacheCorruptError (after removing the entry) if the file does not match its checksum or cannot be parsed.
 def load_cache(file_path: Path) -> Dict[str, Any]:
-    with file_path.open("r") as f:
-        logging.info(f"Data loaded from {file_path} successfully.")
-        return json.load(f)
+    with lock_entry(file_path, shared=True):
+        stored_path = get_stored_path(file_path)
+        _, _, decompress = CODECS[get_codec(stored_path)]
+        try:
+            with stored_path.open("rb") as f:
+                stored = f.read()
+            checksum = _get_indexed_checksum(stored_path)
+            if checksum is not None and checksum != get_checksum(stored):
+                raise ValueError("checksum mismatch")
+            data = loads(decompress(stored))
+            reason = None
+        except Exception as e:
+            reason = str(e) or type(e).__name__
+
+    # The entry lock is released before removing the entry, which takes it exclusively
+    if reason is not None:
+        logging.warning(f"Removing corrupt cache file {stored_path}: {reason}")
+        remove_cache(file_path)
+        raise CacheCorruptError(stored_path, reason)
+
+    logging.info(f"Data loaded from {stored_path} successfully.")
+    touch(stored_path)
+    return data
+
+# Verify the checksum of an open stored file without loading it into memory, leaves the file at its start
+def _verify_stream(stored_path: Path, f: BinaryIO) -> Optional[str]:
+    checksum = _get_indexed_checksum(stored_path)
+    if checksum is None:
+        return None
+    value = 0
+    for chunk in iter(lambda: f.read(1024 ** 2), b""):
+        value = zlib.crc32(chunk, value)
+    f.seek(0)
+    return "checksum mismatch" if get_checksum(b"", value) != checksum else None
+
+# Open a cache file for reading its decompressed JSON incrementally (does not check if cache file is present). The
+# checksum is verified before the stream is handed out, a corrupt entry is removed and CacheCorruptError is raised.
+@contextmanager
+def open_cache(file_path: Path) -> Iterator[BinaryIO]:
+    with lock_entry(file_path, shared=True):
+        stored_path = get_stored_path(file_path)
+        with stored_path.open("rb") as f:
+            reason = _verify_stream(stored_path, f)
+            if reason is None:
+                stream = STREAM_READERS[get_codec(stored_path)](f)
+                try:
+                    yield stream
+                finally:
+                    stream.close()
+
+    if reason is not None:
+        logging.warning(f"Removing corrupt cache file {stored_path}: {reason}")
+        remove_cache(file_path)
+        raise CacheCorruptError(stored_path, reason)
+    touch(stored_path)
+
+# Checks if cache file is in the cache directory, expired entries are only reported when include_expired is set
+def is_cached(file_path: Path, include_expired: bool = False) -> bool:
+    stored_path = get_stored_path(file_path)
+    return stored_path.exists() and (include_expired or not is_expired(stored_path))
+
+# Returns the uncompressed size in bytes of a cache file, falling back to its stored size if it is not indexed
+def get_raw_size(file_path: Path) -> int:
+    stored_path = get_stored_path(file_path)
+    entry = _read_index().get(_get_key(stored_path))
+    if entry is not None:
+        return entry.get("raw_size", entry["size"])
+    return stored_path.stat().st_size if stored_path.exists() else 0
+
+# Removes a cache file if it is present
+def remove_cache(file_path: Path) -> None:
+    stored_paths = [file_path.with_name(file_path.name + suffix) for suffix, _, _ in CODECS.values()]
+    with lock_entry(file_path):
+        for stored_path in stored_paths:
+            stored_path.unlink(missing_ok=True)
+    with FileLock(INDEX_LOCK_FILE):
+        index = _load_index()
+        if any([index.pop(_get_key(stored_path), None) is not None for stored_path in stored_paths]):
+            _save_index(index)
+
+# Move a stored file to a new name together with its index entry (e.g. when the key of its request changes)
+def move_cache(stored_path: Path, new_stored_path: Path) -> None:
+    with lock_entry(get_file_path(stored_path)), lock_entry(get_file_path(new_stored_path)):
+        os.replace(stored_path, new_stored_path)
+    with FileLock(INDEX_LOCK_FILE):
+        index = _load_index()
+        entry = index.pop(_get_key(stored_path), None)
+        if entry is not None:
+            index[_get_key(new_stored_path)] = entry
+            _save_index(index)
+
+# Index key of a file, relative to the data directory where possible
+def _get_key(file_path: Path) -> str:
+    file_path = Path(file_path).resolve()
+    try:
+        return file_path.relative_to(DATA_DIR).as_posix()
+    except ValueError:
+        return str(file_path)
+
+# Path of an index key
+def _get_path(key: str) -> Path:
+    path = Path(key)
+    return path if path.is_absolute() else DATA_DIR / path
+
+# Load the index, an unreadable index is rebuilt from the files on disk when it is reconciled
+def _load_index() -> Dict[str, Dict[str, Any]]:
+    try:
+        return json.loads(INDEX_FILE.read_text())
+    except (OSError, ValueError):
+        return {}
+
+# Returns the index for lookups, parsed again only when the index file changed (every save replaces it, changing its
+# inode and modification time). The returned index is shared and must not be modified, updates use _load_index.
+def _read_index() -> Dict[str, Dict[str, Any]]:
+    global _index_cache
+    try:
+        stat = INDEX_FILE.stat()
+    except OSError:
+        return {}
+    identity = (str(INDEX_FILE), stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    with _index_cache_lock:
+        if _index_cache is not None and _index_cache[0] == identity:
+            return _index_cache[1]
+    index = _load_index()
+    with _index_cache_lock:
+        _index_cache = (identity, index)
+    return index
+
+# Save the index by replacing the previous file so readers never see a partial index
+def _save_index(index: Dict[str, Dict[str, Any]]) -> None:
+    write_atomic(INDEX_FILE, json.dumps(index).encode())
+
+# Apply the buffered access times to the index
+def _apply_pending_access(index: Dict[str, Dict[str, Any]]) -> None:
+    global _last_flush
+    with _access_lock:
+        pending = dict(_pending_access)
+        _pending_access.clear()
+        _last_flush = time.time()
+    for key, accessed in pending.items():
+        if key in index:
+            index[key]["last_accessed"] = max(index[key]["last_accessed"], accessed)
+
+# Record the metadata of a written file and enforce the disk budget, raw_size is the uncompressed size if compressed
+# and checksum the checksum of the stored bytes, verified when the file is loaded. The files on disk are only
+# reconciled with the index on the first write of the process and when the indexed entries exceed the budget.
+def update_index(file_path: Path, ttl_class: str = TTL_VOLATILE, raw_size: Optional[int] = None,
+                 checksum: Optional[str] = None) -> None:
+    now = time.time()
+    key = _get_key(file_path)
+    with FileLock(INDEX_LOCK_FILE):
+        index = _load_index()
+        _apply_pending_access(index)
+        size = file_path.stat().st_size
+        index[key] = {
+            "size": size,
+            "raw_size": raw_size if raw_size is not None else size,
+            "created": now,
+            "last_accessed": now,
+            "ttl_class": ttl_class,
+        }
+        if checksum is not None:
+            index[key]["checksum"] = checksum
+        if not _reconciled or sum(entry["size"] for entry in index.values()) > MAX_CACHE_SIZE:
+            _reconcile(index)
+            _evict(index, MAX_CACHE_SIZE, keep=key)
+        _save_index(index)
+
+# Mark a cache entry as used (buffered, see ACCESS_FLUSH_INTERVAL)
+def touch(file_path: Path) -> None:
+    with _access_lock:
+        _pending_access[_get_key(get_stored_path(file_path))] = time.time()
+        flush = time.time() - _last_flush > ACCESS_FLUSH_INTERVAL
+    if flush:
+        with FileLock(INDEX_LOCK_FILE):
+            index = _load_index()
+            _apply_pending_access(index)
+            _save_index(index)
+
+# Mark a volatile entry as fresh again without rewriting it (e.g. when a sync found no new data)
+def renew(file_path: Path) -> None:
+    with FileLock(INDEX_LOCK_FILE):
+        index = _load_index()
+        entry = index.get(_get_key(get_stored_path(file_path)))
+        if entry is not None:
+            entry["created"] = time.time()
+            _save_index(index)
+
+# Check if an entry has outlived its TTL class, files unknown to the index never expire
+def is_expired(file_path: Path, entry: Optional[Dict[str, Any]] = None) -> bool:
+    if entry is None:
+        entry = _read_index().get(_get_key(get_stored_path(file_path)))
+    if entry is None or entry.get("ttl_class") == TTL_IMMUTABLE:
+        return False
+    return time.time() - entry["created"] > VOLATILE_TTL
+
+# Reconcile the index with the managed directories. This stats every managed file, so it runs once per process, when
+# the cache exceeds its budget and on explicit eviction rather than on every write.
+def _reconcile(index: Dict[str, Dict[str, Any]]) -> None:
+    global _reconciled
+
+    # Add files that are not yet indexed (e.g. written before the index existed) using their modification time
+    for directory in MANAGED_DIRS:
+        for path in directory.glob("*") if directory.exists() else []:
+            # Files being written are not entries, those of crashed writers are removed once stale
+            if path.name.endswith(TEMP_SUFFIX):
+                if time.time() - path.stat().st_mtime > STALE_TEMP_AGE:
+                    path.unlink(missing_ok=True)
+                continue
+            key = _get_key(path)
+            if path.is_file() and key not in index:
+                stat = path.stat()
+                index[key] = {"size": stat.st_size, "raw_size": stat.st_size, "created": stat.st_mtime,
+                              "last_accessed": stat.st_mtime, "ttl_class": TTL_VOLATILE}
+
+    # Drop entries whose files were removed outside the cache manager
+    for key in [key for key in index if not _get_path(key).exists()]:
+        del index[key]
+    _reconciled = True
+
+# Remove least recently used entries until the indexed entries fit in the budget, expired entries go first
+def _evict(index: Dict[str, Dict[str, Any]], max_size: int, keep: Optional[str] = None) -> List[str]:
+    total = sum(entry["size"] for entry in index.values())
+    candidates = sorted((key for key in index if key != keep),
+                        key=lambda key: (not is_expired(_get_path(key), index[key]), index[key]["last_accessed"]))
+    removed = []
+    for key in candidates:
+        if total <= max_size:
+            break
+        _get_path(key).unlink(missing_ok=True)
+        total -= index.pop(key)["size"]
+        removed.append(key)
+
+    if removed:
+        logging.info(f"Evicted {len(removed)} cache entries to stay within {max_size} bytes")
+    return removed
+
+# Returns the index entry of every stored file by path, to check many files with a single read of the index (e.g. with
+# is_expired). The entries are shared and must not be modified.
+def get_index() -> Dict[Path, Dict[str, Any]]:
+    return {_get_path(key): entry for key, entry in _read_index().items()}
+
+# Evict entries until the cache fits in the given budget and return the removed entries
+def evict(max_size: int = MAX_CACHE_SIZE) -> List[str]:
+    with FileLock(INDEX_LOCK_FILE):
+        index = _load_index()
+        _apply_pending_access(index)
+        _reconcile(index)
+        removed = _evict(index, max_size)
+        _save_index(index)
+    return removed
+
+# Returns the metadata of every cache entry, most recently used first
+def get_cache_entries() -> List[Dict[str, Any]]:
+    with FileLock(INDEX_LOCK_FILE, shared=True):
+        index = _load_index()
+    with _access_lock:
+        for key, accessed in _pending_access.items():
+            if key in index:
+                index[key]["last_accessed"] = max(index[key]["last_accessed"], accessed)
+    entries = [{"path": key, **entry, "expired": is_expired(_get_path(key), entry)} for key, entry in index.items()]
+    return sorted(entries, key=lambda entry: entry["last_accessed"], reverse=True)
+
+# Returns the total size in bytes of the indexed cache entries
+def get_cache_size() -> int:
+    return sum(entry["size"] for entry in get_cache_entries())
+
+# Returns the ratio between the uncompressed and stored size of the indexed cache entries
+def get_compression_ratio() -> float:
+    entries = get_cache_entries()
+    size = sum(entry["size"] for entry in entries)
+    return sum(entry.get("raw_size", entry["size"]) for entry in entries) / size if size else 1.0
 
-# Checks if cache file is in the cache directory
-def is_cached(file_path: Path) -> bool:
-    return file_path.exists()
\ No newline at end of file
+# Remove cache entries matching all given criteria and return the removed entries
+def purge(ttl_class: Optional[str] = None, expired_only: bool = False, prefix: Optional[str] = None) -> List[str]:
+    removed = []
+    with FileLock(INDEX_LOCK_FILE):
+        index = _load_index()
+        for key, entry in list(index.items()):
+            if ttl_class is not None and entry.get("ttl_class") != ttl_class:
+                continue
+            if expired_only and not is_expired(_get_path(key), entry):
+                continue
+            if prefix is not None and not Path(key).name.startswith(prefix):
+                continue
+            _get_path(key).unlink(missing_ok=True)
+            del index[key]
+            removed.append(key)
+        _save_index(index)
+    logging.info(f"Purged {len(removed)} cache entries.")
+    return removed
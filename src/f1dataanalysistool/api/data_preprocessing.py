@@ -1,7 +1,18 @@
 import logging
+from itertools import chain, repeat
+from operator import is_not
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import Any, List, Dict, Tuple, Optional
+from f1dataanalysistool.api.atomic_file import atomic_path
+
+# Optional columnar storage, cleaned data is stored as csv when pyarrow is not installed
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = feather = None
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -10,6 +21,9 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 CLEANED_DIR = Path(__file__).resolve().parent.parent.parent / "data/cleaned"
 CLEANED_DIR.mkdir(parents=True, exist_ok=True)  # Ensure the processed directory exists
 
+# File format of cleaned data, Feather (Arrow IPC) preserves dtypes and supports column projection and memory mapping
+CLEANED_FORMAT = "feather" if feather is not None else "csv"
+
 # Converts the provided list to a pandas dataframe
 def convert_to_dataframe(data: List) -> pd.DataFrame:
     # Checking for data
@@ -24,7 +38,7 @@ def convert_to_dataframe(data: List) -> pd.DataFrame:
         logging.error("Error converting data to DataFrame: %s", str(e))
         return pd.DataFrame()
 
-# Save the dataframe to the file path
+# Save the dataframe to the file path, the file is replaced atomically so readers never see a partial csv
 def save_to_csv(data: pd.DataFrame, file_name: str) -> None:
     # Check if there is data to save
     if data.empty:
@@ -34,7 +48,8 @@ def save_to_csv(data: pd.DataFrame, file_name: str) -> None:
     # Save data to csv
     file_path = CLEANED_DIR / file_name
     try:
-        data.to_csv(file_path, index=False)
+        with atomic_path(file_path) as temp_path:
+            data.to_csv(temp_path, index=False)
         logging.info("Saved cleaned data to %s", file_path)
     # Log an error if saving fails
     except Exception as e:
@@ -58,6 +73,59 @@ def is_loaded_csv(file_name: str) -> bool:
     file_path = CLEANED_DIR / file_name
     return file_path.exists()
 
+# Save the dataframe to the file path in Feather format, uncompressed so it can be memory mapped when loading. The
+# file is replaced atomically, so readers never see a partial file and existing memory maps keep the previous data.
+def save_to_feather(data: pd.DataFrame, file_name: str) -> None:
+    # Check if there is data to save
+    if data.empty:
+        logging.warning("No data provided for saving.")
+        return
+
+    # Arrow columns hold a single type, mixed object columns are stored as strings like they would be in a csv
+    data = data.reset_index(drop=True)
+    data.columns = [str(col) for col in data.columns]
+    for col in data.columns[data.dtypes == object]:
+        if pd.api.types.infer_dtype(data[col], skipna=True).startswith("mixed"):
+            data[col] = data[col].where(data[col].isna(), data[col].astype(str))
+
+    # Save data to feather
+    file_path = CLEANED_DIR / file_name
+    try:
+        with atomic_path(file_path) as temp_path:
+            feather.write_feather(data, temp_path, compression="uncompressed")
+        logging.info("Saved cleaned data to %s", file_path)
+    # Log an error if saving fails
+    except Exception as e:
+        logging.error("Error saving cleaned data: %s", str(e))
+
+# Load data from the feather file, only reading the requested columns (in the requested order)
+def load_from_feather(file_name: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    file_path = CLEANED_DIR / file_name
+    # Load from filepath
+    try:
+        table = feather.read_table(file_path, columns=columns, memory_map=True)
+        data = (table.select(columns) if columns is not None else table).to_pandas()
+        logging.info("Loaded cleaned data from %s", file_path)
+        return data
+    # Log error if feather loading fails
+    except Exception as e:
+        logging.error("Error loading cleaned data from feather: %s", str(e))
+        return pd.DataFrame()
+
+# Save cleaned data using the format given by the file extension
+def save_cleaned(data: pd.DataFrame, file_name: str) -> None:
+    if file_name.endswith(".feather"):
+        save_to_feather(data, file_name)
+    else:
+        save_to_csv(data, file_name)
+
+# Load cleaned data using the format given by the file extension
+def load_cleaned(file_name: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    if file_name.endswith(".feather"):
+        return load_from_feather(file_name, columns)
+    data = load_from_csv(file_name)
+    return data[columns] if columns is not None and not data.empty else data
+
 # Function that removes any nested dictionaries by flattening the inner data.
 def preprocess_data(inner_data: List[Dict]) -> List[Dict]:
     def flatten(data: Dict) -> List[Dict]:
@@ -84,6 +152,147 @@ def preprocess_data(inner_data: List[Dict]) -> List[Dict]:
 
     return flattened_data
 
+# Marks keys missing from an entry, missing values become NaN like in json_normalize
+class _Missing:
+    pass
+
+MISSING = _Missing()
+
+# Schema kinds of a key: a plain value, a nested dictionary flattened to dotted column names, or a list of
+# dictionaries expanded to one row per item
+VALUE, DICT, LIST = "value", "dict", "list"
+
+# Compiled schema of a level: (key, kind) mapped to (kind, schema of the nested level, column name or prefix)
+Schema = Dict[Tuple[str, str], Tuple]
+
+class Flattener:
+    """
+    Flattens inner data column by column into a dataframe, using a schema compiled per resource type.
+
+    Entries are processed one level at a time: all races, then all results (or laps) of every race, then all timings
+    of every lap and so on, so lists of dictionaries are expanded to any depth. Every key of a level is read for all
+    entries in one pass and becomes a column, nested dictionaries are flattened to dotted column names like
+    json_normalize does. Values of a parent level are repeated over the rows of their children with NumPy, no per row
+    dictionaries are built. Column names and their order match preprocess_data followed by convert_to_dataframe.
+
+    The schema holds the compiled kinds (VALUE, DICT or LIST) of every key path with their column names and the schema
+    of nested dictionaries and list items. It is built from the first data and extended when new keys appear, later
+    data only needs one type scan per column to select the compiled kind. Keys holding values of several kinds (e.g.
+    an empty list where results are expected) are split by kind.
+    """
+
+    def __init__(self):
+        self.schema: Schema = {}
+
+    # Flatten the inner data to a dataframe
+    def flatten(self, inner_data: List[Dict]) -> pd.DataFrame:
+        level = self._read_level(inner_data, self.schema, "", ())
+        rows = int(level["counts"].sum())
+        columns = {}
+        self._place_level(level, np.cumsum(level["counts"]) - level["counts"], rows, columns)
+
+        # Columns are ordered by first appearance and, within a row, plain values before nested dictionary values
+        data = {name: column for name, (_, column) in sorted(columns.items(), key=lambda item: item[1][0])}
+        return pd.DataFrame(data).infer_objects()
+
+    # Compile the kind of a key path, reusing the schema of nested dictionaries and list items already known
+    @staticmethod
+    def _compile(schema: Schema, key: str, kind: str, prefix: str) -> Tuple:
+        compiled = schema.get((key, kind))
+        if compiled is None:
+            compiled = schema[(key, kind)] = (kind, {} if kind != VALUE else None, prefix + key)
+        return compiled
+
+    # Read the columns of a level (aligned with its entries) and the nested lists of dictionaries it holds
+    def _read_columns(self, items: List, schema: Schema, prefix: str, columns: List, lists: List,
+                      nested: bool = False) -> None:
+        # Items are all dictionaries, entries without a nested dictionary are given an empty one
+        keys = dict.fromkeys(chain.from_iterable(items))
+        for key in keys:
+            values = list(map(dict.get, items, repeat(key), repeat(MISSING)))
+            types = set(map(type, values))
+
+            # Plain values only need the type check
+            if dict not in types and list not in types:
+                columns.append((self._compile(schema, key, VALUE, prefix)[2], values, nested))
+                continue
+
+            # Split the values by kind
+            is_dict = [type(value) is dict for value in values]
+            is_rows = [type(value) is list and bool(value) and type(value[0]) is dict for value in values]
+            others = [MISSING if d or r else value for value, d, r in zip(values, is_dict, is_rows)]
+            if any(value is not MISSING for value in others):
+                columns.append((self._compile(schema, key, VALUE, prefix)[2], others, nested))
+            if any(is_dict):
+                _, child_schema, name = self._compile(schema, key, DICT, prefix)
+                dicts = [value if d else {} for value, d in zip(values, is_dict)]
+                self._read_columns(dicts, child_schema, name + ".", columns, lists, True)
+            if any(is_rows):
+                _, child_schema, name = self._compile(schema, key, LIST, prefix)
+                lengths = [len(value) if r else 0 for value, r in zip(values, is_rows)]
+                parents = np.repeat(np.arange(len(values)), lengths)
+                children = [child for value, r in zip(values, is_rows) if r for child in value]
+                lists.append((name + ".", parents, children, child_schema))
+
+    # Read a level and the levels below it, returning its columns and the number of rows each entry spans
+    def _read_level(self, items: List[Dict], schema: Schema, prefix: str, ordinal: Tuple) -> Dict[str, Any]:
+        columns, lists = [], []
+        self._read_columns(items, schema, prefix, columns, lists)
+
+        # Every child becomes one or more rows, the children of each list follow those of the previous list
+        counts = np.zeros(len(items), dtype=np.int64)
+        children = []
+        for list_index, (list_prefix, parents, child_items, child_schema) in enumerate(lists):
+            child = self._read_level(child_items, child_schema, list_prefix, ordinal + (list_index,))
+            children.append((parents, counts.copy(), child))
+            counts += np.bincount(parents, weights=child["counts"], minlength=len(items)).astype(np.int64)
+        return {"columns": columns, "children": children, "counts": np.maximum(counts, 1), "ordinal": ordinal}
+
+    # Write the columns of a level and the levels below it, each entry spans counts rows from its start row
+    def _place_level(self, level: Dict[str, Any], starts: np.ndarray, rows: int, columns: Dict[str, Tuple]) -> None:
+        counts = level["counts"]
+        for column_index, (name, values, nested) in enumerate(level["columns"]):
+            present = np.fromiter(map(is_not, values, repeat(MISSING)), dtype=bool, count=len(values))
+            present_index = np.flatnonzero(present)
+            order = (int(starts[present_index[0]]), nested, level["ordinal"], column_index)
+
+            # One value per row, used as is
+            if len(values) == rows and present.all():
+                columns[name] = (order, values)
+                continue
+
+            present_counts = counts[present_index]
+            offsets = np.arange(present_counts.sum()) - np.repeat(np.cumsum(present_counts) - present_counts,
+                                                                  present_counts)
+            array = np.full(rows, np.nan, dtype=object)
+            array[np.repeat(starts[present_index], present_counts) + offsets] = \
+                pd.Series(values, dtype=object).to_numpy()[np.repeat(present_index, present_counts)]
+            columns[name] = (order, array)
+
+        # Children start after the children of the previous lists of their parent and their preceding siblings
+        for parents, list_offsets, child in level["children"]:
+            child_counts = child["counts"]
+            preceding = np.cumsum(child_counts) - child_counts
+            preceding -= preceding[np.searchsorted(parents, parents)]
+            self._place_level(child, starts[parents] + list_offsets[parents] + preceding, rows, columns)
+
+# Flatteners compiled per resource type
+_flatteners: Dict[str, Flattener] = {}
+
+# Flattens the inner data to a dataframe, reusing the flattener compiled for the resource type
+def flatten_to_dataframe(inner_data: List[Dict], resource_type: Optional[str] = None) -> pd.DataFrame:
+    # Checking for data
+    if not inner_data:
+        logging.warning("No data provided for conversion to DataFrame. Returning empty DataFrame.")
+        return pd.DataFrame()
+    flattener = _flatteners.setdefault(resource_type, Flattener()) if resource_type is not None else Flattener()
+    try:
+        return flattener.flatten(inner_data)
+    # Log an error if the conversion fails
+    except Exception as e:
+        logging.error("Error converting data to DataFrame: %s", str(e))
+        return pd.DataFrame()
+
 def get_columns(df: pd.DataFrame) -> List[str]:
     return list(df.columns)
 
@@ -98,38 +307,156 @@ def get_column_min_max(df: pd.DataFrame, column: str) -> Tuple[float, float] | T
         return df[column].min(), df[column].max()
     return None, None
 
+# Column name parts identifying time columns
+TIME_COLUMN_PARTS = ["time", "duration", "Q1", "Q2", "Q3"]
+
+# Parses an array of time strings (ss.sss, m:ss.sss or h:mm:ss.sss, optionally prefixed with + for gaps) to
+# milliseconds, invalid values are returned as NaN. The strings are parsed column by column over their characters
+# with NumPy, accumulating the digits of each segment. Seconds are computed as digits / 10 ** decimals, which is the
+# correctly rounded value float() would return, so truncating to milliseconds matches int(float(seconds) * 1000).
+def times_to_ms(values: np.ndarray) -> np.ndarray:
+    # Non ascii values are never valid times
+    try:
+        encoded = values.astype("S")
+    except UnicodeEncodeError:
+        encoded = np.array([value if value.isascii() else "" for value in values], dtype=object).astype("S")
+
+    n, width = len(encoded), encoded.dtype.itemsize
+    chars = np.frombuffer(encoded.tobytes(), dtype=np.uint8).reshape(n, width).T.copy()
+
+    current, minutes, hours = np.zeros(n, np.int64), np.zeros(n, np.int64), np.zeros(n, np.int64)
+    decimals, digits, colons = np.zeros(n, np.int64), np.zeros(n, np.int64), np.zeros(n, np.int64)
+    seen_dot, valid = np.zeros(n, bool), np.ones(n, bool)
+
+    for position in range(width):
+        char = chars[position]
+        is_digit = (char >= 48) & (char <= 57)
+        is_colon = char == 58
+        is_dot = char == 46
+
+        # Accumulate the digits of the current segment
+        np.multiply(current, 10, out=current, where=is_digit)
+        np.add(current, char - 48, out=current, where=is_digit, casting="unsafe")
+        decimals += is_digit & seen_dot
+        digits += is_digit
+
+        # Only digits, separators, a leading + and the padding of shorter strings are allowed
+        valid &= ~(is_colon & (seen_dot | (digits == 0))) & ~(is_dot & seen_dot)
+        valid &= is_digit | is_colon | is_dot | (char == 0) | ((char == 43) & (position == 0))
+
+        # A colon closes the current segment, shifting minutes to hours
+        if is_colon.any():
+            np.copyto(hours, minutes, where=is_colon)
+            np.copyto(minutes, current, where=is_colon)
+            current[is_colon] = 0
+            digits[is_colon] = 0
+            colons += is_colon
+        seen_dot |= is_dot
+
+    valid &= (colons <= 2) & (digits > 0) & (digits <= 15)
+    seconds = current / 10.0 ** decimals
+    ms = np.trunc(seconds * 1000) + minutes * 60000 + hours * 3600000
+    return np.where(valid, ms, np.nan)
+
+# Converts a series of times to milliseconds, returns the converted series and a mask of invalid values
+def series_to_ms(series: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    # Numeric values are seconds
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        ms = np.trunc(series.astype(float) * 1000)
+        return ms, pd.Series(False, index=series.index)
+
+    present = series.notna().to_numpy()
+    values = series.to_numpy(dtype=object)[present]
+    if pd.api.types.infer_dtype(values, skipna=False) != "string":
+        values = np.array([value if isinstance(value, str) else str(value) for value in values], dtype=object)
+
+    ms = np.full(len(series), np.nan)
+    ms[present] = times_to_ms(values)
+    ms = pd.Series(ms, index=series.index)
+
+    # Values that are not in a time format may still be plain numbers (e.g. " 23.4" or "1e1")
+    retry = present & ms.isna().to_numpy()
+    retry[retry] = ~series[retry].astype(str).str.contains(":").to_numpy()
+    if retry.any():
+        ms[retry] = np.trunc(pd.to_numeric(series[retry].astype(str).str.strip(), errors="coerce") * 1000)
+
+    invalid = series.notna() & ms.isna()
+    return ms, invalid
+
 def convert_to_ms(df: pd.DataFrame, column: List = None) -> pd.DataFrame:
-    def time_to_ms(time):
-        try:
-            if isinstance(time, (int, float)):
-                return int(time * 1000)
-            if isinstance(time, str):
-                if ":" not in time:
-                    return int(float(time) * 1000)
-                time_parts = time.split(":")
-                if len(time_parts) == 2:
-                    minutes, rest = time_parts
-                    return (int(minutes) * 60000) + int(float(rest) * 1000)
-            return time
-        except (ValueError, TypeError):
-            logging.warning(f"Invalid time format: {time}")
+    columns = column
+    if columns is None:
+        columns = [col for col in get_columns(df) if any(part in TIME_COLUMN_PARTS for part in col.split("."))]
 
     try:
+        for col in columns:
+            ms, invalid = series_to_ms(df[col])
+
+            # Leave columns without a single time value untouched (e.g. race start times such as 13:00:00Z)
+            if ms.isna().all() and invalid.any():
+                logging.warning(f"Column {col} does not contain time values, it was not converted.")
+                continue
+
+            # Report invalid values once per column, they are set to missing
+            if invalid.any():
+                samples = df[col][invalid].astype(str).unique()[:5].tolist()
+                logging.warning(f"{int(invalid.sum())} invalid time values in column {col} (e.g. {samples})")
+
+            df[col] = ms.astype("int64") if ms.notna().all() else ms
         if column is None:
-            for col in get_columns(df):
-                if any(part in ["time", "duration", "Q1", "Q2", "Q3"] for part in col.split(".")):
-                    df[col] = df[col].apply(time_to_ms)
             logging.info("Time values converted to milliseconds in all time or duration columns.")
-        else:
-            for col in column:
-                df[col] = df[col].apply(time_to_ms)
     except Exception as e:
         logging.error(f"Error converting time to milliseconds: {e}")
     return df
 
-def convert_to_numeric(df: pd.DataFrame) -> pd.DataFrame:
+# Number of values sampled to infer the type of a column
+SCHEMA_SAMPLE_SIZE = 1000
+
+# Numeric column types inferred per resource type, so later batches of the same resource skip inference and get the
+# same types. Columns judged to be objects are not cached, a stray value in one dataset must not leave the column
+# unconverted in every later dataset.
+_schemas: Dict[str, Dict[str, str]] = {}
+
+# Infer the target type of a column (integer, float or object) from an evenly spaced sample of its values, None if the
+# column has no values
+def infer_column_type(series: pd.Series) -> Optional[str]:
+    values = series.dropna()
+    if values.empty:
+        return None
+    sample = values.iloc[::max(1, len(values) // SCHEMA_SAMPLE_SIZE)]
+    if pd.api.types.infer_dtype(sample, skipna=True) == "boolean":
+        return "object"
+    numbers = pd.to_numeric(sample, errors="coerce")
+    if numbers.isna().any():
+        return "object"
+    return "integer" if (numbers % 1 == 0).all() else "float"
+
+# Downcast a numeric series to the smallest integer type, or to float32 when every value is exactly representable
+def downcast_numeric(series: pd.Series) -> pd.Series:
+    if series.isna().any() or not (series % 1 == 0).all():
+        float32 = series.astype(np.float32)
+        exact = (float32.astype(np.float64) == series) | series.isna()
+        return float32 if exact.all() else series.astype(np.float64)
+    return pd.to_numeric(series, downcast="integer")
+
+# Converts columns holding numbers to the smallest fitting numeric type. The type of each column is inferred from a
+# sample (numeric types are cached per resource type) and the whole column is converted in one call, columns that
+# cannot be fully converted are left unchanged and their cached type is dropped.
+def convert_to_numeric(df: pd.DataFrame, resource_type: Optional[str] = None) -> pd.DataFrame:
+    schema = _schemas.setdefault(resource_type, {}) if resource_type is not None else {}
     for col in get_columns(df):
-        if not pd.api.types.is_numeric_dtype(df[col]):
-            df[col] = df[col].apply(lambda x: pd.to_numeric(x, errors="ignore"))
+        if pd.api.types.is_numeric_dtype(df[col]):
+            continue
+
+        column_type = schema.get(col) or infer_column_type(df[col])
+        if column_type is None or column_type == "object":
+            continue
+
+        try:
+            df[col] = downcast_numeric(pd.to_numeric(df[col], errors="raise"))
+            schema[col] = column_type
+        except (ValueError, TypeError):
+            schema.pop(col, None)
+            logging.warning(f"Column {col} could not be converted to a numeric type, it was left unchanged.")
     logging.info("Converted applicable columns to numeric values.")
     return df
\ No newline at end of file
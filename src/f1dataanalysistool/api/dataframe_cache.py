@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import pandas as pd
+
+# Default memory budget in bytes for cached dataframes
+MAX_MEMORY = int(os.environ.get("F1_DATAFRAME_CACHE_BYTES", 256 * 1024 ** 2))
+
+class DataFrameCache:
+    """
+    Bounded in-process LRU cache of dataframes.
+
+    Dataframes are copied when stored and when returned, so callers can modify them freely. The size of each
+    entry is measured with DataFrame.memory_usage(deep=True) and least recently used entries are evicted once
+    the memory budget is exceeded. Entries stored with a TTL are treated as missing once it has passed.
+
+    :param max_memory: Memory budget in bytes
+    """
+
+    def __init__(self, max_memory: int = MAX_MEMORY):
+        self.max_memory = max_memory
+        self._entries: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._expiry: Dict[str, float] = {}
+        self._memory = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # Returns a copy of the cached dataframe (only the given columns if provided), or None if it is not cached
+    def get(self, key: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        with self._lock:
+            if key in self._expiry and time.time() > self._expiry[key]:
+                self._remove(key)
+            df = self._entries.get(key)
+            if df is None or (columns is not None and not set(columns).issubset(df.columns)):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return (df[columns] if columns is not None else df).copy()
+
+    # Store a copy of the dataframe, evicting least recently used entries to stay within the memory budget
+    def put(self, key: str, df: pd.DataFrame, ttl: Optional[float] = None) -> None:
+        df = df.copy()
+        size = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            self._remove(key)
+            if size > self.max_memory:
+                return
+            self._entries[key] = df
+            self._sizes[key] = size
+            self._memory += size
+            if ttl is not None:
+                self._expiry[key] = time.time() + ttl
+            while self._memory > self.max_memory:
+                self._remove(next(iter(self._entries)))
+
+    # Remove an entry (e.g. after the underlying data changed)
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    # Remove all entries
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._expiry.clear()
+            self._memory = 0
+
+    def _remove(self, key: str) -> None:
+        if key in self._entries:
+            del self._entries[key]
+            self._memory -= self._sizes.pop(key)
+            self._expiry.pop(key, None)
+
+    # Returns the cache statistics
+    def get_stats(self) -> Dict[str, float]:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "memory": self._memory,
+                "max_memory": self.max_memory,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+            }
+
+# Process wide cache of cleaned dataframes, keyed by endpoint
+cleaned_data_cache = DataFrameCache()
@@ -0,0 +1,341 @@
+import argparse
+import logging
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+import pandas as pd
+import f1dataanalysistool.api.cache_manager as cache_manager
+import f1dataanalysistool.api.data_preprocessing as dp
+import f1dataanalysistool.api.json_handler as json_handler
+from f1dataanalysistool.api.jolpica_api import JolpicaAPI
+from f1dataanalysistool.api.warehouse import get_endpoint_name, parse_seasons
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Number of rows read from a csv file at a time
+CHUNK_SIZE = 100_000
+
+# Value of missing fields in the dump
+NULL_VALUE = "\\N"
+
+# Practice and qualifying sessions of a race: response key and columns of races.csv
+SESSIONS = {"FirstPractice": "fp1", "SecondPractice": "fp2", "ThirdPractice": "fp3", "Qualifying": "quali",
+            "Sprint": "sprint"}
+
+# Lists whose entries hold the rows counted by the total of a response instead of the entries themselves
+ROW_LISTS = {"Races": "Results", "Laps": "Timings"}
+
+# Returns the entry without missing fields, the API leaves them out
+def compact(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in entry.items() if value is not None and value != {}}
+
+# Returns the rows of a dataframe as dictionaries, missing values are None
+def to_records(df: pd.DataFrame) -> List[Dict[str, Optional[str]]]:
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+class DumpImporter:
+    """
+    Imports an Ergast-format csv dump (as published by Ergast and Jolpica-F1) into the response cache.
+
+    For each season the complete responses of the endpoints the application requests are built in the format of the
+    API (e.g. the results of the season, the laps of each race) and cached under the same keys JolpicaAPI uses, so
+    get_cleaned_data finds them without any request. Small tables (races, drivers, constructors, circuits and status)
+    are read into lookups, the others are read in chunks and processed race by race: responses of a single race are
+    written as soon as the race is complete and responses of a season once all of its races have been read.
+
+    Requests that are already cached are kept unless overwrite is set, as data from the API is at least as recent.
+
+    :param dump_dir: Directory holding the csv files of the dump (e.g. results.csv)
+    :param seasons: Seasons to import (all if None)
+    :param overwrite: Whether to replace requests that are already cached
+    :param chunk_size: Number of rows read at a time
+    """
+
+    def __init__(self, dump_dir: Path, seasons: Optional[List[int]] = None, overwrite: bool = False,
+                 chunk_size: int = CHUNK_SIZE):
+        self.dump_dir = Path(dump_dir)
+        self.seasons = set(seasons) if seasons is not None else None
+        self.overwrite = overwrite
+        self.chunk_size = chunk_size
+        self.written: Dict[str, int] = defaultdict(int)
+        self._written_keys: Set[str] = set()
+
+    # Import the dump and return the number of cached responses per resource type
+    def run(self) -> Dict[str, int]:
+        self.load_lookups()
+        self.import_lists()
+        self.import_results()
+        self.import_race_table("qualifying.csv", "qualifying", "QualifyingResults", self.make_qualifying)
+        self.import_race_table("sprint_results.csv", "sprint", "SprintResults", self.make_result)
+        self.import_laps()
+        self.import_race_table("pit_stops.csv", "pitstops", "PitStops", self.make_pit_stop)
+        self.import_standings("driver_standings.csv", "driverstandings", "DriverStandings")
+        self.import_standings("constructor_standings.csv", "constructorstandings", "ConstructorStandings")
+        return dict(self.written)
+
+    # Read a csv file of the dump as strings, None if the dump does not include it
+    def read_table(self, file_name: str, chunk_size: Optional[int] = None) -> Any:
+        path = self.dump_dir / file_name
+        if not path.exists():
+            logging.warning(f"{file_name} is not part of the dump, skipping it")
+            return None
+        return pd.read_csv(path, dtype=str, na_values=[NULL_VALUE], keep_default_na=False, chunksize=chunk_size)
+
+    # Yields the rows of a csv file grouped by race, a race is yielded once the following race starts. Rows of a race
+    # that is not contiguous in the file are yielded again later, callers merge them.
+    def iter_races(self, file_name: str) -> Iterator[Tuple[str, List[Dict[str, Optional[str]]]]]:
+        chunks = self.read_table(file_name, self.chunk_size)
+        if chunks is None:
+            return
+        pending: Dict[str, List] = {}
+        for chunk in chunks:
+            chunk = chunk[chunk["raceId"].isin(self.race_ids)]
+            for race_id, rows in chunk.groupby("raceId", sort=False):
+                pending.setdefault(race_id, []).extend(to_records(rows))
+            last_race_id = chunk["raceId"].iloc[-1] if not chunk.empty else None
+            for race_id in [race_id for race_id in pending if race_id != last_race_id]:
+                yield race_id, pending.pop(race_id)
+        yield from pending.items()
+
+    # Read the tables referenced by the other tables and build the entries of drivers, constructors, circuits and races
+    def load_lookups(self) -> None:
+        self.drivers = {row["driverId"]: compact({
+            "driverId": row["driverRef"], "permanentNumber": row["number"], "code": row["code"], "url": row["url"],
+            "givenName": row["forename"], "familyName": row["surname"], "dateOfBirth": row["dob"],
+            "nationality": row["nationality"],
+        }) for row in to_records(self.read_table("drivers.csv"))}
+        self.constructors = {row["constructorId"]: compact({
+            "constructorId": row["constructorRef"], "url": row["url"], "name": row["name"],
+            "nationality": row["nationality"],
+        }) for row in to_records(self.read_table("constructors.csv"))}
+        self.circuits = {row["circuitId"]: compact({
+            "circuitId": row["circuitRef"], "url": row["url"], "circuitName": row["name"],
+            "Location": compact({"lat": row["lat"], "long": row["lng"], "locality": row["location"],
+                                 "country": row["country"]}),
+        }) for row in to_records(self.read_table("circuits.csv"))}
+        status = self.read_table("status.csv")
+        self.status = {row["statusId"]: row["status"] for row in to_records(status)} if status is not None else {}
+
+        # Races of the imported seasons in the order of the season
+        races = self.read_table("races.csv")
+        races = races.assign(_season=races["year"].astype(int), _round=races["round"].astype(int))
+        if self.seasons is not None:
+            races = races[races["_season"].isin(self.seasons)]
+        self.races: Dict[str, Dict[str, Any]] = {}
+        self.season_races: Dict[str, List[str]] = defaultdict(list)
+        for row in to_records(races.sort_values(["_season", "_round"])):
+            self.races[row["raceId"]] = compact({
+                "season": row["year"], "round": row["round"], "url": row["url"], "raceName": row["name"],
+                "Circuit": self.circuits.get(row["circuitId"]), "date": row["date"],
+                "time": f"{row['time']}Z" if row["time"] else None,
+                **{session: compact({"date": row.get(f"{prefix}_date"), "time": f"{row[f'{prefix}_time']}Z"
+                                     if row.get(f"{prefix}_time") else None}) for session, prefix in SESSIONS.items()},
+            })
+            self.season_races[row["year"]].append(row["raceId"])
+        self.race_ids = set(self.races)
+
+    # Cache a response built from the dump under the key of its request. A request cached by an earlier part of the
+    # import (a race that is not contiguous in a file) is merged with it.
+    def write(self, resource_type: str, filters: Dict[str, str], table: str, content: Dict[str, Any],
+              inner_key_path: List[str]) -> None:
+        api = JolpicaAPI(get_endpoint_name(resource_type), filters=filters)
+        file_path = api.get_cache_file_path_all()
+        key = file_path.name
+        response = {"MRData": {"xmlns": "", "series": "f1", "url": f"{api.BASE_URL}{api.get_endpoint()}.json",
+                               "limit": "0", "offset": "0", "total": "0", table: content}}
+
+        if key in self._written_keys:
+            cached = cache_manager.load_cache(file_path)
+            inner_data = json_handler.extend_inner_data(json_handler.get_inner_data(cached, inner_key_path),
+                                                        json_handler.get_inner_data(response, inner_key_path),
+                                                        inner_key_path[-1])
+            response = json_handler.set_inner_data(cached, inner_key_path, inner_data)
+        elif not self.overwrite and cache_manager.is_cached(file_path, include_expired=True):
+            return
+
+        # The total counts rows like the API (e.g. results rather than races), so syncs request the right offsets
+        inner_data = json_handler.get_inner_data(response, inner_key_path)
+        row_key = ROW_LISTS.get(inner_key_path[-1])
+        total = sum(len(entry[row_key]) if row_key in entry else 1 for entry in inner_data)
+        response["MRData"]["limit"] = response["MRData"]["total"] = str(total)
+
+        cache_manager.cache_data(file_path, response, api.get_ttl_class())
+        cache_manager.remove_cache(dp.CLEANED_DIR / api.get_cleaned_file_name())
+        if key not in self._written_keys:
+            self._written_keys.add(key)
+            self.written[resource_type] += 1
+
+    # Races of a season without their session data (as in the responses of results, laps, etc.)
+    def get_race(self, race_id: str) -> Dict[str, Any]:
+        return {key: value for key, value in self.races[race_id].items() if key not in SESSIONS}
+
+    # Cache the seasons and the drivers, constructors and circuits of all seasons
+    def import_lists(self) -> None:
+        seasons = self.read_table("seasons.csv")
+        if seasons is not None and self.seasons is None:
+            seasons = seasons.assign(_year=seasons["year"].astype(int)).sort_values("_year")
+            self.write("seasons", {}, "SeasonTable",
+                       {"Seasons": [{"season": row["year"], "url": row["url"]} for row in to_records(seasons)]},
+                       ["SeasonTable", "Seasons"])
+        for season, race_ids in self.season_races.items():
+            self.write("races", {"season": season}, "RaceTable",
+                       {"season": season, "Races": [self.races[race_id] for race_id in race_ids]},
+                       ["RaceTable", "Races"])
+            circuits = list({race["Circuit"]["circuitId"]: race["Circuit"] for race in map(self.races.get, race_ids)
+                             if "Circuit" in race}.values())
+            self.write("circuits", {"season": season}, "CircuitTable", {"season": season, "Circuits": circuits},
+                       ["CircuitTable", "Circuits"])
+        if self.seasons is None:
+            self.write("drivers", {}, "DriverTable", {"Drivers": list(self.drivers.values())}, ["DriverTable", "Drivers"])
+            self.write("constructors", {}, "ConstructorTable", {"Constructors": list(self.constructors.values())},
+                       ["ConstructorTable", "Constructors"])
+            self.write("circuits", {}, "CircuitTable", {"Circuits": list(self.circuits.values())},
+                       ["CircuitTable", "Circuits"])
+
+    # Build a result entry of a row of results.csv or sprint_results.csv (whose fastest laps have no rank)
+    def make_result(self, row: Dict[str, Optional[str]]) -> Dict[str, Any]:
+        return compact({
+            "number": row["number"], "position": row["positionOrder"], "positionText": row["positionText"],
+            "points": row["points"], "Driver": self.drivers.get(row["driverId"]),
+            "Constructor": self.constructors.get(row["constructorId"]), "grid": row["grid"], "laps": row["laps"],
+            "status": self.status.get(row["statusId"]),
+            "Time": compact({"millis": row["milliseconds"], "time": row["time"]}),
+            "FastestLap": compact({"rank": row.get("rank"), "lap": row["fastestLap"],
+                                   "Time": compact({"time": row["fastestLapTime"]}),
+                                   "AverageSpeed": compact({"units": "kph", "speed": row["fastestLapSpeed"]})
+                                   if row.get("fastestLapSpeed") else None}) if row["fastestLap"] else None,
+        })
+
+    # Build a qualifying entry of a row of qualifying.csv
+    def make_qualifying(self, row: Dict[str, Optional[str]]) -> Dict[str, Any]:
+        return compact({
+            "number": row["number"], "position": row["position"], "Driver": self.drivers.get(row["driverId"]),
+            "Constructor": self.constructors.get(row["constructorId"]), "Q1": row["q1"], "Q2": row["q2"],
+            "Q3": row["q3"],
+        })
+
+    # Build a pit stop entry of a row of pit_stops.csv
+    def make_pit_stop(self, row: Dict[str, Optional[str]]) -> Dict[str, Any]:
+        return compact({
+            "driverId": self.drivers.get(row["driverId"], {}).get("driverId"), "lap": row["lap"], "stop": row["stop"],
+            "time": row["time"], "duration": row["duration"],
+        })
+
+    # Cache the results of every season, also collecting the drivers and constructors of each season and the
+    # constructors each driver drove for (listed in the driver standings)
+    def import_results(self) -> None:
+        self.driver_constructors: Dict[Tuple[str, str], List[Tuple[int, Dict[str, Any]]]] = defaultdict(list)
+        seasons: Dict[str, Dict[str, List]] = defaultdict(dict)
+        for race_id, rows in self.iter_races("results.csv"):
+            race = self.races[race_id]
+            rows = sorted(rows, key=lambda row: int(row["positionOrder"]))
+            seasons[race["season"]].setdefault(race_id, []).extend(rows)
+            for row in rows:
+                if row["constructorId"] in self.constructors:
+                    self.driver_constructors[(race["season"], row["driverId"])].append(
+                        (int(race["round"]), self.constructors[row["constructorId"]]))
+
+            # Write a season once all of its races have been read
+            if len(seasons[race["season"]]) == len(self.season_races[race["season"]]):
+                self.write_season_results(race["season"], seasons.pop(race["season"]))
+        for season, races in seasons.items():
+            self.write_season_results(season, races)
+
+    # Cache the results, drivers and constructors of a season
+    def write_season_results(self, season: str, races: Dict[str, List]) -> None:
+        race_ids = [race_id for race_id in self.season_races[season] if race_id in races]
+        results = [{**self.get_race(race_id), "Results": [self.make_result(row) for row in races[race_id]]}
+                   for race_id in race_ids]
+        self.write("results", {"season": season}, "RaceTable", {"season": season, "Races": results},
+                   ["RaceTable", "Races"])
+
+        rows = [row for race_id in race_ids for row in races[race_id]]
+        drivers = [self.drivers[driver_id] for driver_id in dict.fromkeys(row["driverId"] for row in rows)
+                   if driver_id in self.drivers]
+        constructors = [self.constructors[constructor_id]
+                        for constructor_id in dict.fromkeys(row["constructorId"] for row in rows)
+                        if constructor_id in self.constructors]
+        self.write("drivers", {"season": season}, "DriverTable", {"season": season, "Drivers": drivers},
+                   ["DriverTable", "Drivers"])
+        self.write("constructors", {"season": season}, "ConstructorTable",
+                   {"season": season, "Constructors": constructors}, ["ConstructorTable", "Constructors"])
+
+    # Cache a table with one response per race (e.g. the qualifying of each race)
+    def import_race_table(self, file_name: str, resource_type: str, inner_key: str, make_entry) -> None:
+        for race_id, rows in self.iter_races(file_name):
+            race = self.races[race_id]
+            order = "positionOrder" if "positionOrder" in rows[0] else "position" if "position" in rows[0] else None
+            if order is not None:
+                rows = sorted(rows, key=lambda row: int(row[order]) if row[order] else float("inf"))
+            content = {"season": race["season"], "round": race["round"],
+                       "Races": [{**self.get_race(race_id), inner_key: [make_entry(row) for row in rows]}]}
+            self.write(resource_type, {"season": race["season"], "round": race["round"]}, "RaceTable", content,
+                       ["RaceTable", "Races", inner_key])
+
+    # Cache the laps of each race, timings are grouped by lap and ordered by position
+    def import_laps(self) -> None:
+        for race_id, rows in self.iter_races("lap_times.csv"):
+            race = self.races[race_id]
+            laps: Dict[int, List] = defaultdict(list)
+            for row in rows:
+                laps[int(row["lap"])].append(row)
+            content = {"season": race["season"], "round": race["round"], "Races": [{**self.get_race(race_id), "Laps": [
+                {"number": str(number), "Timings": [compact({
+                    "driverId": self.drivers.get(row["driverId"], {}).get("driverId"), "position": row["position"],
+                    "time": row["time"],
+                }) for row in sorted(laps[number], key=lambda row: int(row["position"]))]} for number in sorted(laps)
+            ]}]}
+            self.write("laps", {"season": race["season"], "round": race["round"]}, "RaceTable", content,
+                       ["RaceTable", "Races", "Laps"])
+
+    # Cache the standings after each race and the final standings of each season
+    def import_standings(self, file_name: str, resource_type: str, inner_key: str) -> None:
+        final: Dict[str, Tuple[int, str, List]] = {}
+        for race_id, rows in self.iter_races(file_name):
+            race = self.races[race_id]
+            round_number = int(race["round"])
+            entries = [self.make_standing(row, race["season"], round_number)
+                       for row in sorted(rows, key=lambda row: int(row["position"]) if row["position"] else float("inf"))]
+            self.write_standings(resource_type, inner_key, race["season"], race["round"], entries, with_round=True)
+            if race["season"] not in final or final[race["season"]][0] <= round_number:
+                final[race["season"]] = (round_number, race["round"], entries)
+        for season, (_, round_number, entries) in final.items():
+            self.write_standings(resource_type, inner_key, season, round_number, entries, with_round=False)
+
+    # Build a standings entry of a row of driver_standings.csv or constructor_standings.csv
+    def make_standing(self, row: Dict[str, Optional[str]], season: str, round_number: int) -> Dict[str, Any]:
+        entry = {"position": row["position"], "positionText": row["positionText"], "points": row["points"],
+                 "wins": row["wins"]}
+        if "driverId" in row:
+            constructors = {constructor["constructorId"]: constructor
+                            for race_round, constructor in self.driver_constructors.get((season, row["driverId"]), [])
+                            if race_round <= round_number}
+            entry.update({"Driver": self.drivers.get(row["driverId"]), "Constructors": list(constructors.values())})
+        else:
+            entry["Constructor"] = self.constructors.get(row["constructorId"])
+        return compact(entry)
+
+    # Cache the standings of a season after a round, or its final standings
+    def write_standings(self, resource_type: str, inner_key: str, season: str, round_number: str, entries: List,
+                        with_round: bool) -> None:
+        filters = {"season": season, "round": round_number} if with_round else {"season": season}
+        content = {"season": season, **({"round": round_number} if with_round else {}),
+                   "StandingsLists": [{"season": season, "round": round_number, inner_key: entries}]}
+        self.write(resource_type, filters, "StandingsTable", content, ["StandingsTable", "StandingsLists", inner_key])
+
+# Command line entry point (f1-import-dump)
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="f1-import-dump", description="Import an Ergast-format csv dump into the cache")
+    parser.add_argument("dump_dir", type=Path, help="Directory holding the csv files of the dump")
+    parser.add_argument("--seasons", nargs="+", help="Seasons to import (default: all), e.g. 2023 or 1950-1959")
+    parser.add_argument("--overwrite", action="store_true", help="Replace requests that are already cached")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows read at a time")
+    args = parser.parse_args(argv)
+
+    seasons = parse_seasons(args.seasons) if args.seasons else None
+    written = DumpImporter(args.dump_dir, seasons, args.overwrite, args.chunk_size).run()
+    print(", ".join(f"{resource_type} {count}" for resource_type, count in written.items()) or "Nothing imported")
+
+if __name__ == "__main__":
+    main()
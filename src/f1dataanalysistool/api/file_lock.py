@@ -0,0 +1,52 @@
+import threading
+from pathlib import Path
+
+# fcntl is only available on POSIX systems, elsewhere locks only apply within the current process
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Fallback locks used when advisory file locking is unavailable
+_process_locks = {}
+_process_locks_guard = threading.Lock()
+
+class FileLock:
+    """
+    Advisory lock on a lock file, shared across threads and processes on the same host.
+
+    :param path: Path of the lock file (created if missing)
+    :param shared: Whether to take a shared (read) lock instead of an exclusive (write) lock
+    """
+
+    def __init__(self, path: Path, shared: bool = False):
+        self.path = Path(path)
+        self.shared = shared
+        self._file = None
+        self._fallback = None
+
+    def acquire(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if fcntl is None:
+            with _process_locks_guard:
+                self._fallback = _process_locks.setdefault(str(self.path), threading.RLock())
+            self._fallback.acquire()
+            return
+        self._file = open(self.path, "a+")
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX)
+
+    def release(self) -> None:
+        if self._fallback is not None:
+            self._fallback.release()
+            self._fallback = None
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
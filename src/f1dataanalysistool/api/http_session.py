@@ -0,0 +1,88 @@
+import logging
+import os
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Optional, Tuple
+from f1dataanalysistool.api.rate_limiter import RateLimiter
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Connection pool constants
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 10
+
+# Retry constants
+MAX_RETRIES = 5
+BACKOFF_FACTOR = 0.5
+BACKOFF_MAX = 30.0
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Timeout (connect, read) in seconds applied to every request
+TIMEOUT = (5.0, 30.0)
+
+# Process wide session, recreated after a fork so gunicorn workers never share sockets
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+_session_lock = threading.Lock()
+
+# Returns the process wide pooled session with keep-alive connections
+def get_session() -> requests.Session:
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, pool_block=True)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session, _session_pid = session, os.getpid()
+        return _session
+
+# Closes the process wide session and its pooled connections
+def close_session() -> None:
+    global _session, _session_pid
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session, _session_pid = None, None
+
+# Exponential backoff with full jitter, honouring the Retry-After header when the server provides one
+def get_backoff(attempt: int, retry_after: Optional[str] = None) -> float:
+    if retry_after:
+        try:
+            return min(BACKOFF_MAX, float(retry_after))
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_FACTOR * (2 ** attempt)))
+
+# Performs a GET request on the pooled session and returns the JSON body, retrying transient failures.
+# The rate limiter, if provided, is consulted before every attempt including retries.
+def get_json(url: str, params: Optional[Dict[str, Any]] = None, timeout: Tuple[float, float] = TIMEOUT,
+             rate_limiter: Optional[RateLimiter] = None) -> Dict[str, Any]:
+    attempt = 0
+    while True:
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            response = get_session().get(url, params=params, timeout=timeout)
+
+            # Retry throttled and server side errors until the retry budget is exhausted
+            if response.status_code in RETRY_STATUS_CODES and attempt < MAX_RETRIES:
+                delay = get_backoff(attempt, response.headers.get("Retry-After"))
+                logging.warning(f"Received status {response.status_code} from {url}, retrying in {delay:.2f}s")
+            else:
+                response.raise_for_status()
+                return response.json()
+
+        # Connection errors and timeouts are transient, anything else is raised immediately
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt >= MAX_RETRIES:
+                raise
+            delay = get_backoff(attempt)
+            logging.warning(f"Request to {url} failed ({e}), retrying in {delay:.2f}s")
+
+        time.sleep(delay)
+        attempt += 1
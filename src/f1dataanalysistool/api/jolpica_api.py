@@ -1,9 +1,19 @@
 import logging
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from datetime import datetime
 import pandas as pd
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
+import f1dataanalysistool.api.cache_keys as cache_keys
 import f1dataanalysistool.api.cache_manager as cache_manager
+import f1dataanalysistool.api.dataframe_cache as dataframe_cache
+import f1dataanalysistool.api.metrics as metrics
+import f1dataanalysistool.api.query_planner as query_planner
+import f1dataanalysistool.api.single_flight as single_flight
+import f1dataanalysistool.api.transport as transport
+import f1dataanalysistool.api.warehouse as warehouse
 import f1dataanalysistool.api.json_handler as json_handler
 import f1dataanalysistool.api.data_preprocessing as dp
 from f1dataanalysistool.enumeration.resource_types import ResourceType
@@ -14,7 +24,7 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 class JolpicaAPI:
 
     # Constants
-    BASE_URL = "https://api.jolpi.ca/ergast/f1/"
+    BASE_URL = transport.BASE_URL
     CACHE_DIR = Path(__file__).resolve().parent.parent.parent / "data/cache"
     CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -23,6 +33,18 @@ class JolpicaAPI:
     MAXIMUM_LIMIT = 100
     DEFAULT_OFFSET = 0
 
+    # Maximum number of pages requested concurrently during pagination
+    MAX_WORKERS = 4
+
+    # Cached data larger than STREAM_MIN_SIZE bytes (uncompressed) is streamed in chunks of STREAM_CHUNK_SIZE inner
+    # data entries, smaller data is parsed faster as a whole
+    STREAM_MIN_SIZE = 16 * 1024 ** 2
+    STREAM_CHUNK_SIZE = 100
+
+    # Resource types of the race table, ordered by season and round so new datapoints are appended at the end. Other
+    # resource types are ordered by id (e.g. drivers) or change in place (e.g. standings) and are always refetched.
+    APPEND_ONLY_RESOURCES = ["results", "races", "qualifying", "sprint", "laps", "pitstops"]
+
     # Init function validating resource type and filters
     def __init__(self, resource_type: str, params: Optional[Dict[str, Any]] = None, filters: Optional[Dict[str, Any]] = None):
         # Set instance variables
@@ -42,6 +64,9 @@ class JolpicaAPI:
         self.endpoint = None
         self.set_endpoint()
 
+        # Rename cache files stored under keys from before keys were canonical
+        cache_keys.ensure_migrated()
+
     def set_params(self, params: Dict[str, Any]) -> None:
         self.params = params
 
@@ -110,124 +135,462 @@ class JolpicaAPI:
         return self.endpoint
 
 
-    def get_data(self, use_cache: bool = True) -> Dict[str, Any]:
+    def get_data(self, use_cache: bool = True, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Retrieves data from the Jolpica-F1 API with optional caching.
 
         :param use_cache: Whether to use cached data if available
+        :param params: Request parameters overriding the instance parameters (used for concurrent pagination)
         :return: JSON response from the API
         """
+        params = params if params is not None else self.get_params()
 
         # Return cached file if cache is enabled and cache file exists
-        if use_cache and cache_manager.is_cached(self.get_cache_file_path_params()):
-            return cache_manager.load_cache(self.get_cache_file_path_params())
+        if use_cache and cache_manager.is_cached(self.get_cache_file_path_params(params)):
+            data = self.load_cached_data(self.get_cache_file_path_params(params))
+            if data is not None:
+                metrics.CACHE_REQUESTS.inc(kind="page", result="hit")
+                return data
+        if use_cache:
+            metrics.CACHE_REQUESTS.inc(kind="page", result="miss")
 
-        # Add endpoint to the base url
-        url = f"{self.BASE_URL}{self.get_endpoint()}"
+        # Url the transport requests the endpoint from, only used for logging
+        url = transport.get_url(self.get_endpoint())
 
         # Make API call
         try:
 
-            # Get API data and check for errors
-            response = requests.get(url, params=self.get_params())
-            response.raise_for_status()
-            data = response.json()
+            # Get API data through the transport of the process (see transport.get_transport), over HTTP transient
+            # errors are retried with backoff and every attempt waits for the host wide rate limiter
+            with metrics.UPSTREAM_REQUEST_SECONDS.time() as labels:
+                data = transport.get_transport().get_json(self.get_endpoint(), params)
+                labels["outcome"] = "success"
 
             # Save data to cache file if cache is enabled
             if use_cache:
-                cache_manager.cache_data(self.get_cache_file_path_params(), data)
+                cache_manager.cache_data(self.get_cache_file_path_params(params), data, self.get_ttl_class())
 
             # Return the response in JSON format
             return data
 
         # Error handling if an error occurs during data retrieval
         except requests.exceptions.RequestException as e:
-            logging.error(f"Error retrieving data from {url} with params {self.get_params()}: {e}")
+            logging.error(f"Error retrieving data from {url} with params {params}: {e}")
             return {"error": str(e)}
 
-    # Retrieve all data from endpoint using pagination
-    def get_all_data(self, use_cache: bool = True) -> Dict[str, Any]:
+    # Retrieve all data from endpoint, concurrent retrievals of the same endpoint (in this process or other workers)
+    # are collapsed into a single one whose result is shared
+    def get_all_data(self, use_cache: bool = True, max_workers: Optional[int] = None) -> Dict[str, Any]:
 
         # Return cached file if cache is enabled and cache file exists
         if use_cache and cache_manager.is_cached(self.get_cache_file_path_all()):
-            return cache_manager.load_cache(self.get_cache_file_path_all())
+            data = self.load_cached_data(self.get_cache_file_path_all())
+            if data is not None:
+                metrics.CACHE_REQUESTS.inc(kind="all", result="hit")
+                return data
+        if use_cache:
+            metrics.CACHE_REQUESTS.inc(kind="all", result="miss")
+
+        with metrics.FETCH_ALL_SECONDS.time(resource_type=self.get_resource_type().lower()):
+            data, _ = single_flight.fetch_group.do(self.get_file_name(),
+                                                   lambda: self.fetch_all_data(use_cache=use_cache, max_workers=max_workers))
+        return data
 
-        # Retrieve initial data
-        data = self.get_data(use_cache=False)
+    # Retrieve all data from endpoint using pagination. Each page is cached as it arrives, so an interrupted
+    # retrieval resumes from the missing pages and a fully cached endpoint is assembled without network access.
+    def fetch_all_data(self, use_cache: bool = True, max_workers: Optional[int] = None) -> Dict[str, Any]:
 
-        # Retrieve total number of datapoints if there are no errors during data retrieval
+        # Return cached file if cache is enabled and cache file exists (e.g. retrieved by another worker meanwhile)
+        if use_cache and cache_manager.is_cached(self.get_cache_file_path_all()):
+            data = self.load_cached_data(self.get_cache_file_path_all())
+            if data is not None:
+                return data
+
+        # Bring expired cached data up to date instead of refetching it
+        if use_cache and cache_manager.is_cached(self.get_cache_file_path_all(), include_expired=True):
+            return self.sync_all_data(max_workers=max_workers)[0]
+
+        # Retrieve the first page, which also holds the total number of datapoints
+        self.set_params(self.get_page_params(self.DEFAULT_OFFSET))
+        data = self.get_data(use_cache=use_cache)
+
+        # Return the error if one occurred during data retrieval
         if "error" in data:
             return data
 
         # Retrieve total number of datapoints
         total = int(data.get("MRData", {}).get("total", 0))
 
-        # Get the path of the inner key
-        inner_key_path = json_handler.get_inner_key_path(data, self.get_resource_type())
-
-        # Error handling for inner key identification
-        if not inner_key_path:
-            return {"error": "Inner data path not identified in response"}
-
-        # Extract metadata
-        inner_data = []
-        all_data = json_handler.set_inner_data(data, inner_key_path, inner_data)
-
-        # Set parameters
-        self.set_params({"limit": self.MAXIMUM_LIMIT, "offset": self.DEFAULT_OFFSET})
+        # Get the path of the inner key, returning an error if the inner data cannot be located
+        try:
+            inner_key_path = json_handler.get_inner_key_path(data, self.get_resource_type())
+        except json_handler.InnerKeyPathError as e:
+            logging.error(str(e))
+            return {"error": str(e)}
 
-        # Pagination handler loop
-        for offset in range(0, total, self.get_params()["limit"]):
+        # The first page provides the metadata and the start of the inner data, pages are merged into it
+        inner_data = json_handler.get_inner_data(data, inner_key_path)
+        merger = json_handler.InnerDataMerger(inner_data, inner_key_path[-1])
 
-            # Set offset and retrieve data
-            self.set_params({"limit": self.MAXIMUM_LIMIT, "offset": offset})
-            paginated_data = self.get_data(use_cache=False)
+        # Pagination handler loop, remaining pages are requested concurrently and stitched back in offset order
+        offsets = range(self.MAXIMUM_LIMIT, total, self.MAXIMUM_LIMIT)
+        pages = self.get_pages(offsets, use_cache=use_cache, max_workers=max_workers)
+        for offset, paginated_data in zip(offsets, pages):
 
-            # Error handling
+            # Error handling, a truncated dataset is never returned or cached
             if "error" in paginated_data:
-                logging.warning(f"Error during pagination at offset {offset}")
-                break
+                logging.error(f"Error during pagination at offset {offset}")
+                return {"error": f"Pagination failed at offset {offset}: {paginated_data['error']}"}
 
             # Append data to the inner key list
-            inner_paginated_data = json_handler.get_inner_data(paginated_data, inner_key_path)
-            inner_data = json_handler.extend_inner_data(inner_data, inner_paginated_data)
+            merger.extend(json_handler.get_inner_data(paginated_data, inner_key_path))
 
-        all_data = json_handler.set_inner_data(all_data, inner_key_path, inner_data)
+        all_data = json_handler.set_inner_data(data, inner_key_path, inner_data)
 
-        # Cache data if cache is enabled
+        # Cache data if cache is enabled, the individual pages are no longer needed once assembled
         if use_cache:
-            cache_manager.cache_data(self.get_cache_file_path_all(), all_data)
+            cache_manager.cache_data(self.get_cache_file_path_all(), all_data, self.get_ttl_class())
+            for offset in range(0, total, self.MAXIMUM_LIMIT):
+                cache_manager.remove_cache(self.get_cache_file_path_params(self.get_page_params(offset)))
 
         # Return the paginated data
         return all_data
 
+    # Parameters of the page at the offset, parameters other than pagination are kept
+    def get_page_params(self, offset: int, limit: Optional[int] = None) -> Dict[str, Any]:
+        limit = self.MAXIMUM_LIMIT if limit is None else limit
+        return {**cache_keys.get_query_params(self.get_params()), "limit": limit, "offset": offset}
+
+    # Retrieve the pages at the given offsets using a bounded worker pool, results are returned in offset order
+    def get_pages(self, offsets: range, use_cache: bool = True, max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        max_workers = max(1, max_workers or self.MAX_WORKERS)
+        params = [self.get_page_params(offset) for offset in offsets]
+
+        # Serial retrieval when concurrency is disabled or there is only a single page
+        if max_workers == 1 or len(params) <= 1:
+            return [self.get_data(use_cache=use_cache, params=page_params) for page_params in params]
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(params))) as executor:
+            return list(executor.map(lambda page_params: self.get_data(use_cache=use_cache, params=page_params), params))
+
+    # Retrieve the current total number of datapoints using a single row request
+    def get_total(self) -> Optional[int]:
+        data = self.get_data(use_cache=False, params=self.get_page_params(self.DEFAULT_OFFSET, limit=1))
+        if "error" in data:
+            return None
+        return int(data.get("MRData", {}).get("total", 0))
+
+    # Check whether the endpoint only grows by appending datapoints (e.g. new rounds of the current season)
+    def is_append_only(self) -> bool:
+        return self.get_resource_type().lower() in self.APPEND_ONLY_RESOURCES
+
+    # Refetch all data from the endpoint, replacing the cached data
+    def refresh_all_data(self, max_workers: Optional[int] = None) -> Dict[str, Any]:
+        all_data = self.get_all_data(use_cache=False, max_workers=max_workers)
+        if "error" not in all_data:
+            cache_manager.cache_data(self.get_cache_file_path_all(), all_data, self.get_ttl_class())
+        return all_data
+
+    def sync_all_data(self, max_workers: Optional[int] = None) -> Tuple[Dict[str, Any], Optional[List]]:
+        """
+        Brings the cached data of the endpoint up to date, fetching only the datapoints added since it was cached.
+
+        The cached total is compared with a one row probe and only the new offsets are requested, then merged
+        into the cached data. Endpoints that are not cached, not append only or have shrunk are fully refetched.
+
+        :param max_workers: Maximum number of pages requested concurrently
+        :return: The synced data and the inner data added by the sync (None if the data was fully refetched)
+        """
+        cache_file_path = self.get_cache_file_path_all()
+        if not cache_manager.is_cached(cache_file_path, include_expired=True) or not self.is_append_only():
+            return self.refresh_all_data(max_workers=max_workers), None
+
+        # Compare the cached total with the current total, corrupt cached data is refetched
+        cached_data = self.load_cached_data(cache_file_path)
+        if cached_data is None:
+            return self.refresh_all_data(max_workers=max_workers), None
+        cached_total = int(cached_data.get("MRData", {}).get("total", 0))
+        total = self.get_total()
+
+        # Keep the cached data if the total could not be retrieved or nothing has been added
+        if total is None:
+            return cached_data, []
+        if total == cached_total:
+            cache_manager.renew(cache_file_path)
+            return cached_data, []
+
+        # Fully refetch if datapoints were removed upstream
+        if total < cached_total:
+            logging.warning(f"Total for {self.get_endpoint()} decreased from {cached_total} to {total}, refetching")
+            return self.refresh_all_data(max_workers=max_workers), None
+
+        # Fully refetch if the inner data of the cached data cannot be located
+        try:
+            inner_key_path = json_handler.get_inner_key_path(cached_data, self.get_resource_type())
+        except json_handler.InnerKeyPathError as e:
+            logging.warning(f"{e}, refetching")
+            return self.refresh_all_data(max_workers=max_workers), None
+
+        # Fetch only the new offsets
+        offsets = range(cached_total, total, self.MAXIMUM_LIMIT)
+        new_inner_data = []
+        merger = json_handler.InnerDataMerger(new_inner_data, inner_key_path[-1])
+        for offset, paginated_data in zip(offsets, self.get_pages(offsets, use_cache=False, max_workers=max_workers)):
+            if "error" in paginated_data:
+                logging.error(f"Error during sync at offset {offset}, keeping cached data")
+                return cached_data, []
+            merger.extend(json_handler.get_inner_data(paginated_data, inner_key_path))
+
+        # Merge the new datapoints into the cached data
+        inner_data = json_handler.get_inner_data(cached_data, inner_key_path)
+        inner_data = json_handler.extend_inner_data(inner_data, new_inner_data, inner_key_path[-1])
+        all_data = json_handler.set_inner_data(cached_data, inner_key_path, inner_data)
+        all_data["MRData"]["total"] = str(total)
+        cache_manager.cache_data(cache_file_path, all_data, self.get_ttl_class())
+        logging.info(f"Synced {total - cached_total} new datapoints for {self.get_endpoint()}")
 
-    # Get inner data function using the JSON handler
+        return all_data, new_inner_data
+
+    # Get inner data function using the JSON handler, no data is returned if the retrieval failed
     def get_inner_data(self) -> List:
         data = self.get_all_data()
+        if "error" in data:
+            logging.error(f"No inner data retrieved for {self.get_endpoint()}: {data['error']}")
+            return []
         inner_key_path = json_handler.get_inner_key_path(data, resource_type=self.get_resource_type())
         return json_handler.get_inner_data(data, inner_key_path)
 
-    def get_cache_file_path_params(self) -> Path:
-        return self.CACHE_DIR / f"{self.get_file_name()}_{self.get_params()['limit']}_{self.get_params()['offset']}.json"
+    def get_cache_file_path_params(self, params: Optional[Dict[str, Any]] = None) -> Path:
+        params = params if params is not None else self.get_params()
+        key = cache_keys.canonical_key(self.get_resource_type(), self.get_filters(), params)
+        return self.CACHE_DIR / f"{key}_{params['limit']}_{params['offset']}.json"
 
     def get_cache_file_path_all(self) -> Path:
         return self.CACHE_DIR / f"{self.get_file_name()}_all.json"
 
+    # Load a cache file, returns None if it was corrupt (the entry is removed so the data is retrieved again)
+    @staticmethod
+    def load_cached_data(file_path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            return cache_manager.load_cache(file_path)
+        except cache_manager.CacheCorruptError as e:
+            logging.warning(f"{e}, retrieving it again")
+            return None
+
     def get_cleaned_file_name(self) -> str:
+        return f"{self.get_file_name()}_cleaned.{dp.CLEANED_FORMAT}"
+
+    # File name of cleaned data stored as csv before columnar storage was introduced
+    def get_legacy_cleaned_file_name(self) -> str:
         return f"{self.get_file_name()}_cleaned.csv"
 
+    # Completed seasons never change, anything else (current season or no season filter) is volatile
+    def get_ttl_class(self) -> str:
+        season = str(self.get_filters().get("season", ""))
+        if season.isdigit() and int(season) < datetime.now().year:
+            return cache_manager.TTL_IMMUTABLE
+        return cache_manager.TTL_VOLATILE
+
+    # Canonical key of the request (see cache_keys.canonical_key), requests for the same data share their files
     def get_file_name(self) -> str:
-        return f"{self.get_endpoint().replace('/', '_')}"
+        return cache_keys.canonical_key(self.get_resource_type(), self.get_filters(), self.get_params())
 
-    def get_cleaned_data(self) -> pd.DataFrame:
+    def get_cleaned_data(self, sync: bool = False, columns: Optional[List[str]] = None,
+                         use_local: bool = True) -> pd.DataFrame:
+        """
+        Retrieves the cleaned data of the endpoint, cleaning and storing it if it is not stored yet.
+
+        :param sync: Whether to sync the cached data with the API, only cleaning the rows that were added
+        :param columns: Columns to return (all columns if None), only these columns are read from storage
+        :param use_local: Whether to answer the request from local data of other requests (the warehouse or cached
+            data of a broader request) when its own data is not stored
+        :return: Cleaned data
+        """
+        with metrics.CLEANED_DATA_SECONDS.time(resource_type=self.get_resource_type().lower()) as labels:
+            df, labels["source"] = self._get_cleaned_data(sync, columns, use_local)
+        return df
+
+    # Returns the cleaned data from local data only: the in-memory copy, the stored cleaned data (also once expired),
+    # the warehouse or the local data of a request holding a superset of it (see query_planner). Nothing is synced or
+    # retrieved from the API, None if the data is not available locally.
+    def get_local_cleaned_data(self, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        df = dataframe_cache.cleaned_data_cache.get(self.get_file_name(), columns)
+        if df is not None:
+            return df
+
+        file_name = self.get_cleaned_file_name()
+        try:
+            if dp.is_loaded_csv(file_name):
+                return self.load_cleaned_data(file_name, columns)
+        except cache_manager.CacheCorruptError as e:
+            logging.warning(str(e))
+
+        df = warehouse.query(self.get_resource_type(), self.get_filters())
+        if df is None:
+            df = self.get_superset_data(local_only=True)
+        if df is None or columns is not None and not set(columns) <= set(df.columns):
+            return None
+        return df[columns] if columns is not None else df
+
+    # Retrieves the cleaned data (see get_cleaned_data) along with its source for the metrics: the in-memory cache,
+    # stored cleaned data, a sync, the warehouse, a cached superset, or the cached response (streamed or cleaned)
+    def _get_cleaned_data(self, sync: bool, columns: Optional[List[str]], use_local: bool) -> Tuple[pd.DataFrame, str]:
         file_name = self.get_cleaned_file_name()
 
-        if dp.is_loaded_csv(file_name):
-            return dp.load_from_csv(file_name)
+        # Return the in-memory copy if the cleaned data was loaded recently (it may have been answered locally)
+        if not sync and use_local:
+            df = dataframe_cache.cleaned_data_cache.get(self.get_file_name(), columns)
+            if df is not None:
+                return df, "memory"
+
+        self.migrate_cleaned_data()
+
+        # Expired cleaned data is synced rather than reused
+        sync = sync or cache_manager.is_expired(dp.CLEANED_DIR / file_name)
 
-        flattened_data = dp.preprocess_data(self.get_inner_data())
-        df = dp.convert_to_dataframe(flattened_data)
-        df = dp.convert_to_numeric(df)
-        dp.save_to_csv(df, file_name)
-        return df
\ No newline at end of file
+        # Sync the cached data and only clean the rows that were added, corrupt cleaned data is cleaned again
+        try:
+            if sync and dp.is_loaded_csv(file_name):
+                all_data, new_inner_data = self.sync_all_data()
+
+                # Keep the cleaned data if the sync failed or there is nothing new
+                if "error" in all_data or new_inner_data == []:
+                    cache_manager.renew(dp.CLEANED_DIR / file_name)
+                    return self.load_cleaned_data(file_name, columns), "cleaned"
+
+                # Append the new rows, or clean everything again if the data was fully refetched
+                if new_inner_data is not None:
+                    df = pd.concat([self.load_cleaned_data(file_name), self.clean_data(new_inner_data, self.resource_type)], ignore_index=True)
+                else:
+                    inner_key_path = json_handler.get_inner_key_path(all_data, self.get_resource_type())
+                    df = self.clean_data(json_handler.get_inner_data(all_data, inner_key_path), self.resource_type)
+                self.save_cleaned_data(df, file_name)
+                return (df[columns] if columns is not None else df), "sync"
+
+            if dp.is_loaded_csv(file_name):
+                return self.load_cleaned_data(file_name, columns), "cleaned"
+        except cache_manager.CacheCorruptError as e:
+            logging.warning(f"{e}, cleaning the cached data again")
+
+        # Answer the request with an indexed query of the local warehouse if its season has been synced
+        if not sync and use_local:
+            df = warehouse.query(self.get_resource_type(), self.get_filters())
+            if df is not None:
+                logging.info(f"Answered {self.get_endpoint()} from the warehouse")
+                return (df[columns] if columns is not None else df), "warehouse"
+
+        # Answer the request from the cached data of a broader request (e.g. the results of a driver from the results of
+        # the season) unless the data of the request itself is cached
+        if not sync and use_local and not cache_manager.is_cached(self.get_cache_file_path_all(), include_expired=True):
+            df = self.get_superset_data()
+            if df is not None:
+                return (df[columns] if columns is not None else df), "superset"
+
+        # Cached data is streamed when possible, otherwise it is loaded (or retrieved) as a whole. Nothing is stored if
+        # the data could not be retrieved, so it is retrieved again next time.
+        df, source = self.stream_cleaned_data(), "stream"
+        if df is None:
+            data = self.get_all_data()
+            if "error" in data:
+                logging.error(f"No cleaned data for {self.get_endpoint()}: {data['error']}")
+                return pd.DataFrame(), "error"
+            inner_key_path = json_handler.get_inner_key_path(data, self.get_resource_type())
+            df, source = self.clean_data(json_handler.get_inner_data(data, inner_key_path), self.resource_type), "clean"
+        self.save_cleaned_data(df, file_name)
+        return (df[columns] if columns is not None else df), source
+
+    # Select the cleaned data of the request from the cached data of a request holding a superset of it (see
+    # query_planner), None if no such request is cached. The result is only kept in memory, the superset stays on disk.
+    # With local_only the superset is neither synced nor retrieved and may have expired (see get_local_cleaned_data).
+    def get_superset_data(self, local_only: bool = False) -> Optional[pd.DataFrame]:
+        plan = query_planner.find_plan(self.get_resource_type(), self.get_filters(), include_expired=local_only)
+        if plan is None:
+            return None
+        superset = JolpicaAPI(plan.source_resource_type, filters=plan.source_filters)
+        superset_df = superset.get_local_cleaned_data() if local_only else superset.get_cleaned_data()
+        df = plan.execute(superset_df) if superset_df is not None else None
+        if df is None:
+            return None
+        logging.info(f"Answered {self.get_endpoint()} from cached data using {plan}")
+        dataframe_cache.cleaned_data_cache.put(self.get_file_name(), df, self.get_memory_ttl())
+        return df
+
+    # Clean the cached data while parsing it incrementally, so only STREAM_CHUNK_SIZE entries are held as Python objects
+    # at a time. Returns None if the data is not cached, is too small to stream or holds no inner data.
+    def stream_cleaned_data(self, min_size: Optional[int] = None) -> Optional[pd.DataFrame]:
+        file_path = self.get_cache_file_path_all()
+        min_size = self.STREAM_MIN_SIZE if min_size is None else min_size
+        if json_handler.ijson is None or not cache_manager.is_cached(file_path):
+            return None
+        if cache_manager.get_raw_size(file_path) < min_size:
+            return None
+
+        # Data that cannot be streamed (e.g. a corrupt file, which is removed) is loaded or retrieved as a whole instead,
+        # other errors are not expected and are raised
+        try:
+            with cache_manager.open_cache(file_path) as stream:
+                prefix = json_handler.find_inner_prefix(stream, self.get_resource_type())
+            if prefix is None:
+                return None
+
+            chunks = []
+            with cache_manager.open_cache(file_path) as stream:
+                inner_data = json_handler.iter_inner_data(stream, prefix)
+                while chunk := list(islice(inner_data, self.STREAM_CHUNK_SIZE)):
+                    chunks.append(self.clean_data(chunk, self.resource_type))
+        except (cache_manager.CacheCorruptError, json_handler.ijson.JSONError, *cache_manager.STREAM_ERRORS) as e:
+            logging.warning(f"Streaming cached data from {file_path} failed: {e}")
+            return None
+        if not chunks:
+            return None
+        logging.info(f"Streamed {len(chunks)} chunks of cached data from {file_path}")
+
+        # Columns missing from some chunks are only converted once the chunks are combined
+        return dp.convert_to_numeric(pd.concat(chunks, ignore_index=True), self.resource_type)
+
+    # Convert cleaned data stored as csv to the current cleaned data format
+    def migrate_cleaned_data(self) -> None:
+        file_name, legacy_file_name = self.get_cleaned_file_name(), self.get_legacy_cleaned_file_name()
+        if file_name == legacy_file_name or dp.is_loaded_csv(file_name) or not dp.is_loaded_csv(legacy_file_name):
+            return
+        df = dp.convert_to_numeric(dp.load_from_csv(legacy_file_name), self.resource_type)
+        self.save_cleaned_data(df, file_name)
+        if dp.is_loaded_csv(file_name):
+            cache_manager.remove_cache(dp.CLEANED_DIR / legacy_file_name)
+            logging.info(f"Migrated cleaned data {legacy_file_name} to {file_name}")
+
+    # Load cleaned data, recording the access in the cache index and keeping complete dataframes in memory. Cleaned
+    # data is never stored empty, so unreadable data is removed and CacheCorruptError is raised.
+    def load_cleaned_data(self, file_name: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        with cache_manager.lock_entry(dp.CLEANED_DIR / file_name, shared=True):
+            df = dp.load_cleaned(file_name, columns)
+        if df.empty:
+            cache_manager.remove_cache(dp.CLEANED_DIR / file_name)
+            raise cache_manager.CacheCorruptError(dp.CLEANED_DIR / file_name, "no data could be loaded")
+        cache_manager.touch(dp.CLEANED_DIR / file_name)
+        if columns is None and not df.empty:
+            dataframe_cache.cleaned_data_cache.put(self.get_file_name(), df, self.get_memory_ttl())
+        return df
+
+    # Save cleaned data, register it in the cache index and keep it in memory
+    def save_cleaned_data(self, df: pd.DataFrame, file_name: str) -> None:
+        with cache_manager.lock_entry(dp.CLEANED_DIR / file_name):
+            dp.save_cleaned(df, file_name)
+            saved = dp.is_loaded_csv(file_name)
+            if saved:
+                cache_manager.update_index(dp.CLEANED_DIR / file_name, self.get_ttl_class())
+        if saved:
+            dataframe_cache.cleaned_data_cache.put(self.get_file_name(), df, self.get_memory_ttl())
+
+    # Time in seconds cleaned data may be served from memory, volatile data is reloaded once it would expire
+    def get_memory_ttl(self) -> Optional[float]:
+        return cache_manager.VOLATILE_TTL if self.get_ttl_class() == cache_manager.TTL_VOLATILE else None
+
+    # Flatten the inner data and convert it to a cleaned dataframe
+    @staticmethod
+    def clean_data(inner_data: List, resource_type: Optional[str] = None) -> pd.DataFrame:
+        with metrics.CLEAN_SECONDS.time(resource_type=str(resource_type).lower()):
+            df = dp.flatten_to_dataframe(inner_data, resource_type)
+            df = dp.convert_to_numeric(df, resource_type)
+        metrics.CLEANED_ROWS.inc(len(df), resource_type=str(resource_type).lower())
+        return df
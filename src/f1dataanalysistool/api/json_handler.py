@@ -1,36 +1,137 @@
-from typing import Dict, Any, List, Optional
-
-# Returns the path of the inner data (the actual data)
-def get_inner_key_path(data: Dict[str, Any], resource_type: str) -> Optional[List[str]]:
-    # Resource type input filtering
-    if resource_type.lower() == "qualifying":
-        resource_type = "QualifyingResults"
-    elif resource_type.lower() == "sprint":
-        resource_type = "SprintResults"
-    elif resource_type.lower() == "results":
-        resource_type = "Races"
-
-    def search_inner_keys(nested: Any, target: str, path: Optional[List[str]] = None) -> Optional[List[str]]:
-        path = path or []
-
-        # if the provided dictionary is not a dictionary nor list, return None
-        if not isinstance(nested, (dict, list)):
-            print(f"Target {target} not found in current path: {path}")
-            return None
+import json
+import logging
+from typing import Dict, Any, BinaryIO, Iterator, List, Optional, Set, Tuple
+from f1dataanalysistool.enumeration.resource_types import ResourceType
+
+# Optional incremental JSON parser, cached data is only streamed when it is installed
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Resource types whose registered inner data path has been confirmed by a response
+_validated_paths: Set[str] = set()
+
+class InnerKeyPathError(Exception):
+    """
+    Raised when the inner data of a response cannot be located.
+
+    :param resource_type: Resource type of the response
+    :param reason: Why the inner data could not be located
+    :param path: Path that was tried, if any
+    """
+
+    def __init__(self, resource_type: str, reason: str, path: Optional[List[str]] = None):
+        super().__init__(f"Inner data path for {resource_type} not identified in response: {reason}")
+        self.resource_type = resource_type
+        self.reason = reason
+        self.path = path
+
+# Returns the registered path of the inner data of a resource type, None for unknown resource types
+def get_registered_path(resource_type: str) -> Optional[List[str]]:
+    try:
+        return ResourceType.get_path(resource_type) or None
+    except KeyError:
+        return None
 
+# Returns the key holding the inner data of a resource type
+def get_inner_key(resource_type: str) -> str:
+    path = get_registered_path(resource_type)
+    return path[-1] if path else resource_type
+
+# Check that the path leads to the inner data of the response. A path that cannot be followed to the end because an
+# enclosing list is empty is accepted, but only a complete match confirms the path.
+def validate_inner_key_path(data: Dict[str, Any], path: List[str]) -> Tuple[bool, bool]:
+    nested = data.get("MRData")
+    for key in path:
+        if isinstance(nested, list):
+            if not nested:
+                return True, False
+            nested = nested[0]
+        if not isinstance(nested, dict) or key not in nested:
+            return False, False
+        nested = nested[key]
+    return isinstance(nested, list), isinstance(nested, list)
+
+# Discover the path of the inner data by following the last key of every dictionary until the target key is found
+def discover_inner_key_path(data: Dict[str, Any], target: str) -> Optional[List[str]]:
+    nested, path = data.get("MRData"), []
+    while isinstance(nested, (dict, list)):
         # If the argument is a list, retrieve the first value (will always be a dictionary)
         if isinstance(nested, list):
             nested = nested[0] if nested else None
+        if not isinstance(nested, dict) or not nested:
+            break
+
+        # get the key of the last entry of the dictionary and check if the target has been found
+        last_key = next(reversed(nested))
+        path.append(last_key)
+        if last_key.lower() == target.lower():
+            return path
+        nested = nested[last_key]
+    logging.debug(f"Target {target} not found in current path: {path}")
+    return None
+
+# Returns the path of the inner data (the actual data). The registered path of the resource type is used once it has
+# been validated, other responses fall back to discovery. Raises InnerKeyPathError if the inner data is not found.
+def get_inner_key_path(data: Dict[str, Any], resource_type: str) -> List[str]:
+    if not isinstance(data, dict) or "MRData" not in data:
+        reason = data.get("error", "no MRData in response") if isinstance(data, dict) else "response is not an object"
+        raise InnerKeyPathError(resource_type, reason)
+
+    path = get_registered_path(resource_type)
+    key = resource_type.replace(" ", "").upper()
+    if path is not None:
+        if key in _validated_paths and path[0] in data["MRData"]:
+            return list(path)
+        valid, confirmed = validate_inner_key_path(data, path)
+        if confirmed:
+            _validated_paths.add(key)
+        if valid:
+            return list(path)
+        logging.warning(f"Registered inner data path {path} does not match the response for {resource_type}")
+
+    discovered_path = discover_inner_key_path(data, get_inner_key(resource_type))
+    if discovered_path is None:
+        raise InnerKeyPathError(resource_type, "inner data key not found", path)
+    return discovered_path
 
-        # get the key of the last entry of the dictionary
-        last_key = next(reversed(nested), None) if nested else None
+# Returns the ijson prefix of the inner data array in a JSON stream (e.g. MRData.RaceTable.Races), None if not found
+def find_inner_prefix(stream: BinaryIO, resource_type: str) -> Optional[str]:
+    target = get_inner_key(resource_type).lower()
+    events = ijson.parse(stream)
+    for prefix, event, value in events:
+        if event == "map_key" and value.lower() == target and prefix.split(".")[0] == "MRData":
+            _, next_event, _ = next(events)
+            if next_event == "start_array":
+                return f"{prefix}.{value}"
+    return None
 
-        # Check if the target has been found
-        if last_key and last_key.lower() == target.lower():
-            return path + [last_key]
+# Yields the entries of the inner data array at the prefix of a JSON stream one at a time. Like get_inner_data, only
+# the first entry of enclosing lists is followed (e.g. the laps of the first race)
+def iter_inner_data(stream: BinaryIO, prefix: str) -> Iterator[Dict[str, Any]]:
+    item_prefix = f"{prefix}.item"
 
-        return search_inner_keys(nested.get(last_key, {}), target, path + [last_key])
-    return search_inner_keys(data.get("MRData", {}), resource_type)
+    # Arrays without enclosing lists are parsed by ijson itself
+    if ".item." not in item_prefix:
+        yield from ijson.items(stream, item_prefix, use_float=True)
+        return
+
+    events = ijson.parse(stream, use_float=True)
+    for event_prefix, event, value in events:
+        if event_prefix == prefix and event == "end_array":
+            return
+        if event_prefix == item_prefix and event == "start_map":
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            for event_prefix, event, value in events:
+                builder.event(event, value)
+                if event_prefix == item_prefix and event == "end_map":
+                    break
+            yield builder.value
 
 # Set the inner data and return the common data structure
 def set_inner_data(data: Dict[str, Any], inner_key_path: List[str], inner_data: Any) -> Dict[str, Any]:
@@ -40,6 +141,8 @@ def set_inner_data(data: Dict[str, Any], inner_key_path: List[str], inner_data:
     # Get last key
     last_key = inner_key_path[-1]
     if isinstance(old_inner_data, list):
+        if not old_inner_data:
+            return data
         old_inner_data = old_inner_data[0] # Handles lists if present
     # If last key is in inner data, replace it with the inner data
     if last_key in old_inner_data.keys():
@@ -56,7 +159,10 @@ def get_inner_data(data: Dict[str, Any], inner_key_path: List[str], return_paren
 
     # Loop through the path list until the final value has been found
     for key in inner_key_path[:x]:
+        # An empty enclosing list (e.g. no races) holds no inner data
         if isinstance(inner_data, list):
+            if not inner_data:
+                return []
             inner_data = inner_data[0]
 
         if isinstance(inner_data, dict) and key in inner_data:
@@ -65,50 +171,117 @@ def get_inner_data(data: Dict[str, Any], inner_key_path: List[str], return_paren
     # Return inner data
     return inner_data
 
-# Extend the inner data with additional provided data
-def extend_inner_data(data: List, additional_data: List) -> List:
+# Identifier fields of the entries of each list, dotted fields refer to nested dictionaries. Entries of other lists
+# (or missing an identifier field) are identified by their content.
+MERGE_KEYS = {
+    "Races": ["season", "round"],
+    "StandingsLists": ["season", "round"],
+    "Results": ["number", "Driver.driverId"],
+    "QualifyingResults": ["number", "Driver.driverId"],
+    "SprintResults": ["number", "Driver.driverId"],
+    "DriverStandings": ["Driver.driverId"],
+    "ConstructorStandings": ["Constructor.constructorId"],
+    "Laps": ["number"],
+    "Timings": ["driverId"],
+    "PitStops": ["driverId", "stop"],
+    "Seasons": ["season"],
+    "Circuits": ["circuitId"],
+    "Drivers": ["driverId"],
+    "Constructors": ["constructorId"],
+    "Status": ["statusId"],
+}
+
+# Returns the key of the list holding the entries, inferred from the identifier fields of the first entry
+def infer_list_key(entries: List) -> Optional[str]:
+    if not entries or not isinstance(entries[0], dict):
+        return None
+    for list_key, fields in sorted(MERGE_KEYS.items(), key=lambda item: -len(item[1])):
+        if all(get_field(entries[0], field) is not None for field in fields):
+            return list_key
+    return None
+
+# Returns the value of a (dotted) field of an entry, None if it is missing
+def get_field(entry: Dict[str, Any], field: str) -> Any:
+    value = entry
+    for key in field.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+class InnerDataMerger:
+    """
+    Merges pages of inner data in linear time.
+
+    Entries are identified by the fields in MERGE_KEYS for their list (e.g. the lap number or the driverId of a
+    timing) and looked up in a hash index of the existing entries. New entries are appended, entries that are already
+    present are merged into the existing one: nested lists are merged the same way at any depth (e.g. a lap whose
+    timings are split over two pages) and missing fields are added. The index of every list is kept between calls,
+    so merging many pages into the same data only costs the size of each page.
+
+    :param data: Inner data that pages are merged into
+    :param inner_key: Key of the list holding the inner data (e.g. Races), inferred from the entries if None
+    """
+
+    def __init__(self, data: List, inner_key: Optional[str] = None):
+        self.data = data
+        self.inner_key = inner_key
+        self._indexes: Dict[int, Tuple[List, Dict[Any, Any]]] = {}
+
+    # Merge the additional data into the inner data and return the inner data
+    def extend(self, additional_data: List) -> List:
+        if self.inner_key is None:
+            self.inner_key = infer_list_key(self.data) or infer_list_key(additional_data)
+        self._merge_list(self.data, additional_data, self.inner_key)
+        return self.data
+
+    # Identifier of an entry, its identifier fields if present and otherwise its content
+    @staticmethod
+    def _get_key(entry: Any, list_key: Optional[str]) -> Any:
+        fields = MERGE_KEYS.get(list_key)
+        if fields and isinstance(entry, dict):
+            values = tuple(get_field(entry, field) for field in fields)
+            if None not in values:
+                return values
+        return json.dumps(entry, sort_keys=True, default=str)
+
+    # Returns the index of a list by identifier, built once per list
+    def _get_index(self, entries: List, list_key: Optional[str]) -> Dict[Any, Any]:
+        cached = self._indexes.get(id(entries))
+        if cached is not None and cached[0] is entries:
+            return cached[1]
+        index = {}
+        for entry in entries:
+            index.setdefault(self._get_key(entry, list_key), entry)
+        self._indexes[id(entries)] = (entries, index)
+        return index
+
+    # Merge the additional entries into a list, appending entries that are not present yet
+    def _merge_list(self, entries: List, additional_entries: List, list_key: Optional[str]) -> None:
+        index = self._get_index(entries, list_key)
+        for entry in additional_entries:
+            key = self._get_key(entry, list_key)
+            if key not in index:
+                entries.append(entry)
+                index[key] = entry
+            elif index[key] is not entry and isinstance(entry, dict) and isinstance(index[key], dict):
+                self._merge_entry(index[key], entry)
+
+    # Merge an entry into the existing entry with the same identifier
+    def _merge_entry(self, existing_entry: Dict[str, Any], entry: Dict[str, Any]) -> None:
+        for key, value in entry.items():
+            if key not in existing_entry:
+                existing_entry[key] = value
+            elif isinstance(existing_entry[key], list) and isinstance(value, list):
+                self._merge_list(existing_entry[key], value, key)
+            elif isinstance(existing_entry[key], dict) and isinstance(value, dict):
+                self._merge_entry(existing_entry[key], value)
+
+# Extend the inner data with additional provided data, entries present in both are merged (see InnerDataMerger)
+def extend_inner_data(data: List, additional_data: List, inner_key: Optional[str] = None) -> List:
 
     # Data validation
     if not isinstance(data, list) or not isinstance(additional_data, list):
         raise TypeError(f"Both data arguments must be lists for appending.")
 
-    # Handles empty arguments
-    if not data or not additional_data:
-        return data + additional_data
-
-    # Retrieve the entries that required concatenating
-    last_inner_entry = data[-1]
-    first_additional_entry = additional_data[0]
-
-    # Ensure both elements are dictionaries before merging
-    if not isinstance(last_inner_entry, dict) or not isinstance(first_additional_entry, dict):
-        data.extend(additional_data)
-        return data
-
-    # Find the keys present in both entries
-    common_keys = set(last_inner_entry.keys()) & set(first_additional_entry.keys())
-
-    # if there are no common keys, which means the data is different, extend and return the data
-    if not common_keys:
-        data.extend(additional_data)
-        return data
-
-    # Identify the common data entries
-    common_data_found = any(last_inner_entry[key] == first_additional_entry[key] for key in common_keys)
-
-    # If there are no common data entries, no merging is necessary so extend and return the data
-    if not common_data_found:
-        data.extend(additional_data)
-        return data
-
-    # Ensure that both entries have lists under the common keys
-    for key in common_keys:
-        if isinstance(last_inner_entry[key], list) and isinstance(first_additional_entry[key], list):
-            # Identify unique entries and merge them
-            existing_values = [item for item in last_inner_entry[key] if isinstance(item, dict)]
-            new_values = [item for item in first_additional_entry[key] if isinstance(item, dict) and item not in existing_values]
-            last_inner_entry[key].extend(new_values)
-
-        # Skip first additional entry and extend remaining data
-    data.extend(additional_data[1:])
-    return data
\ No newline at end of file
+    return InnerDataMerger(data, inner_key).extend(additional_data)
@@ -0,0 +1,272 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from f1dataanalysistool.api.atomic_file import write_atomic
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds in seconds of the histogram buckets, from cache hits (milliseconds) to paginated retrievals (minutes)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Directory shared by the worker processes of a server (e.g. gunicorn workers). If set, every process writes its
+# metrics there every FLUSH_INTERVAL seconds and the metrics of all live processes are exported together, otherwise
+# each process exports its own metrics.
+METRICS_DIR = os.environ.get("F1_METRICS_DIR")
+FLUSH_INTERVAL = 5.0
+
+# Escape a label value for the exposition format
+def escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+# Format the labels of a sample, e.g. {resource_type="laps",outcome="success"}
+def format_labels(names: Tuple[str, ...], values: Tuple[Any, ...]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values)) + "}"
+
+class Metric:
+    """
+    Base of counters and histograms: a named metric whose samples are kept per combination of label values.
+
+    Updates only take a lock and touch a dictionary, so the metrics can stay enabled under load.
+
+    :param name: Name of the metric
+    :param documentation: Help text of the metric
+    :param labels: Names of the labels, values are given as keyword arguments on every update
+    """
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._samples: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    # Label values in the order of the label names
+    def get_key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if labels.keys() != set(self.labels):
+            raise ValueError(f"Metric {self.name} expects labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    # Copy of the samples by label values
+    def collect(self) -> Dict[Tuple[str, ...], Any]:
+        with self._lock:
+            return {key: list(value) if isinstance(value, list) else value for key, value in self._samples.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+class Counter(Metric):
+    """
+    Monotonically increasing count, e.g. of cache hits.
+    """
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self.get_key(labels)
+        with self._lock:
+            self._samples[key] = self._samples.get(key, 0) + amount
+        _registry.ensure_flushing()
+
+    # Exposition lines of the given samples
+    def format(self, samples: Dict[Tuple[str, ...], Any]) -> List[str]:
+        return [f"{self.name}{format_labels(self.labels, key)} {value}" for key, value in sorted(samples.items())]
+
+    # Add the samples of another process
+    @staticmethod
+    def merge(samples: Dict[Tuple[str, ...], Any], other: Dict[Tuple[str, ...], Any]) -> None:
+        for key, value in other.items():
+            samples[key] = samples.get(key, 0) + value
+
+class Histogram(Metric):
+    """
+    Distribution of observed values (durations in seconds unless documented otherwise) in cumulative buckets, along
+    with their sum and count.
+
+    :param buckets: Upper bounds of the buckets, a bucket for all values (+Inf) is added
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    # Samples are lists of the count per bucket (not cumulative, the last one is +Inf), the sum and the count
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self.get_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            sample = self._samples.get(key)
+            if sample is None:
+                sample = self._samples[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            sample[index] += 1
+            sample[-2] += value
+            sample[-1] += 1
+        _registry.ensure_flushing()
+
+    # Time the enclosed block. Labels known only at the end of the block (e.g. the outcome) are set in the yielded
+    # dictionary, labels still missing when the block raises are set to "error".
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[Dict[str, Any]]:
+        labels = dict(labels)
+        start = time.perf_counter()
+        try:
+            yield labels
+        except BaseException:
+            for name in self.labels:
+                labels.setdefault(name, "error")
+            raise
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def format(self, samples: Dict[Tuple[str, ...], Any]) -> List[str]:
+        lines = []
+        for key, sample in sorted(samples.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), sample):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{format_labels(self.labels + ('le',), key + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, key)} {sample[-2]}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, key)} {sample[-1]}")
+        return lines
+
+    @staticmethod
+    def merge(samples: Dict[Tuple[str, ...], Any], other: Dict[Tuple[str, ...], Any]) -> None:
+        for key, sample in other.items():
+            samples[key] = [a + b for a, b in zip(samples[key], sample)] if key in samples else list(sample)
+
+class Registry:
+    """
+    Metrics of the application, rendered in the Prometheus text exposition format. With a metrics directory the
+    metrics of every process are written there periodically and merged when rendering.
+
+    :param directory: Directory shared by the processes (None to only export the metrics of this process)
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory) if directory else None
+        self.metrics: Dict[str, Metric] = {}
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    # Start writing the metrics of this process to the metrics directory, once per process. Metrics inherited from
+    # the parent of a forked process are dropped, they are exported by the parent.
+    def ensure_flushing(self) -> None:
+        if self.directory is None or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                for metric in self.metrics.values():
+                    metric.reset()
+            self._pid = os.getpid()
+            threading.Thread(target=self._flush_periodically, daemon=True).start()
+
+    def _flush_periodically(self) -> None:
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(FLUSH_INTERVAL)
+            self.flush()
+
+    # Write the metrics of this process to the metrics directory
+    def flush(self) -> None:
+        snapshot = {name: [[list(key), value] for key, value in metric.collect().items()]
+                    for name, metric in self.metrics.items()}
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            write_atomic(self.directory / f"{os.getpid()}.json", json.dumps(snapshot).encode())
+        except OSError as e:
+            logging.warning(f"Metrics could not be written to {self.directory}: {e}")
+
+    # Samples of the other live processes, files of processes that have exited are removed
+    def _collect_processes(self) -> Iterator[Dict[str, Any]]:
+        for path in self.directory.glob("*.json") if self.directory.exists() else []:
+            if not path.stem.isdigit() or int(path.stem) == os.getpid():
+                continue
+            try:
+                os.kill(int(path.stem), 0)
+            except ProcessLookupError:
+                path.unlink(missing_ok=True)
+                continue
+            except PermissionError:
+                pass
+            try:
+                yield json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+
+    # Render the metrics in the Prometheus text exposition format
+    def render(self) -> str:
+        samples = {name: metric.collect() for name, metric in self.metrics.items()}
+        if self.directory is not None:
+            for snapshot in self._collect_processes():
+                for name, entries in snapshot.items():
+                    if name in self.metrics:
+                        self.metrics[name].merge(samples[name], {tuple(key): value for key, value in entries})
+
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            lines.extend(metric.format(samples[name]))
+        return "\n".join(lines) + "\n"
+
+# Registry of the application
+_registry = Registry(METRICS_DIR)
+
+# Render the metrics of the application (see Registry.render)
+def render() -> str:
+    return _registry.render()
+
+# Retrieval from the API and the response cache
+CACHE_REQUESTS = _registry.counter("f1_cache_requests_total", "Lookups of cached responses by kind (page or all data) "
+                                   "and result (hit or miss)", ("kind", "result"))
+UPSTREAM_REQUEST_SECONDS = _registry.histogram("f1_upstream_request_seconds", "Duration of requests to the API "
+                                               "including retries and rate limiting, by outcome", ("outcome",))
+FETCH_ALL_SECONDS = _registry.histogram("f1_fetch_all_seconds", "Duration of retrievals of all data of an endpoint "
+                                        "that was not cached, by resource type", ("resource_type",))
+
+# Cleaned data
+CLEANED_DATA_SECONDS = _registry.histogram("f1_cleaned_data_seconds", "Duration of get_cleaned_data by resource type "
+                                           "and source of the data", ("resource_type", "source"))
+CLEAN_SECONDS = _registry.histogram("f1_clean_seconds", "Duration of flattening and converting inner data to cleaned "
+                                    "data, by resource type", ("resource_type",))
+CLEANED_ROWS = _registry.counter("f1_cleaned_rows_total", "Rows of cleaned data produced, by resource type",
+                                 ("resource_type",))
+
+# Analysis and plotting
+ANALYSIS_SECONDS = _registry.histogram("f1_analysis_seconds", "Duration of run_analysis by analysis function and "
+                                       "outcome", ("function", "outcome"))
+PLOT_SECONDS = _registry.histogram("f1_plot_seconds", "Duration of building a chart with plot_chart by mode and chart "
+                                   "type", ("mode", "chart_type"))
+SAVE_PLOT_SECONDS = _registry.histogram("f1_save_plot_seconds", "Duration of save_plot by mode and file format",
+                                        ("mode", "file_format"))
@@ -0,0 +1,194 @@
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import pandas as pd
+import f1dataanalysistool.api.cache_keys as cache_keys
+import f1dataanalysistool.api.cache_manager as cache_manager
+import f1dataanalysistool.api.data_preprocessing as dp
+from f1dataanalysistool.enumeration.resource_types import ResourceType
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Define the directory of cached responses
+CACHE_DIR = Path(__file__).resolve().parent.parent.parent / "data/cache"
+
+# Column of the cleaned data holding the value of each filter, per resource type. Filters without a column (e.g. status,
+# whose identifier is not part of the data) can only be answered by the API.
+FILTER_COLUMNS = {
+    "results": {"season": "season", "round": "round", "circuits": "Circuit.circuitId",
+                "constructors": "Results.Constructor.constructorId", "drivers": "Results.Driver.driverId",
+                "fastest": "Results.FastestLap.rank", "grid": "Results.grid", "results": "Results.position"},
+    "races": {"season": "season", "round": "round", "circuits": "Circuit.circuitId"},
+    "qualifying": {"constructors": "Constructor.constructorId", "drivers": "Driver.driverId"},
+    "laps": {"drivers": "Timings.driverId", "laps": "number"},
+    "pitstops": {"drivers": "driverId", "laps": "lap", "pitstops": "stop"},
+    "driverstandings": {"drivers": "Driver.driverId", "position": "position"},
+    "constructorstandings": {"constructors": "Constructor.constructorId", "position": "position"},
+}
+
+# Filters whose values are numbers, other values (e.g. "last") cannot be matched against the data
+NUMERIC_FILTERS = ["season", "round", "fastest", "grid", "results", "laps", "pitstops", "position"]
+
+# Resource types derived from the data of another resource type: source resource type, prefix of the derived columns
+# and identifier column of the derived entries
+DERIVED_RESOURCES = {
+    "drivers": ("results", "Results.Driver.", "driverId"),
+    "constructors": ("results", "Results.Constructor.", "constructorId"),
+}
+
+# Requests parsed from the file names of each directory and the identity of the directory they were parsed from, the
+# directory is listed again only when a file was added or removed (see list_requests)
+_listings: Dict[Path, Tuple[Tuple[int, int], List[Tuple[Path, str, Tuple[str, Dict[str, str]]]]]] = {}
+
+class QueryPlan:
+    """
+    Answers a request from the cleaned data of a cached request holding a superset of its data.
+
+    :param resource_type: Resource type of the request
+    :param source_resource_type: Resource type of the cached request
+    :param source_filters: Filters of the cached request
+    :param local_filters: Values to select per column of the cached data
+    """
+
+    def __init__(self, resource_type: str, source_resource_type: str, source_filters: Dict[str, str],
+                 local_filters: Dict[str, str]):
+        self.resource_type = resource_type
+        self.source_resource_type = source_resource_type
+        self.source_filters = source_filters
+        self.local_filters = local_filters
+
+    # Select the data of the request from the cleaned data of the cached request, None if it cannot be selected
+    def execute(self, df: pd.DataFrame) -> Optional[pd.DataFrame]:
+        if df.empty or any(column not in df.columns for column in self.local_filters):
+            return None
+
+        mask = pd.Series(True, index=df.index)
+        for column, value in self.local_filters.items():
+            mask &= match_column(df[column], value)
+        df = df[mask].reset_index(drop=True)
+
+        # Columns without values for the request are dropped and numbers downcast again, like the data of a direct
+        # request (e.g. positions of the superset are floats if a driver retired, those of a single driver may not be)
+        if not df.empty:
+            df = df.dropna(axis=1, how="all")
+            for column in df.columns:
+                if pd.api.types.is_numeric_dtype(df[column]) and not pd.api.types.is_bool_dtype(df[column]):
+                    df[column] = dp.downcast_numeric(df[column])
+
+        if self.resource_type in DERIVED_RESOURCES:
+            df = derive(df, self.resource_type)
+        return df
+
+    def __repr__(self) -> str:
+        return (f"QueryPlan({self.resource_type} from {self.source_resource_type} {self.source_filters}"
+                f" where {self.local_filters})")
+
+# Returns whether the values of a column match a normalised filter value
+def match_column(series: pd.Series, value: str) -> pd.Series:
+    if pd.api.types.is_numeric_dtype(series) and value.isdigit():
+        return series == int(value)
+    return series.astype(str).str.lower() == value
+
+# Derive the entries of a resource type from the cleaned data of its source resource type (e.g. drivers from results),
+# in order of their first appearance
+def derive(df: pd.DataFrame, resource_type: str) -> pd.DataFrame:
+    _, prefix, identifier = DERIVED_RESOURCES[resource_type]
+    columns = [column for column in df.columns if column.startswith(prefix)]
+    df = df[columns].rename(columns=lambda column: column[len(prefix):])
+    if identifier not in df.columns:
+        return pd.DataFrame()
+    df = df.drop_duplicates(subset=identifier).reset_index(drop=True)
+    return dp.convert_to_numeric(df, resource_type)
+
+# Inner data of these resource types only covers the first race of a response, so only single race data is a superset
+def covers_first_race_only(resource_type: str) -> bool:
+    path = ResourceType.get_path(resource_type)
+    return len(path) > 2 and path[-2] == "Races"
+
+# Returns the files of a directory holding the data of a request with the key and the parsed request: complete
+# responses in the cache directory and cleaned data in the cleaned directory
+def list_requests(directory: Path) -> List[Tuple[Path, str, Tuple[str, Dict[str, str]]]]:
+    try:
+        stat = directory.stat()
+    except OSError:
+        return []
+    identity = (stat.st_ino, stat.st_mtime_ns)
+    listing = _listings.get(directory)
+    if listing is not None and listing[0] == identity:
+        return listing[1]
+
+    requests = []
+    kind = "all.json" if directory == CACHE_DIR else "cleaned."
+    for path in directory.glob("*"):
+        match = cache_keys.FILE_NAME_PATTERN.match(path.name)
+        if match is None or path.name.startswith(".") or not match["kind"].startswith(kind):
+            continue
+        request = cache_keys.parse_key(match["base"])
+        if request is not None:
+            requests.append((path, match["base"], request))
+    _listings[directory] = (identity, requests)
+    return requests
+
+# Returns the cached requests whose data is available without the API, by key. Cleaned data and complete responses
+# are considered, expired ones only if include_expired is set (otherwise they would be synced first).
+def get_cached_requests(include_expired: bool = False) -> Dict[str, Tuple[str, Dict[str, str]]]:
+    requests = {}
+    index = cache_manager.get_index()
+    for directory in [dp.CLEANED_DIR, CACHE_DIR]:
+        for path, key, (resource_type, filters) in list_requests(directory):
+            entry = index.get(path)
+            if entry is None or include_expired or not cache_manager.is_expired(path, entry):
+                requests[key] = (resource_type, dict(filters))
+    return requests
+
+# Returns the columns and values selecting the data of a request from the data of a cached request, None if the cached
+# request does not hold a superset of the data (its filters must be a subset of the filters of the request and every
+# other filter must be answerable from a column)
+def get_local_filters(source_resource_type: str, source_filters: Dict[str, str],
+                      filters: Dict[str, str]) -> Optional[Dict[str, str]]:
+    if any(filters.get(key) != value for key, value in source_filters.items()):
+        return None
+    if covers_first_race_only(source_resource_type) and not {"season", "round"} <= source_filters.keys():
+        return None
+
+    local_filters = {}
+    for key, value in filters.items():
+        if key in source_filters:
+            continue
+        column = FILTER_COLUMNS.get(source_resource_type, {}).get(key)
+        if column is None or key in NUMERIC_FILTERS and not value.isdigit():
+            return None
+        local_filters[column] = value
+    return local_filters
+
+# Returns the plan answering a request from cached data, None if no cached request holds a superset of its data. The
+# most specific superset is used, data of the same resource type is preferred over derived data. Expired cached
+# requests are only considered if include_expired is set.
+def find_plan(resource_type: str, filters: Optional[Dict[str, Any]] = None,
+              include_expired: bool = False) -> Optional[QueryPlan]:
+    resource_type = cache_keys.normalise_resource_type(resource_type)
+    filters = {key: cache_keys.normalise_value(value) for key, value in (filters or {}).items() if value}
+    key = cache_keys.canonical_key(resource_type, filters)
+
+    plans: List[Tuple[Tuple[bool, int], QueryPlan]] = []
+    for cached_key, (source_resource_type, source_filters) in get_cached_requests(include_expired).items():
+        source_resource_type = cache_keys.normalise_resource_type(source_resource_type)
+        if cached_key == key:
+            continue
+
+        derived = source_resource_type != resource_type
+        if derived:
+            # Derived entries are only complete for a season (e.g. drivers without a race start are not in results)
+            source = DERIVED_RESOURCES.get(resource_type)
+            if source is None or source[0] != source_resource_type or "season" not in source_filters:
+                continue
+
+        local_filters = get_local_filters(source_resource_type, source_filters, filters)
+        if local_filters is not None:
+            plan = QueryPlan(resource_type, source_resource_type, source_filters, local_filters)
+            plans.append(((derived, len(local_filters)), plan))
+
+    if not plans:
+        return None
+    return min(plans, key=lambda item: item[0])[1]
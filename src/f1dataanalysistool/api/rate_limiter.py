@@ -0,0 +1,104 @@
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from f1dataanalysistool.api.file_lock import FileLock
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Define the directory holding the shared limiter state
+LOCKS_DIR = Path(__file__).resolve().parent.parent.parent / "data/locks"
+LOCKS_DIR.mkdir(parents=True, exist_ok=True)
+
+# Jolpica limits: bursts of 4 requests per second and 500 requests per hour sustained
+BURST_RATE = 4.0
+BURST_CAPACITY = 4
+SUSTAINED_RATE = 500 / 3600
+SUSTAINED_CAPACITY = 500
+
+# Fraction of the upstream limits used, keeps aggregate throughput just under the limit
+HEADROOM = 0.9
+
+class RateLimiter:
+    """
+    Token bucket rate limiter whose state lives in a locked file, so all processes on the host share one budget.
+
+    Each bucket is given as (name, rate in tokens per second, capacity). Acquiring reserves a token immediately,
+    letting the bucket go negative, and sleeps until the reservation is due. Concurrent callers are therefore
+    queued at a steady rate instead of retrying in bursts.
+
+    :param state_file: Path of the shared state file
+    :param buckets: List of (name, rate, capacity) tuples
+    """
+
+    def __init__(self, state_file: Path, buckets: List[Tuple[str, float, float]]):
+        self.state_file = Path(state_file)
+        self.lock_file = self.state_file.with_suffix(".lock")
+        self.buckets = buckets
+
+    # Load the bucket state, missing or unreadable state starts with full buckets
+    def _load_state(self, now: float) -> Dict[str, Dict[str, float]]:
+        try:
+            state = json.loads(self.state_file.read_text())
+        except (OSError, ValueError):
+            state = {}
+        for name, _, capacity in self.buckets:
+            state.setdefault(name, {"tokens": capacity, "timestamp": now})
+        return state
+
+    # Add the tokens accumulated since the last update to each bucket
+    def _refill(self, state: Dict[str, Dict[str, float]], now: float) -> None:
+        for name, rate, capacity in self.buckets:
+            bucket = state[name]
+            elapsed = max(0.0, now - bucket["timestamp"])
+            bucket["tokens"] = min(capacity, bucket["tokens"] + elapsed * rate)
+            bucket["timestamp"] = now
+
+    # Time in seconds until the bucket state allows another request
+    def _wait_time(self, state: Dict[str, Dict[str, float]], tokens_needed: float) -> float:
+        return max([0.0] + [(tokens_needed - state[name]["tokens"]) / rate for name, rate, _ in self.buckets])
+
+    # Current wait time in seconds before a new request would be allowed
+    def get_wait_time(self) -> float:
+        with FileLock(self.lock_file, shared=True):
+            now = time.time()
+            state = self._load_state(now)
+        self._refill(state, now)
+        return self._wait_time(state, 1)
+
+    # Reserve a token in every bucket and return the time in seconds until the reservation is due
+    def reserve(self) -> float:
+        with FileLock(self.lock_file):
+            now = time.time()
+            state = self._load_state(now)
+            self._refill(state, now)
+            for name, _, _ in self.buckets:
+                state[name]["tokens"] -= 1
+            self.state_file.write_text(json.dumps(state))
+        return self._wait_time(state, 0)
+
+    # Block until a request is allowed
+    def acquire(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            logging.info(f"Rate limit reached, waiting {wait:.2f}s before the next request")
+            time.sleep(wait)
+        return wait
+
+# Lazily created limiter shared by all API instances in the process
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+# Returns the host wide limiter for the Jolpica API
+def get_rate_limiter() -> RateLimiter:
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(LOCKS_DIR / "jolpica_rate_limit.json", [
+                ("burst", BURST_RATE * HEADROOM, BURST_CAPACITY),
+                ("sustained", SUSTAINED_RATE * HEADROOM, SUSTAINED_CAPACITY),
+            ])
+        return _limiter
@@ -0,0 +1,82 @@
+import copy
+import logging
+import re
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+from f1dataanalysistool.api.file_lock import FileLock
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Define the directory holding the lock files of calls in flight
+LOCKS_DIR = Path(__file__).resolve().parent.parent.parent / "data/locks/single_flight"
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into a single execution.
+
+    Within a process the first caller becomes the leader and runs the function, later callers wait for its result
+    and receive a deep copy of it. The leader also holds an exclusive lock file for the key while running, so a
+    leader in another worker process waits for it to finish first. The function should therefore check the cache
+    before doing any work, so that leaders which waited for another process find the result there.
+
+    Calls made by a leader for its own key (e.g. a forced refresh while syncing) run directly.
+
+    :param lock_dir: Directory of the lock files
+    """
+
+    def __init__(self, lock_dir: Path = LOCKS_DIR):
+        self.lock_dir = Path(lock_dir)
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.leaders = 0
+        self.followers = 0
+
+    # Run the function once for all concurrent callers of the key, returns the result and whether it was shared
+    def do(self, key: str, function: Callable[[], Any]) -> Tuple[Any, bool]:
+        held = self._local.__dict__.setdefault("held", set())
+        if key in held:
+            return function(), False
+
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        # Followers wait for the leader, the result is copied as callers may modify it
+        if not leader:
+            logging.info(f"Waiting for the call in flight for {key}")
+            return copy.deepcopy(future.result()), True
+
+        held.add(key)
+        try:
+            with FileLock(self.get_lock_file(key)):
+                result = function()
+            future.set_result(result)
+            return result, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            held.discard(key)
+            with self._lock:
+                del self._calls[key]
+
+    # Lock file of a key
+    def get_lock_file(self, key: str) -> Path:
+        return self.lock_dir / f"{re.sub(r'[^A-Za-z0-9_.-]', '_', key)}.lock"
+
+    # Returns the number of executions and of calls that shared the result of another call
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"leaders": self.leaders, "followers": self.followers, "in_flight": len(self._calls)}
+
+# Process wide group coalescing the retrieval of complete endpoints
+fetch_group = SingleFlight()
@@ -0,0 +1,148 @@
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlsplit
+from f1dataanalysistool.api.transport import RECORDINGS_DIR, RecordingStore
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Path prefix of the Jolpica API, endpoints are served with or without it
+PATH_PREFIX = "/ergast/f1/"
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Answers GET requests with the recorded response of the endpoint and parameters, 404 if it was not recorded.
+    """
+
+    server: "StandInServer"
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        endpoint = url.path[len(PATH_PREFIX):] if url.path.startswith(PATH_PREFIX) else url.path
+        params = dict(parse_qsl(url.query))
+        status, body, headers = self.server.respond(endpoint, params)
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Requests are counted by the server, the default access log would flood benchmarks
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the Jolpica API serving recorded responses (see transport.RecordingStore), so the retrieval
+    of the application can be tested and benchmarked reproducibly without network access. Point the application at it
+    with JOLPICA_BASE_URL (e.g. http://127.0.0.1:8000/ergast/f1/).
+
+    Upstream conditions are simulated per request: a latency, a fraction of failed requests and a rate limit answered
+    with 429 and Retry-After like the API. Failures are drawn from a seeded random generator so runs are repeatable.
+
+    :param store: Store holding the recorded responses
+    :param address: Host and port to listen on, port 0 picks a free port
+    :param latency: Seconds each response is delayed
+    :param jitter: Maximum seconds added to the latency at random
+    :param error_rate: Fraction of requests answered with 503
+    :param rate_limit: Maximum requests per second, further requests are answered with 429 (unlimited if None)
+    :param seed: Seed of the random generator of jitter and failures
+    """
+
+    daemon_threads = True
+
+    def __init__(self, store: RecordingStore, address: tuple = ("127.0.0.1", 0), latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, rate_limit: Optional[float] = None, seed: int = 0):
+        super().__init__(address, StandInHandler)
+        self.store = store
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.random = random.Random(seed)
+        self.requests: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._allowance = self.get_capacity()
+        self._checked_at = time.monotonic()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{PATH_PREFIX}"
+
+    # Capacity of the token bucket: one second of requests, but at least one request so limits below one request per
+    # second are still served
+    def get_capacity(self) -> float:
+        return max(1.0, self.rate_limit) if self.rate_limit is not None else 0.0
+
+    # Token bucket refilled at rate_limit tokens per second
+    def is_rate_limited(self) -> bool:
+        if self.rate_limit is None:
+            return False
+        now = time.monotonic()
+        self._allowance = min(self.get_capacity(), self._allowance + (now - self._checked_at) * self.rate_limit)
+        self._checked_at = now
+        if self._allowance < 1:
+            return True
+        self._allowance -= 1
+        return False
+
+    # Returns the status, body and headers of the response to a request
+    def respond(self, endpoint: str, params: Dict[str, str]) -> tuple:
+        with self._lock:
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            failed = self.random.random() < self.error_rate
+            limited = self.is_rate_limited()
+            self.requests.append({"endpoint": endpoint, "params": params, "failed": failed, "limited": limited})
+        time.sleep(delay)
+
+        if limited:
+            return 429, json.dumps({"error": "rate limited"}).encode(), {"Retry-After": str(1 / self.rate_limit)}
+        if failed:
+            return 503, json.dumps({"error": "injected failure"}).encode(), {}
+        data = self.store.load(endpoint, params)
+        if data is None:
+            return 404, json.dumps({"error": f"no recording of {endpoint} with params {params}"}).encode(), {}
+        return 200, json.dumps(data).encode(), {}
+
+    # Serve in a background thread, returns the thread (stop with shutdown)
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+# Command line entry point (f1-standin-server)
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="f1-standin-server", description="Serve recorded Jolpica API responses")
+    parser.add_argument("--recordings-dir", type=Path, default=RECORDINGS_DIR, help="Directory of the recordings")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds each response is delayed")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Maximum seconds added to the latency at random")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--rate-limit", type=float, help="Maximum requests per second, further requests get 429")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the simulated jitter and failures")
+    args = parser.parse_args(argv)
+
+    server = StandInServer(RecordingStore(args.recordings_dir), (args.host, args.port), args.latency, args.jitter,
+                           args.error_rate, args.rate_limit, args.seed)
+    logging.info(f"Serving recordings of {args.recordings_dir} at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
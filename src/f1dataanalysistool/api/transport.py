@@ -0,0 +1,165 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+import requests
+import f1dataanalysistool.api.http_session as http_session
+import f1dataanalysistool.api.rate_limiter as rate_limiter
+from f1dataanalysistool.api.atomic_file import write_atomic
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Base url of the Jolpica-F1 API, JOLPICA_BASE_URL points the application at another server (e.g. the stand-in server)
+DEFAULT_BASE_URL = "https://api.jolpi.ca/ergast/f1/"
+BASE_URL = os.environ.get("JOLPICA_BASE_URL", DEFAULT_BASE_URL)
+
+# Transport used by the application (http, record or replay, see get_transport) and the directory of recordings
+TRANSPORT = os.environ.get("F1_TRANSPORT", "http").lower()
+RECORDINGS_DIR = Path(os.environ.get("F1_RECORDINGS_DIR", Path(__file__).resolve().parent.parent.parent / "data/recordings"))
+
+class RecordingNotFoundError(requests.exceptions.RequestException):
+    """
+    Raised when a request is replayed that was never recorded, handled like any other failed request.
+
+    :param endpoint: Endpoint of the request
+    :param params: Parameters of the request
+    """
+
+    def __init__(self, endpoint: str, params: Optional[Dict[str, Any]] = None):
+        self.endpoint = endpoint
+        self.params = params
+        super().__init__(f"No recording of {endpoint} with params {params}")
+
+class RecordingStore:
+    """
+    Responses of the API stored as one JSON file per request, keyed by the endpoint and the parameters.
+
+    The base url is not part of the key, so responses recorded from the API are replayed against any server.
+
+    :param directory: Directory holding the recordings
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+    # Normalise an endpoint given with or without leading slash, .json suffix and casing
+    @staticmethod
+    def normalise_endpoint(endpoint: str) -> str:
+        endpoint = endpoint.strip("/").lower()
+        return endpoint[:-len(".json")] if endpoint.endswith(".json") else endpoint
+
+    # Path of the recording of a request: the readable endpoint and a hash of the parameters
+    def get_path(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Path:
+        endpoint = self.normalise_endpoint(endpoint)
+        params = json.dumps({key: str(value) for key, value in (params or {}).items()}, sort_keys=True)
+        digest = hashlib.sha1(f"{endpoint}?{params}".encode()).hexdigest()[:12]
+        return self.directory / f"{re.sub(r'[^a-z0-9]+', '_', endpoint)}_{digest}.json"
+
+    # Load the recorded response of a request, None if it was not recorded
+    def load(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        path = self.get_path(endpoint, params)
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["data"]
+
+    # Record the response of a request
+    def save(self, endpoint: str, params: Optional[Dict[str, Any]], data: Dict[str, Any]) -> None:
+        recording = {"endpoint": self.normalise_endpoint(endpoint), "params": params or {}, "data": data}
+        self.directory.mkdir(parents=True, exist_ok=True)
+        write_atomic(self.get_path(endpoint, params), json.dumps(recording).encode())
+
+class HttpTransport:
+    """
+    Retrieves responses from a server over HTTP with the pooled session of http_session.
+
+    :param base_url: Base url the endpoints are appended to
+    :param rate_limited: Whether requests wait for the host wide rate limiter of the Jolpica API
+    """
+
+    def __init__(self, base_url: str = BASE_URL, rate_limited: bool = True):
+        self.base_url = base_url if base_url.endswith("/") else f"{base_url}/"
+        self.rate_limited = rate_limited
+
+    def get_json(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        limiter = rate_limiter.get_rate_limiter() if self.rate_limited else None
+        return http_session.get_json(self.get_url(endpoint), params=params, rate_limiter=limiter)
+
+    def get_url(self, endpoint: str) -> str:
+        return f"{self.base_url}{endpoint}"
+
+class RecordingTransport:
+    """
+    Retrieves responses with another transport and records every successful response.
+
+    :param transport: Transport retrieving the responses
+    :param store: Store the responses are recorded in
+    """
+
+    def __init__(self, transport: Any, store: RecordingStore):
+        self.transport = transport
+        self.store = store
+
+    def get_json(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        data = self.transport.get_json(endpoint, params)
+        self.store.save(endpoint, params, data)
+        return data
+
+    def get_url(self, endpoint: str) -> str:
+        return get_url(endpoint, self.transport)
+
+class ReplayTransport:
+    """
+    Answers requests with recorded responses only, requests that were not recorded fail.
+
+    :param store: Store holding the recorded responses
+    """
+
+    def __init__(self, store: RecordingStore):
+        self.store = store
+
+    def get_json(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        data = self.store.load(endpoint, params)
+        if data is None:
+            raise RecordingNotFoundError(endpoint, params)
+        return data
+
+# Transport shared by all API instances in the process, created from the environment on first use
+_transport: Optional[Any] = None
+_transport_lock = threading.Lock()
+
+# Build the transport selected by F1_TRANSPORT. Only requests to the Jolpica API itself are rate limited.
+def create_transport(name: str = TRANSPORT, base_url: str = BASE_URL, recordings_dir: Path = RECORDINGS_DIR) -> Any:
+    http = HttpTransport(base_url, rate_limited=base_url == DEFAULT_BASE_URL)
+    if name == "http":
+        return http
+    if name == "record":
+        return RecordingTransport(http, RecordingStore(recordings_dir))
+    if name == "replay":
+        return ReplayTransport(RecordingStore(recordings_dir))
+    raise ValueError(f"Unknown transport {name}, expected http, record or replay")
+
+# Returns the transport of the process
+def get_transport() -> Any:
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = create_transport()
+        return _transport
+
+# Returns the url an endpoint is requested from by a transport (by default the transport of the process), transports
+# without a url (e.g. replayed recordings) return the endpoint itself
+def get_url(endpoint: str, transport: Optional[Any] = None) -> str:
+    transport = transport if transport is not None else get_transport()
+    return transport.get_url(endpoint) if hasattr(transport, "get_url") else endpoint
+
+# Replace the transport of the process (None restores the transport selected by the environment)
+def set_transport(transport: Optional[Any]) -> None:
+    global _transport
+    with _transport_lock:
+        _transport = transport
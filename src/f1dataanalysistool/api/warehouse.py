@@ -0,0 +1,348 @@
+import argparse
+import json
+import logging
+import re
+import sqlite3
+import time
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import pandas as pd
+import f1dataanalysistool.api.cache_keys as cache_keys
+import f1dataanalysistool.api.cache_manager as cache_manager
+import f1dataanalysistool.api.data_preprocessing as dp
+from f1dataanalysistool.api.query_planner import FILTER_COLUMNS, NUMERIC_FILTERS
+from f1dataanalysistool.enumeration.resource_types import ResourceType
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Define the warehouse file, an SQLite database holding the cleaned data of synced seasons
+WAREHOUSE_FILE = Path(__file__).resolve().parent.parent.parent / "data/warehouse.sqlite"
+
+# Dimension tables shared by all resource types and their key column
+DIMENSIONS = {"drivers": "driverId", "constructors": "constructorId", "circuits": "circuitId"}
+
+# Fact table of each resource type. Columns of the cleaned data starting with a dimension prefix are stored in the
+# dimension table (only its key is kept in the fact table). If the entries of a resource type have a prefix (e.g. the
+# Results of a race), the other columns describe the race and are stored in the races table.
+FACT_TABLES = {
+    "races": {"table": "races", "key": ["season", "round"], "dimensions": {"Circuit.": "circuits"}},
+    "results": {"table": "results", "entry_prefix": "Results.",
+                "dimensions": {"Results.Driver.": "drivers", "Results.Constructor.": "constructors", "Circuit.": "circuits"}},
+    "qualifying": {"table": "qualifying", "dimensions": {"Driver.": "drivers", "Constructor.": "constructors"}},
+    "sprint": {"table": "sprint_results", "dimensions": {"Driver.": "drivers", "Constructor.": "constructors"}},
+    "laps": {"table": "laps"},
+    "pitstops": {"table": "pitstops"},
+    "driverstandings": {"table": "driver_standings", "dimensions": {"Driver.": "drivers"}},
+    "constructorstandings": {"table": "constructor_standings", "dimensions": {"Constructor.": "constructors"}},
+    "seasons": {"table": "seasons"},
+    "status": {"table": "status"},
+}
+
+# Resource types answered from a dimension table, restricted to the entries referenced by a fact table for the filters
+DIMENSION_SOURCES = {
+    "drivers": ("results", "Results.Driver.driverId"),
+    "constructors": ("results", "Results.Constructor.constructorId"),
+    "circuits": ("races", "Circuit.circuitId"),
+}
+
+# Resource types whose data covers a single race and is synced per round, standings are synced per round and for the
+# season (round 0, the rows are stored under the latest round they hold). Other resource types are synced per season.
+ROUND_RESOURCES = ["qualifying", "sprint", "laps", "pitstops"]
+STANDINGS_RESOURCES = ["driverstandings", "constructorstandings"]
+
+# Quote an identifier, cleaned column names contain dots
+def quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+# Open the warehouse, the database is created on first use
+def connect() -> sqlite3.Connection:
+    WAREHOUSE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(WAREHOUSE_FILE, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("CREATE TABLE IF NOT EXISTS _synced (resource TEXT, season INTEGER, round INTEGER, "
+                       "synced_at REAL, PRIMARY KEY (resource, season, round))")
+    connection.execute("CREATE TABLE IF NOT EXISTS _columns (resource TEXT PRIMARY KEY, columns TEXT)")
+    return connection
+
+# Returns the season and round a request is synced under, None if it cannot be answered by the warehouse (e.g. no
+# season). Season level data is synced under round 0.
+def get_context(resource_type: str, filters: Dict[str, str]) -> Optional[Tuple[int, int]]:
+    season, round_number = filters.get("season", ""), filters.get("round", "")
+    if not season.isdigit():
+        return None
+    if resource_type in ROUND_RESOURCES:
+        return (int(season), int(round_number)) if round_number.isdigit() else None
+    if resource_type in STANDINGS_RESOURCES:
+        if round_number and not round_number.isdigit():
+            return None
+        return int(season), int(round_number or 0)
+    return int(season), 0
+
+# Check if synced data is still fresh, completed seasons never change and later seasons expire like cached data
+def is_fresh(season: int, synced_at: float) -> bool:
+    return season < datetime.now().year or time.time() - synced_at <= cache_manager.VOLATILE_TTL
+
+# Returns the columns of a table, empty if the table does not exist
+def get_columns(connection: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in connection.execute(f"PRAGMA table_info({quote(table)})")]
+
+# Create a table or add the missing columns, indexes are added on the season, round, driverId and constructorId columns
+def ensure_table(connection: sqlite3.Connection, table: str, columns: List[str], key: Optional[List[str]] = None) -> None:
+    existing = get_columns(connection, table)
+    if not existing:
+        primary_key = f", PRIMARY KEY ({', '.join(map(quote, key))})" if key else ""
+        connection.execute(f"CREATE TABLE {quote(table)} ({', '.join(map(quote, columns))}{primary_key})")
+    for column in columns:
+        if column not in existing and existing:
+            connection.execute(f"ALTER TABLE {quote(table)} ADD COLUMN {quote(column)}")
+
+    indexes = [["season", "round"]] if {"season", "round"} <= set(columns) else []
+    indexes += [[column] for column in columns if column.endswith(("driverId", "constructorId")) and column not in (key or [])]
+    for index in indexes:
+        name = re.sub(r"\W", "_", f"idx_{table}_{'_'.join(index)}")
+        connection.execute(f"CREATE INDEX IF NOT EXISTS {quote(name)} ON {quote(table)} ({', '.join(map(quote, index))})")
+
+# Write rows to a table, rows with an existing key are updated (only the given columns)
+def write_rows(connection: sqlite3.Connection, table: str, df: pd.DataFrame, key: Optional[List[str]] = None) -> None:
+    if df.empty:
+        return
+    columns = [str(column) for column in df.columns]
+    ensure_table(connection, table, columns, key)
+    sql = f"INSERT INTO {quote(table)} ({', '.join(map(quote, columns))}) VALUES ({', '.join('?' * len(columns))})"
+    if key:
+        updates = [f"{quote(column)} = excluded.{quote(column)}" for column in columns if column not in key]
+        sql += f" ON CONFLICT ({', '.join(map(quote, key))}) DO " + (f"UPDATE SET {', '.join(updates)}" if updates else "NOTHING")
+    connection.executemany(sql, df.astype(object).where(df.notna(), None).values.tolist())
+
+# Record the column order of the cleaned data of a resource type, columns of all synced requests are kept
+def record_columns(connection: sqlite3.Connection, resource_type: str, columns: List[str]) -> None:
+    row = connection.execute("SELECT columns FROM _columns WHERE resource = ?", (resource_type,)).fetchone()
+    recorded = json.loads(row[0]) if row else []
+    recorded += [column for column in columns if column not in recorded]
+    connection.execute("INSERT OR REPLACE INTO _columns VALUES (?, ?)", (resource_type, json.dumps(recorded)))
+
+# Store the cleaned data of a request, replacing the data previously stored for the same season (and round)
+def store(resource_type: str, filters: Dict[str, Any], df: pd.DataFrame) -> int:
+    resource_type = cache_keys.normalise_resource_type(resource_type)
+    filters = {key: cache_keys.normalise_value(value) for key, value in filters.items() if value}
+    context = get_context(resource_type, filters)
+    if context is None or (resource_type not in FACT_TABLES and resource_type not in DIMENSIONS):
+        raise ValueError(f"Cannot store {resource_type} with filters {filters} in the warehouse")
+
+    with closing(connect()) as connection, connection:
+        record_columns(connection, resource_type, [str(column) for column in df.columns])
+
+        # Lists of drivers, constructors and circuits only update the dimension tables
+        if resource_type in DIMENSIONS:
+            key = DIMENSIONS[resource_type]
+            write_rows(connection, resource_type, df.dropna(subset=[key]).drop_duplicates(subset=key), [key])
+        else:
+            spec = FACT_TABLES[resource_type]
+            df = df.copy()
+            df.columns = [str(column) for column in df.columns]
+
+            # Add the season and round of the request if the data does not hold them (e.g. laps)
+            if "season" not in df.columns:
+                df.insert(0, "season", context[0])
+            if "round" not in df.columns and resource_type in ROUND_RESOURCES + STANDINGS_RESOURCES:
+                df.insert(1, "round", context[1])
+
+            # Move the columns of dimensions to their tables, keeping the key
+            for prefix, dimension in spec.get("dimensions", {}).items():
+                columns = [column for column in df.columns if column.startswith(prefix)]
+                key = prefix + DIMENSIONS[dimension]
+                if key not in df.columns:
+                    continue
+                dimension_df = df[columns].dropna(subset=[key]).drop_duplicates(subset=key)
+                write_rows(connection, dimension, dimension_df.rename(columns=lambda column: column[len(prefix):]),
+                           [DIMENSIONS[dimension]])
+                df = df.drop(columns=[column for column in columns if column != key])
+
+            # Move the columns describing the race to the races table
+            entry_prefix = spec.get("entry_prefix")
+            if entry_prefix is not None:
+                race_columns = [column for column in df.columns if not column.startswith(entry_prefix)]
+                write_rows(connection, "races", df[race_columns].drop_duplicates(subset=["season", "round"]),
+                           FACT_TABLES["races"]["key"])
+                df = df[["season", "round"] + [column for column in df.columns if column not in race_columns]]
+
+            # Standings of the season are the standings after its latest round and are stored under that round
+            rows_round = context[1]
+            if resource_type in STANDINGS_RESOURCES and not rows_round and not df.empty:
+                rows_round = int(pd.to_numeric(df["round"]).max())
+
+            # Keyed tables are updated, other tables replace the rows of the season (and round)
+            if "key" not in spec and get_columns(connection, spec["table"]):
+                condition = "season = ?" + (" AND round = ?" if resource_type in ROUND_RESOURCES + STANDINGS_RESOURCES else "")
+                values = (context[0], rows_round) if resource_type in ROUND_RESOURCES + STANDINGS_RESOURCES else context[:1]
+                connection.execute(f"DELETE FROM {quote(spec['table'])} WHERE {condition}", values)
+            write_rows(connection, spec["table"], df, spec.get("key"))
+
+        connection.execute("INSERT OR REPLACE INTO _synced VALUES (?, ?, ?, ?)", (resource_type, *context, time.time()))
+    return len(df)
+
+# Returns the cleaned data of a request from the warehouse, None if the warehouse cannot answer it (the season is not
+# synced, synced data expired, a filter has no column or no rows match). Columns are named and ordered like the cleaned data.
+def query(resource_type: str, filters: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+    if not WAREHOUSE_FILE.exists():
+        return None
+    resource_type = cache_keys.normalise_resource_type(resource_type)
+    filters = {key: cache_keys.normalise_value(value) for key, value in (filters or {}).items() if value}
+    source, fk = DIMENSION_SOURCES.get(resource_type, (resource_type, None))
+    if source not in FACT_TABLES:
+        return None
+    context = get_context(source, filters)
+    if context is None:
+        return None
+
+    with closing(sqlite3.connect(WAREHOUSE_FILE, timeout=30)) as connection:
+        try:
+            synced = connection.execute("SELECT synced_at FROM _synced WHERE resource = ? AND season = ? AND round = ?",
+                                        (source, *context)).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        if synced is None or not is_fresh(context[0], synced[0]):
+            return None
+
+        spec = FACT_TABLES[source]
+        fact_columns = get_columns(connection, spec["table"])
+        race_columns = get_columns(connection, "races") if "entry_prefix" in spec else []
+        if not fact_columns:
+            return None
+
+        # Join the races table and the dimension tables, naming their columns like the cleaned data
+        select, joins = ["f.*"], []
+        if race_columns:
+            joins.append("LEFT JOIN races p ON p.season = f.season AND p.round = f.round")
+            select += [f"p.{quote(column)}" for column in race_columns if column not in ["season", "round"]]
+        for i, (prefix, dimension) in enumerate(spec.get("dimensions", {}).items()):
+            key = DIMENSIONS[dimension]
+            alias = "f" if prefix + key in fact_columns else "p" if prefix + key in race_columns else None
+            if alias is None:
+                continue
+            joins.append(f"LEFT JOIN {dimension} d{i} ON d{i}.{quote(key)} = {alias}.{quote(prefix + key)}")
+            select += [f"d{i}.{quote(column)} AS {quote(prefix + column)}"
+                       for column in get_columns(connection, dimension) if column != key]
+
+        # Select the season (and round) the data is synced under, other filters are matched on their column. Standings
+        # of the season are the rows of its latest round.
+        conditions, values = ["f.season = ?"], [context[0]]
+        if source in STANDINGS_RESOURCES and not context[1]:
+            conditions.append(f"f.round = (SELECT MAX(round) FROM {quote(spec['table'])} WHERE season = ?)")
+            values.append(context[0])
+        elif source in ROUND_RESOURCES + STANDINGS_RESOURCES:
+            conditions.append("f.round = ?")
+            values.append(context[1])
+        for key, value in filters.items():
+            if key == "season" or key == "round" and source in ROUND_RESOURCES + STANDINGS_RESOURCES:
+                continue
+            column = FILTER_COLUMNS.get(source, {}).get(key)
+            if column is None or key in NUMERIC_FILTERS and not value.isdigit():
+                return None
+            alias = "f" if column in fact_columns else "p" if column in race_columns else None
+            if alias is None:
+                return None
+            conditions.append(f"{alias}.{quote(column)} = ?")
+            values.append(int(value) if key in NUMERIC_FILTERS else value)
+
+        from_sql = f"FROM {quote(spec['table'])} f {' '.join(joins)} WHERE {' AND '.join(conditions)}"
+        if fk is None:
+            df = pd.read_sql_query(f"SELECT {', '.join(select)} {from_sql} ORDER BY f.rowid", connection, params=values)
+        else:
+            # Entries of a dimension in order of their first appearance in the fact table
+            alias = "f" if fk in fact_columns else "p"
+            df = pd.read_sql_query(f"SELECT d.* FROM {resource_type} d JOIN (SELECT {alias}.{quote(fk)} AS id, "
+                                   f"MIN(f.rowid) AS first {from_sql} GROUP BY id) s "
+                                   f"ON d.{quote(DIMENSIONS[resource_type])} = s.id ORDER BY s.first",
+                                   connection, params=values)
+        row = connection.execute("SELECT columns FROM _columns WHERE resource = ?", (resource_type,)).fetchone()
+    if df.empty:
+        return None
+
+    # Keep the columns of the cleaned data in their order, dropping columns without values for this request
+    if row is not None:
+        df = df[[column for column in json.loads(row[0]) if column in df.columns]]
+    df = df.dropna(axis=1, how="all")
+
+    # SQLite returns 64 bit numbers, they are downcast like the cleaned data
+    for column in df.columns[[pd.api.types.is_numeric_dtype(dtype) for dtype in df.dtypes]]:
+        df[column] = dp.downcast_numeric(df[column])
+    return dp.convert_to_numeric(df, resource_type)
+
+# Endpoint name of a resource type, like the resource types sent by the GUI (e.g. DriverStandings)
+def get_endpoint_name(resource_type: str) -> str:
+    return ResourceType[cache_keys.normalise_resource_type(resource_type).upper()].name_value.replace(" ", "")
+
+# Retrieve all data of a season for the given resource types (all if None) and store it in the warehouse. Returns the
+# number of rows stored per resource type, requests that failed are not marked as synced and are retried next time.
+def sync_season(season: int, resource_types: Optional[List[str]] = None) -> Dict[str, int]:
+    # Imported here as JolpicaAPI queries the warehouse itself
+    from f1dataanalysistool.api.jolpica_api import JolpicaAPI
+
+    resource_types = [cache_keys.normalise_resource_type(resource_type) for resource_type in resource_types
+                      or [member.name.lower() for member in ResourceType]]
+    races = JolpicaAPI(get_endpoint_name("races"), filters={"season": str(season)}).get_cleaned_data(use_local=False)
+    rounds = sorted(int(round_number) for round_number in races["round"].unique()) if "round" in races.columns else []
+
+    rows = {}
+    for resource_type in ["races"] + [resource_type for resource_type in resource_types if resource_type != "races"]:
+        requests = [] if resource_type in ROUND_RESOURCES else [{"season": str(season)}]
+        if resource_type in ROUND_RESOURCES + STANDINGS_RESOURCES:
+            requests += [{"season": str(season), "round": str(round_number)} for round_number in rounds]
+
+        rows[resource_type] = 0
+        for filters in requests:
+            api = JolpicaAPI(get_endpoint_name(resource_type), filters=filters)
+            # Retrieved responses are cached until they expire, so empty data without a cached response could not be
+            # retrieved (checked without requesting it again)
+            df = api.get_cleaned_data(use_local=False)
+            if df.empty and not cache_manager.is_cached(api.get_cache_file_path_all()):
+                logging.error(f"Skipping {api.get_endpoint()}, it could not be retrieved")
+                continue
+            rows[resource_type] += store(resource_type, filters, df)
+        logging.info(f"Synced {rows[resource_type]} rows of {resource_type} for {season}")
+    return rows
+
+# Parse seasons given as years or ranges of years (e.g. 2018-2023)
+def parse_seasons(values: List[str]) -> List[int]:
+    seasons = []
+    for value in values:
+        start, _, end = value.partition("-")
+        seasons += list(range(int(start), int(end or start) + 1))
+    return seasons
+
+# Returns the synced requests per resource type and season with their number of rounds and last sync time
+def get_status() -> List[Dict[str, Any]]:
+    if not WAREHOUSE_FILE.exists():
+        return []
+    with closing(connect()) as connection:
+        rows = connection.execute("SELECT resource, season, COUNT(*), MAX(synced_at) FROM _synced "
+                                  "GROUP BY resource, season ORDER BY season, resource").fetchall()
+    return [{"resource": resource, "season": season, "requests": count, "synced_at": synced_at}
+            for resource, season, count, synced_at in rows]
+
+# Command line entry point (f1-warehouse)
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="f1-warehouse", description="Local warehouse of Jolpica-F1 data")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    sync_parser = subparsers.add_parser("sync", help="Retrieve whole seasons and store them in the warehouse")
+    sync_parser.add_argument("seasons", nargs="+", help="Seasons to sync, e.g. 2023 or 2018-2023")
+    sync_parser.add_argument("--resources", nargs="+", metavar="RESOURCE",
+                             help="Resource types to sync (default: all), e.g. results laps")
+    subparsers.add_parser("status", help="List the synced seasons")
+    args = parser.parse_args(argv)
+
+    if args.command == "sync":
+        for season in parse_seasons(args.seasons):
+            rows = sync_season(season, args.resources)
+            print(f"{season}: " + ", ".join(f"{resource_type} {count}" for resource_type, count in rows.items()))
+    else:
+        for entry in get_status():
+            synced_at = datetime.fromtimestamp(entry["synced_at"]).strftime("%Y-%m-%d %H:%M")
+            print(f"{entry['season']} {entry['resource']:<22} {entry['requests']:>3} requests  synced {synced_at}")
+
+if __name__ == "__main__":
+    main()
@@ -2,19 +2,19 @@ from enum import Enum
 
 
 class ResourceType(Enum):
-    CIRCUITS = {"name": "Circuits", "optional": ["season", "round", "constructors", "drivers", "fastest", "grid", "results", "status"]}
-    CONSTRUCTORS = {"name": "Constructors", "optional": ["season", "round", "circuits", "drivers", "fastest", "grid", "results", "status"]}
-    CONSTRUCTORSTANDINGS = {"name": "Constructor Standings", "mandatory": ["season"], "optional": ["round", "constructors", "position"]}
-    DRIVERS = {"name": "Drivers", "optional": ["season", "round", "circuits", "constructors", "fastest", "grid", "results", "status"]}
-    DRIVERSTANDINGS = {"name": "Driver Standings", "mandatory": ["season"], "optional": ["round", "drivers", "position"]}
-    LAPS = {"name": "Laps", "mandatory": ["season", "round"], "optional": ["drivers", "constructors", "laps"]}
-    PITSTOPS = {"name": "Pit Stops", "mandatory": ["season", "round"], "optional": ["drivers", "laps", "pitstops"]}
-    QUALIFYING = {"name": "Qualifying", "optional": ["season", "round", "circuits", "constructors", "drivers", "grid", "fastest", "status"]}
-    RACES = {"name": "Races", "optional": ["season", "round", "circuits", "constructors", "drivers", "grid", "status"]}
-    RESULTS = {"name": "Results", "optional": ["season", "round", "circuits", "constructors", "drivers", "fastest", "grid", "status"]}
-    SEASONS = {"name": "Seasons", "optional": ["season", "circuits", "constructors", "drivers", "grid", "status"]}
-    SPRINT = {"name": "Sprint", "optional": ["season", "round"]}
-    STATUS = {"name": "Status", "optional": ["status", "season", "round", "circuits", "constructors", "drivers", "results"]}
+    CIRCUITS = {"name": "Circuits", "optional": ["season", "round", "constructors", "drivers", "fastest", "grid", "results", "status"], "path": ["CircuitTable", "Circuits"]}
+    CONSTRUCTORS = {"name": "Constructors", "optional": ["season", "round", "circuits", "drivers", "fastest", "grid", "results", "status"], "path": ["ConstructorTable", "Constructors"]}
+    CONSTRUCTORSTANDINGS = {"name": "Constructor Standings", "mandatory": ["season"], "optional": ["round", "constructors", "position"], "path": ["StandingsTable", "StandingsLists", "ConstructorStandings"]}
+    DRIVERS = {"name": "Drivers", "optional": ["season", "round", "circuits", "constructors", "fastest", "grid", "results", "status"], "path": ["DriverTable", "Drivers"]}
+    DRIVERSTANDINGS = {"name": "Driver Standings", "mandatory": ["season"], "optional": ["round", "drivers", "position"], "path": ["StandingsTable", "StandingsLists", "DriverStandings"]}
+    LAPS = {"name": "Laps", "mandatory": ["season", "round"], "optional": ["drivers", "constructors", "laps"], "path": ["RaceTable", "Races", "Laps"]}
+    PITSTOPS = {"name": "Pit Stops", "mandatory": ["season", "round"], "optional": ["drivers", "laps", "pitstops"], "path": ["RaceTable", "Races", "PitStops"]}
+    QUALIFYING = {"name": "Qualifying", "optional": ["season", "round", "circuits", "constructors", "drivers", "grid", "fastest", "status"], "path": ["RaceTable", "Races", "QualifyingResults"]}
+    RACES = {"name": "Races", "optional": ["season", "round", "circuits", "constructors", "drivers", "grid", "status"], "path": ["RaceTable", "Races"]}
+    RESULTS = {"name": "Results", "optional": ["season", "round", "circuits", "constructors", "drivers", "fastest", "grid", "status"], "path": ["RaceTable", "Races"]}
+    SEASONS = {"name": "Seasons", "optional": ["season", "circuits", "constructors", "drivers", "grid", "status"], "path": ["SeasonTable", "Seasons"]}
+    SPRINT = {"name": "Sprint", "optional": ["season", "round"], "path": ["RaceTable", "Races", "SprintResults"]}
+    STATUS = {"name": "Status", "optional": ["status", "season", "round", "circuits", "constructors", "drivers", "results"], "path": ["StatusTable", "Status"]}
 
     @property
     def name_value(self):
@@ -28,6 +28,11 @@ class ResourceType(Enum):
     def optional(self):
         return self.value.get("optional", [])
 
+    # Path of the inner data below MRData in a response
+    @property
+    def path(self):
+        return self.value.get("path", [])
+
     @classmethod
     def has_value(cls, value):
         return value in cls._member_names_
@@ -44,6 +49,10 @@ class ResourceType(Enum):
     def get_mandatory(cls, resource_type: str):
         return cls[resource_type.replace(" ", "").upper()].mandatory
 
+    @classmethod
+    def get_path(cls, resource_type: str):
+        return cls[resource_type.replace(" ", "").upper()].path
+
     @classmethod
     def get_all_filters(cls):
         # Create a set to collect unique filter names
@@ -1,8 +1,8 @@
 import logging
 from dash.dependencies import Input, Output, State
 from dash import html
-import pandas as pd
 import f1dataanalysistool.api.data_preprocessing as dp
+from f1dataanalysistool.gui.dataset_store import get_dataset, get_dataset_columns
 from f1dataanalysistool.analysis.analysis_main import run_analysis
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -21,8 +21,7 @@ def register_analysis_callbacks(app):
         if n_clicks == 0 or not stored_data:
             return [], [{'label': 'None', 'value': 'none'}]
 
-        df = pd.read_json(stored_data, orient="split")
-        columns = dp.get_columns(df)
+        columns = get_dataset_columns(stored_data)
 
         column_1_options = [{'label': col, 'value': col} for col in columns if col != column_2]
         column_2_options = ([{'label': 'None', 'value': 'none'}] +
@@ -45,7 +44,10 @@ def register_analysis_callbacks(app):
         if n_clicks == 0 or not analysis_type:
             return ""
 
-        df = pd.read_json(stored_data, orient="split")
+        # Only load the columns used by the analysis
+        df = get_dataset(stored_data, columns=[col for col in (column_1, column_2) if col and col != "none"])
+        if df is None:
+            return "Error: The dataset is no longer available, please retrieve the data again."
         if convert_to_ms == ["convert"]:
             df = dp.convert_to_ms(df)
             df = dp.convert_to_numeric(df)
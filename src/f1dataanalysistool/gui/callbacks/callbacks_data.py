@@ -3,6 +3,7 @@ from dash.dependencies import Input, Output, State, ALL
 from dash import dcc, html
 from f1dataanalysistool.enumeration.resource_types import ResourceType
 from f1dataanalysistool.api.jolpica_api import JolpicaAPI
+from f1dataanalysistool.gui.dataset_store import register_dataset
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -88,9 +89,11 @@ def register_data_callbacks(app):
 
             # Fetch data using API
             logging.info(f"Fetching data for {resource_type} with filters: {filter_dict}")
-            df = JolpicaAPI(resource_type=resource_type.replace(" ", ""), filters=filter_dict).get_cleaned_data()
+            resource_type = resource_type.replace(" ", "")
+            df = JolpicaAPI(resource_type=resource_type, filters=filter_dict).get_cleaned_data()
 
-            return df.to_json(date_format='iso', orient='split')
+            # Only a handle and the schema are sent to the browser, the dataset stays on the server
+            return register_dataset(resource_type, filter_dict, df)
 
         except Exception as e:
             logging.error(f"Error fetching data: {e}")
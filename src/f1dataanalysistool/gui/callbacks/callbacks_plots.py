@@ -3,8 +3,8 @@ import time
 import os
 from dash.dependencies import Input, Output, State
 from dash import dcc, html
-import pandas as pd
 import f1dataanalysistool.api.data_preprocessing as dp
+from f1dataanalysistool.gui.dataset_store import get_dataset, get_dataset_columns
 from f1dataanalysistool.visualisation.plot_generator import plot_chart
 from f1dataanalysistool.visualisation.plot_saving import get_plots_directory, save_plot
 
@@ -24,8 +24,7 @@ def register_plot_callbacks(app):
         if not stored_data:
             return [], [{'label': 'None', 'value': 'none'}], [{'label': 'None', 'value': 'none'}]
 
-        data = pd.read_json(stored_data, orient='split')
-        columns = dp.get_columns(data)
+        columns = get_dataset_columns(stored_data)
 
         filtered_x_options = [{'label': col, 'value': col} for col in columns if col not in (y_col, group_by)]
         filtered_y_options = [{'label': 'None', 'value': 'none'}] + [{'label': col, 'value': col} for col in columns if
@@ -55,7 +54,11 @@ def register_plot_callbacks(app):
         y_col = None if y_col == 'none' else y_col
         group_by = None if group_by == 'none' else group_by
 
-        df = pd.read_json(stored_data, orient='split')
+        # Heatmaps correlate every column, other plots only need the plotted columns
+        columns = None if plot_type == "heatmap" else [col for col in (x_col, y_col, group_by) if col]
+        df = get_dataset(stored_data, columns=columns)
+        if df is None:
+            return html.P("The dataset is no longer available, please retrieve the data again."), {}
 
         if convert_to_ms == ["convert"]:
             df = dp.convert_to_ms(df)
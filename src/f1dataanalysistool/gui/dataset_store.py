@@ -0,0 +1,59 @@
+import logging
+from typing import Dict, Any, List, Optional
+import pandas as pd
+from f1dataanalysistool.api.jolpica_api import JolpicaAPI
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Server side dataset registry. The browser only receives a small handle with a schema summary (see register_dataset),
+# datasets are resolved from the handle on the server through the local cleaned data of JolpicaAPI. The handle holds
+# the request itself, so any worker process can resolve it, loading the cleaned data from disk if necessary.
+
+# Register a retrieved dataset and return the handle to keep in the browser
+def register_dataset(resource_type: str, filters: Dict[str, Any], df: pd.DataFrame) -> Dict[str, Any]:
+    api = JolpicaAPI(resource_type=resource_type, filters=filters)
+    return {
+        "handle": api.get_file_name(),
+        "resource_type": resource_type,
+        "filters": filters,
+        "columns": [str(col) for col in df.columns],
+        "dtypes": {str(col): str(dtype) for col, dtype in df.dtypes.items()},
+        "rows": len(df),
+    }
+
+# Returns the column names of a registered dataset without loading it
+def get_dataset_columns(handle: Dict[str, Any]) -> List[str]:
+    return handle.get("columns", [])
+
+# Returns how a dataset differs from the schema recorded in its handle, None if it matches. Only the loaded columns
+# are compared when a subset of the columns was loaded.
+def get_schema_mismatch(handle: Dict[str, Any], df: pd.DataFrame, columns: Optional[List[str]] = None) -> Optional[str]:
+    if columns is None and [str(col) for col in df.columns] != handle.get("columns"):
+        return "its columns changed"
+    if len(df) != handle.get("rows"):
+        return f"it has {len(df)} rows instead of {handle.get('rows')}"
+    dtypes = handle.get("dtypes", {})
+    for col, dtype in df.dtypes.items():
+        if dtypes.get(str(col)) != str(dtype):
+            return f"column {col} is {dtype} instead of {dtypes.get(str(col))}"
+    return None
+
+# Resolve a handle to its dataset, only loading the given columns if provided. The dataset is resolved from local data
+# without syncing or retrieving it, so plots and analyses never wait for the API. Returns None if the handle is stale
+# (its data is no longer available locally or no longer matches the handle), the dataset must then be retrieved and
+# registered again.
+def get_dataset(handle: Dict[str, Any], columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+    api = JolpicaAPI(resource_type=handle["resource_type"], filters=handle["filters"])
+    if api.get_file_name() != handle["handle"]:
+        logging.warning(f"Dataset handle {handle['handle']} does not match its request {api.get_file_name()}")
+        return None
+
+    df = api.get_local_cleaned_data(columns=columns)
+    if df is None:
+        logging.warning(f"Dataset {handle['handle']} is no longer available locally")
+        return None
+    mismatch = get_schema_mismatch(handle, df, columns)
+    if mismatch is not None:
+        logging.warning(f"Dataset {handle['handle']} no longer matches its handle: {mismatch}")
+        return None
+    return df
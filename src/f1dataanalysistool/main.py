@@ -1,5 +1,6 @@
 from dash import Dash
-from flask import send_from_directory
+from flask import Response, send_from_directory
+import f1dataanalysistool.api.metrics as metrics
 from f1dataanalysistool.gui.layout import create_layout
 from f1dataanalysistool.gui.callbacks import register_callbacks
 from f1dataanalysistool.visualisation.plot_saving import get_plots_directory
@@ -16,5 +17,10 @@ register_callbacks(app)
 def serve_plot(filename):
     return send_from_directory(get_plots_directory(), filename)
 
+# Expose the metrics of the application in the Prometheus text format
+@app.server.route('/metrics')
+def serve_metrics():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 if __name__ == "__main__":
     app.run_server(debug=False, host='0.0.0.0', port=8080)
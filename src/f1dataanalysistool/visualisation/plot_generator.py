@@ -1,4 +1,5 @@
 import pandas as pd
+import f1dataanalysistool.api.metrics as metrics
 from f1dataanalysistool.visualisation.static_plot import plot_static_chart
 from f1dataanalysistool.visualisation.interactive_plot import plot_interactive_chart
 from f1dataanalysistool.visualisation.plot_saving import save_plot, get_plots_directory
@@ -21,12 +22,13 @@ def plot_chart(
     save_path = get_plots_directory() / f"{filename}.{save_format}"
 
     # Generate plot
-    if mode == "static":
-        fig = plot_static_chart(df, x_col=x_col, y_col=y_col, title=title,
-                                plot_type=chart_type, **kwargs)
-    else:
-        fig = plot_interactive_chart(df, x_col=x_col, y_col=y_col, title=title,
-                                     plot_type=chart_type, **kwargs)
+    with metrics.PLOT_SECONDS.time(mode=mode, chart_type=chart_type):
+        if mode == "static":
+            fig = plot_static_chart(df, x_col=x_col, y_col=y_col, title=title,
+                                    plot_type=chart_type, **kwargs)
+        else:
+            fig = plot_interactive_chart(df, x_col=x_col, y_col=y_col, title=title,
+                                         plot_type=chart_type, **kwargs)
     if saving and not save_path.exists():
         save_plot(fig, filename=filename, plot_type=mode, file_format=save_format)
 
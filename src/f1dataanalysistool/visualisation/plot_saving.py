@@ -2,6 +2,7 @@ from pathlib import Path
 from typing import Any
 import matplotlib.pyplot as plt
 import plotly.io as pio
+import f1dataanalysistool.api.metrics as metrics
 
 # Define save directory
 PLOTS_DIR = Path(__file__).resolve().parent.parent.parent / "data/plots"
@@ -12,18 +13,19 @@ def save_plot(fig: Any, filename: str, plot_type: str = "static", file_format: s
     save_path = PLOTS_DIR / f"{filename}.{file_format}"
 
     try:
-        if plot_type == "static":
-            if isinstance(fig, plt.Figure):
-                fig.savefig(save_path, format=file_format, bbox_inches="tight")
+        with metrics.SAVE_PLOT_SECONDS.time(mode=plot_type, file_format=file_format):
+            if plot_type == "static":
+                if isinstance(fig, plt.Figure):
+                    fig.savefig(save_path, format=file_format, bbox_inches="tight")
+                else:
+                    raise ValueError("Invalid figure type for static plot.")
+            elif plot_type == "interactive":
+                if file_format == "html":
+                    pio.write_html(fig, save_path)
+                else:
+                    pio.write_image(fig, save_path, format=file_format)
             else:
-                raise ValueError("Invalid figure type for static plot.")
-        elif plot_type == "interactive":
-            if file_format == "html":
-                pio.write_html(fig, save_path)
-            else:
-                pio.write_image(fig, save_path, format=file_format)
-        else:
-            raise ValueError("Unsupported plot type. Choose 'static' or 'interactive'.")
+                raise ValueError("Unsupported plot type. Choose 'static' or 'interactive'.")
     except Exception as e:
         raise RuntimeError(f"Failed to save plot: {e}")
 
@@ -0,0 +1,18 @@
+import pytest
+import f1dataanalysistool.api.single_flight
+from api import cache_keys, cache_manager, single_flight
+
+# Point the cache manager and the lock files of the process wide single flight group at a temporary data directory,
+# also the instances imported by the package modules
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    for module in {single_flight, f1dataanalysistool.api.single_flight}:
+        monkeypatch.setattr(module, "fetch_group", module.SingleFlight(tmp_path / "locks/single_flight"))
+    for module in {cache_manager, cache_keys.cache_manager}:
+        monkeypatch.setattr(module, "DATA_DIR", tmp_path)
+        monkeypatch.setattr(module, "MANAGED_DIRS", [tmp_path / "cache", tmp_path / "cleaned"])
+        monkeypatch.setattr(module, "INDEX_FILE", tmp_path / "cache_index.json")
+        monkeypatch.setattr(module, "INDEX_LOCK_FILE", tmp_path / "locks/cache_index.lock")
+        monkeypatch.setattr(module, "ENTRY_LOCKS_DIR", tmp_path / "locks/entries")
+    (tmp_path / "cache").mkdir()
+    return tmp_path / "cache"
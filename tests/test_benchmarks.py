@@ -0,0 +1,29 @@
+from benchmarks import run_benchmarks
+from benchmarks.synthetic_data import SyntheticData, format_time
+
+def test_format_time():
+    assert format_time(92_456) == "1:32.456"
+    assert format_time(5_535_456) == "1:32:15.456"
+
+def test_synthetic_data():
+    data = SyntheticData(seasons=2, rounds=3, drivers=4, laps=5).generate()
+    assert len(data["results"]) == 2 and len(data["laps"]) == 6 and len(data["pitstops"]) == 6
+    assert data["results"][0]["MRData"]["total"] == "12"
+    laps = data["laps"][0]["MRData"]["RaceTable"]["Races"][0]["Laps"]
+    assert [len(lap["Timings"]) for lap in laps] == [4] * 5
+
+    # The same seed generates the same data
+    assert SyntheticData(seasons=2, rounds=3, drivers=4, laps=5).generate() == data
+
+def test_run_preprocessing():
+    results = run_benchmarks.run(seasons=1, rounds=1, repeat=1, stages=["preprocessing"])
+    stages = [(entry["stage"], entry["dataset"]) for entry in results["results"]]
+    assert stages == [(stage, dataset) for dataset in ["results", "laps", "pitstops"]
+                      for stage in run_benchmarks.PREPROCESSING_STAGES]
+    assert all(entry["rows"] > 0 and "error" not in entry for entry in results["results"])
+
+def test_compare():
+    baseline = {"results": [{"stage": "convert_to_ms", "dataset": "laps", "variant": None, "min": 1.0}]}
+    results = {"results": [{"stage": "convert_to_ms", "dataset": "laps", "variant": None, "min": 1.5}]}
+    assert run_benchmarks.compare(results, baseline, 0.6) == []
+    assert run_benchmarks.compare(results, baseline, 0.2)[0]["change"] == 0.5
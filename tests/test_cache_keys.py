@@ -0,0 +1,37 @@
+import pytest
+from api import cache_keys
+
+@pytest.mark.parametrize("resource_type, filters, params", [
+    ("driverStandings", {"season": "2023"}, None),
+    ("driverstandings", {"season": 2023}, {"limit": 100, "offset": 0}),
+    ("driver standings", {"season": " 2023 "}, {"limit": 30, "offset": 60}),
+])
+def test_canonical_key_standings(resource_type, filters, params):
+    assert cache_keys.canonical_key(resource_type, filters, params) == "2023_driverstandings"
+
+def test_canonical_key_filters():
+    key = cache_keys.canonical_key("results", {"drivers": "max_verstappen", "round": "05", "season": "2021",
+                                               "constructors": "Red_Bull"})
+    assert key == "2021_5_constructors_red_bull_drivers_max_verstappen_results"
+    assert cache_keys.canonical_key("results", {"season": "2021"}, {"format": "json"}) == "2021_results_format-json"
+
+@pytest.mark.parametrize("key, request_", [
+    ("2021_drivers_max_verstappen_results", ("results", {"season": "2021", "drivers": "max_verstappen"})),
+    ("2023_5_driverStandings_1", ("driverStandings", {"position": "1", "season": "2023", "round": "5"})),
+    ("circuits", ("circuits", {})),
+    ("2023_unknown", None),
+])
+def test_parse_key(key, request_):
+    assert cache_keys.parse_key(key) == request_
+
+def test_migrate_cache_keys(cache_dir):
+    cache_manager = cache_keys.cache_manager
+    cache_manager.cache_data(cache_dir / "2023_driverStandings_all.json", {"copy": "old"})
+    cache_manager.cache_data(cache_dir / "2023_driverstandings_all.json", {"copy": "new"})
+    cache_manager.cache_data(cache_dir / "2021_05_drivers_max_verstappen_results_100_0.json", {"copy": "page"})
+
+    assert cache_keys.migrate_cache_keys() == {"renamed": 1, "removed": 1}
+    assert cache_manager.load_cache(cache_dir / "2023_driverstandings_all.json") == {"copy": "new"}
+    assert cache_manager.load_cache(cache_dir / "2021_5_drivers_max_verstappen_results_100_0.json") == {"copy": "page"}
+    assert len(list(cache_dir.iterdir())) == 2
+    assert len(cache_manager.get_cache_entries()) == 2
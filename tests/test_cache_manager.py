@@ -0,0 +1,128 @@
+import gzip
+import importlib.util
+import json
+import sys
+import pytest
+from api import cache_manager
+
+DATA = {"MRData": {"total": "2", "RaceTable": {"Races": [{"round": "1"}, {"round": "2"}]}}}
+
+# Compressed data starts with the magic number of its codec
+MAGIC_NUMBERS = {"gzip": b"\x1f\x8b", "zstd": b"\x28\xb5\x2f\xfd"}
+
+# Load a separate instance of the cache manager as if the optional modules were not installed, pointed at the same
+# directories as the cache_dir fixture
+def load_without_optional_modules(monkeypatch):
+    monkeypatch.setitem(sys.modules, "zstandard", None)
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    spec = importlib.util.spec_from_file_location("cache_manager_without_optional_modules", cache_manager.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    for name in ["DATA_DIR", "MANAGED_DIRS", "INDEX_FILE", "INDEX_LOCK_FILE", "ENTRY_LOCKS_DIR"]:
+        setattr(module, name, getattr(cache_manager, name))
+    return module
+
+def test_cache_roundtrip(cache_dir):
+    file_path = cache_dir / "results_all.json"
+    cache_manager.cache_data(file_path, {"MRData": {"total": "1"}})
+
+    assert cache_manager.load_cache(file_path) == {"MRData": {"total": "1"}}
+    assert [path.name for path in cache_dir.iterdir()] == [cache_manager.get_stored_path(file_path).name]
+
+@pytest.mark.parametrize("corrupt", [
+    lambda stored: stored[:len(stored) // 2],
+    lambda stored: stored[:-1] + bytes([stored[-1] ^ 0xFF]),
+])
+def test_corrupt_cache_removed(cache_dir, corrupt):
+    file_path = cache_dir / "results_all.json"
+    cache_manager.cache_data(file_path, {"MRData": {"total": "1", "padding": "x" * 1000}})
+    stored_path = cache_manager.get_stored_path(file_path)
+    stored_path.write_bytes(corrupt(stored_path.read_bytes()))
+
+    with pytest.raises(cache_manager.CacheCorruptError):
+        cache_manager.load_cache(file_path)
+    assert not cache_manager.is_cached(file_path, include_expired=True)
+    assert cache_manager.get_cache_entries() == []
+
+def test_index_parsed_once(cache_dir, monkeypatch):
+    file_path = cache_dir / "results_all.json"
+    cache_manager.cache_data(file_path, {"MRData": {"total": "1"}})
+    loads = []
+    load_index = cache_manager._load_index
+    monkeypatch.setattr(cache_manager, "_load_index", lambda: loads.append(1) or load_index())
+
+    # Lookups share the parsed index until the index file is replaced
+    for _ in range(3):
+        assert cache_manager.is_cached(file_path) and not cache_manager.is_expired(file_path)
+    assert len(loads) == 1
+    cache_manager.renew(file_path)
+    assert cache_manager.is_cached(file_path) and len(loads) == 3
+
+def test_reconcile(cache_dir, monkeypatch):
+    monkeypatch.setattr(cache_manager, "_reconciled", True)
+    untracked = cache_dir / "untracked.json"
+    untracked.write_text("{}")
+
+    # Writes within the budget do not scan the managed directories, explicit eviction does
+    cache_manager.cache_data(cache_dir / "results_all.json", {"MRData": {"total": "1"}})
+    assert "cache/untracked.json" not in [entry["path"] for entry in cache_manager.get_cache_entries()]
+    cache_manager.evict()
+    assert "cache/untracked.json" in [entry["path"] for entry in cache_manager.get_cache_entries()]
+
+    # Writes exceeding the budget reconcile and evict the least recently used entries
+    monkeypatch.setattr(cache_manager, "MAX_CACHE_SIZE", 0)
+    file_path = cache_dir / "laps_all.json"
+    cache_manager.cache_data(file_path, {"MRData": {"total": "1"}})
+    stored_path = cache_manager.get_stored_path(file_path)
+    assert [entry["path"] for entry in cache_manager.get_cache_entries()] == [f"cache/{stored_path.name}"]
+    assert not untracked.exists()
+
+@pytest.mark.parametrize("codec", ["json", "gzip", "zstd"])
+def test_codec_roundtrip(cache_dir, monkeypatch, codec):
+    # Data is written compressed with the configured codec and read back transparently, also as a stream
+    if codec not in cache_manager.CODECS:
+        pytest.skip(f"{codec} is not available")
+    monkeypatch.setattr(cache_manager, "CODEC", codec)
+    file_path = cache_dir / "races_all.json"
+    cache_manager.cache_data(file_path, DATA)
+
+    stored_path = cache_manager.get_stored_path(file_path)
+    assert stored_path.name == "races_all.json" + cache_manager.CODECS[codec][0]
+    assert stored_path.read_bytes().startswith(MAGIC_NUMBERS.get(codec, b"{"))
+    assert cache_manager.load_cache(file_path) == DATA
+    assert cache_manager.get_raw_size(file_path) == len(cache_manager.dumps(DATA))
+    with cache_manager.open_cache(file_path) as stream:
+        assert json.loads(stream.read()) == DATA
+
+def test_legacy_json(cache_dir):
+    # Plain .json files written before compression are read, and replaced once the data is cached again
+    file_path = cache_dir / "races_all.json"
+    file_path.write_text(json.dumps(DATA))
+    assert cache_manager.is_cached(file_path)
+    assert cache_manager.load_cache(file_path) == DATA
+    with cache_manager.open_cache(file_path) as stream:
+        assert json.loads(stream.read()) == DATA
+
+    cache_manager.cache_data(file_path, DATA)
+    if cache_manager.CODEC != "json":
+        assert not file_path.exists()
+    assert cache_manager.load_cache(file_path) == DATA
+
+def test_gzip_fallback(cache_dir, monkeypatch):
+    # Without zstandard and orjson, gzip and the standard json module are used
+    monkeypatch.delenv("F1_CACHE_CODEC", raising=False)
+    module = load_without_optional_modules(monkeypatch)
+    assert module.CODEC == "gzip" and "zstd" not in module.CODECS and module.orjson is None
+
+    file_path = cache_dir / "races_all.json"
+    module.cache_data(file_path, DATA)
+    stored_path = module.get_stored_path(file_path)
+    assert stored_path.name == "races_all.json.gz"
+    assert json.loads(gzip.decompress(stored_path.read_bytes())) == DATA
+    assert module.load_cache(file_path) == DATA
+    assert cache_manager.load_cache(file_path) == DATA
+
+def test_unavailable_codec(monkeypatch):
+    # A configured codec that is not installed falls back to gzip
+    monkeypatch.setenv("F1_CACHE_CODEC", "zstd")
+    assert load_without_optional_modules(monkeypatch).CODEC == "gzip"
@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+import pytest
+from api import data_preprocessing as dp, json_handler
+from benchmarks.synthetic_data import SyntheticData
+
+def test_convert_to_numeric_object_not_cached():
+    # A stray value leaves the column unconverted in this dataset only
+    df = dp.convert_to_numeric(pd.DataFrame({"position": ["1", "R"]}), "test_object_verdict")
+    assert df["position"].tolist() == ["1", "R"]
+    df = dp.convert_to_numeric(pd.DataFrame({"position": ["1", "2"]}), "test_object_verdict")
+    assert df["position"].dtype.kind == "i"
+
+def test_convert_to_numeric_verdict_dropped():
+    dp.convert_to_numeric(pd.DataFrame({"position": ["1", "2"]}), "test_numeric_verdict")
+    assert dp._schemas["test_numeric_verdict"] == {"position": "integer"}
+
+    # A cached numeric type that no longer converts the column is inferred again for the next dataset
+    df = dp.convert_to_numeric(pd.DataFrame({"position": ["3", "R"]}), "test_numeric_verdict")
+    assert df["position"].tolist() == ["3", "R"] and "position" not in dp._schemas["test_numeric_verdict"]
+
+# Conversion of a single time before times were parsed column-wise, the reference for series_to_ms
+def time_to_ms(time):
+    try:
+        if isinstance(time, (int, float)):
+            return int(time * 1000)
+        if isinstance(time, str):
+            if ":" not in time:
+                return int(float(time) * 1000)
+            time_parts = time.split(":")
+            if len(time_parts) == 2:
+                minutes, rest = time_parts
+                return (int(minutes) * 60000) + int(float(rest) * 1000)
+        return time
+    except (ValueError, TypeError):
+        return None
+
+@pytest.mark.parametrize("value", [
+    "1:32.456", "0:59.999", "12:00.000", "1:05.1", "83.123", "+5.432", "+1:02.345", "23.4", "0.1", "0.3",
+    "1:00", "59", 92.456, 0.001, 17,
+])
+def test_series_to_ms_matches_reference(value):
+    ms, invalid = dp.series_to_ms(pd.Series([value]))
+    assert ms[0] == time_to_ms(value) and not invalid[0]
+
+@pytest.mark.parametrize("value, expected", [
+    # Race times of more than an hour were left unconverted before
+    ("1:32:15.456", 5_535_456),
+    ("2:00:00.000", 7_200_000),
+    # Invalid values become missing instead of being kept or raising
+    ("DNF", None),
+    ("1:2:3:4", None),
+    ("1.2.3", None),
+    (":12.5", None),
+    ("1:32.4a", None),
+    ("", None),
+    ("1:32.456€", None),
+])
+def test_series_to_ms_new_formats(value, expected):
+    ms, invalid = dp.series_to_ms(pd.Series([value]))
+    if expected is None:
+        assert pd.isna(ms[0]) and invalid[0]
+    else:
+        assert ms[0] == expected and not invalid[0]
+
+def test_series_to_ms_missing():
+    ms, invalid = dp.series_to_ms(pd.Series(["1:32.456", None, float("nan")], dtype=object))
+    assert ms[0] == 92_456 and ms[1:].isna().all() and not invalid.any()
+
+def test_times_to_ms_batch():
+    values = np.array(["1:32.456", "+0.345", "1:32:15.456", "x", "83.1"], dtype=object)
+    ms = dp.times_to_ms(values)
+    assert ms[[0, 1, 2, 4]].tolist() == [92_456, 345, 5_535_456, 83_100] and np.isnan(ms[3])
+
+# Inner data of results (races holding results), laps (laps holding timings) and pit stops, with missing keys, empty
+# lists and nested dictionaries present in only some entries
+RESULTS = [
+    {"season": "2023", "round": "1", "raceName": "Bahrain Grand Prix",
+     "Circuit": {"circuitId": "bahrain", "Location": {"lat": "26.03", "locality": "Sakhir"}},
+     "Results": [
+         {"position": "1", "Driver": {"driverId": "max_verstappen", "code": "VER"}, "Time": {"millis": "5636736"},
+          "FastestLap": {"rank": "6", "Time": {"time": "1:36.236"}}},
+         {"position": "2", "Driver": {"driverId": "perez"}, "status": "Retired"},
+     ]},
+    {"season": "2023", "round": "2", "raceName": "Saudi Arabian Grand Prix", "Circuit": {"circuitId": "jeddah"},
+     "Results": [{"position": "1", "Driver": {"driverId": "perez", "code": "PER"}, "grid": "1"}]},
+    {"season": "2023", "round": "3", "raceName": "Australian Grand Prix", "Circuit": {"circuitId": "albert_park"},
+     "Results": []},
+    {"season": "2023", "round": "4", "raceName": "Azerbaijan Grand Prix"},
+]
+LAPS = [
+    {"number": "1", "Timings": [{"driverId": "max_verstappen", "position": "1", "time": "1:39.019"},
+                                {"driverId": "perez", "position": "2"}]},
+    {"number": "2", "Timings": []},
+    {"number": "3"},
+    {"number": "4", "Timings": [{"driverId": "perez", "position": "1", "time": "1:38.000"}]},
+]
+PITSTOPS = [
+    {"driverId": "max_verstappen", "lap": "14", "stop": "1", "time": "15:24:11", "duration": "21.653"},
+    {"driverId": "perez", "lap": "17", "stop": "1", "duration": "1:02.345"},
+    {"driverId": "perez", "lap": "35", "stop": "2", "time": "15:58:02"},
+]
+
+@pytest.mark.parametrize("resource_type, inner_data", [
+    ("test_results", RESULTS),
+    ("test_laps", LAPS),
+    ("test_pitstops", PITSTOPS),
+    ("test_results", RESULTS[::-1]),
+    ("test_laps", LAPS[1:3]),
+])
+def test_flatten_matches_json_normalize(resource_type, inner_data):
+    # The same flattener is reused for the later datasets of a resource type
+    expected = dp.convert_to_dataframe(dp.preprocess_data(inner_data))
+    df = dp.flatten_to_dataframe(inner_data, resource_type)
+    pd.testing.assert_frame_equal(df, expected)
+
+def test_flatten_synthetic():
+    data = SyntheticData(seasons=1, rounds=2, drivers=4, laps=3).generate()
+    for resource_type, responses in data.items():
+        inner_key_path = json_handler.get_inner_key_path(responses[0], resource_type)
+        inner_data = [entry for response in responses for entry in json_handler.get_inner_data(response, inner_key_path)]
+        expected = dp.convert_to_dataframe(dp.preprocess_data(inner_data))
+        pd.testing.assert_frame_equal(dp.flatten_to_dataframe(inner_data), expected)
+
+def test_flatten_empty():
+    assert dp.flatten_to_dataframe([]).empty
+
+@pytest.fixture
+def cleaned_dir(tmp_path, monkeypatch):
+    if dp.feather is None:
+        pytest.skip("pyarrow is not installed")
+    monkeypatch.setattr(dp, "CLEANED_DIR", tmp_path)
+    return tmp_path
+
+def test_feather_round_trip(cleaned_dir):
+    # Downcast numbers, strings, booleans and missing values are loaded as they were saved
+    df = pd.DataFrame({"round": np.array([1, 2, 3], dtype="int8"), "points": np.array([25, 18.5, np.nan], dtype="float32"),
+                       "Driver.driverId": ["max_verstappen", "perez", None], "sprint": [True, False, True],
+                       "date": pd.to_datetime(["2023-03-05", "2023-03-19", "2023-04-02"])})
+    dp.save_cleaned(df, "2023_results_cleaned.feather")
+    pd.testing.assert_frame_equal(dp.load_cleaned("2023_results_cleaned.feather"), df)
+
+def test_feather_mixed_column(cleaned_dir):
+    # Mixed object columns are stored as strings, missing values stay missing
+    df = pd.DataFrame({"position": [1, "R", None]})
+    dp.save_cleaned(df, "2023_results_cleaned.feather")
+    assert dp.load_cleaned("2023_results_cleaned.feather")["position"].tolist() == ["1", "R", None]
+
+def test_feather_columns(cleaned_dir):
+    # Only the requested columns are read
+    df = pd.DataFrame({"round": [1, 2], "points": [25.0, 18.0], "Driver.driverId": ["max_verstappen", "perez"]})
+    dp.save_cleaned(df, "2023_results_cleaned.feather")
+    loaded = dp.load_cleaned("2023_results_cleaned.feather", columns=["Driver.driverId", "points"])
+    pd.testing.assert_frame_equal(loaded, df[["Driver.driverId", "points"]])
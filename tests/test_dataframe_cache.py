@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+from api import dataframe_cache
+
+DF = pd.DataFrame({"driverId": ["alonso", "perez", "verstappen"], "points": [8, 18, 25]})
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(dataframe_cache, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+def get_size(df):
+    return int(df.memory_usage(deep=True).sum())
+
+def test_lru_eviction():
+    # Least recently used entries are evicted once the memory budget is exceeded
+    cache = dataframe_cache.DataFrameCache(max_memory=2 * get_size(DF))
+    cache.put("a", DF)
+    cache.put("b", DF)
+    assert cache.get("a") is not None
+    cache.put("c", DF)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.get_stats()["memory"] == 2 * get_size(DF)
+
+def test_larger_than_budget():
+    # Dataframes larger than the budget are not stored and replace nothing
+    cache = dataframe_cache.DataFrameCache(max_memory=get_size(DF))
+    cache.put("a", DF)
+    cache.put("b", pd.concat([DF, DF]))
+    assert cache.get("b") is None and cache.get("a") is not None
+
+def test_copy_on_read():
+    # Callers modifying a stored or returned dataframe do not change the cached entry
+    cache = dataframe_cache.DataFrameCache()
+    df = DF.copy()
+    cache.put("a", df)
+    df.loc[0, "points"] = 0
+    cache.get("a").loc[1, "points"] = 0
+    cache.get("a", columns=["points"]).loc[2, "points"] = 0
+    pd.testing.assert_frame_equal(cache.get("a"), DF)
+
+def test_columns():
+    # Only the requested columns are returned, requests for missing columns are misses
+    cache = dataframe_cache.DataFrameCache()
+    cache.put("a", DF)
+    pd.testing.assert_frame_equal(cache.get("a", columns=["points"]), DF[["points"]])
+    assert cache.get("a", columns=["points", "grid"]) is None
+
+def test_ttl(clock):
+    # Entries are missing once their TTL has passed, entries without a TTL do not expire
+    cache = dataframe_cache.DataFrameCache()
+    cache.put("a", DF, ttl=60)
+    cache.put("b", DF)
+    clock.now += 59
+    assert cache.get("a") is not None
+    clock.now += 2
+    assert cache.get("a") is None and cache.get("b") is not None
+    assert cache.get_stats()["entries"] == 1 and cache.get_stats()["memory"] == get_size(DF)
+
+def test_stats():
+    cache = dataframe_cache.DataFrameCache()
+    assert cache.get_stats()["hit_rate"] == 0.0
+    cache.put("a", DF)
+    cache.get("a")
+    cache.get("a", columns=["driverId"])
+    cache.get("b")
+    cache.invalidate("a")
+    cache.get("a")
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (2, 2, 0.5)
+    assert (stats["entries"], stats["memory"]) == (0, 0)
+
+    cache.put("a", DF)
+    cache.clear()
+    assert cache.get("a") is None and cache.get_stats()["memory"] == 0
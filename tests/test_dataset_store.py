@@ -0,0 +1,61 @@
+import sys
+import pandas as pd
+import pytest
+from gui import dataset_store
+
+# Module of the JolpicaAPI used by the dataset store
+jolpica_api = sys.modules[dataset_store.JolpicaAPI.__module__]
+
+FILTERS = {"season": "2023", "round": "1"}
+DF = pd.DataFrame({"number": [1, 2], "Timings.driverId": ["max_verstappen", "perez"], "Timings.time": [99019, 100101]})
+
+# Any request to the API fails the test
+class OfflineTransport:
+    def get_json(self, endpoint, params=None):
+        raise AssertionError(f"{endpoint} was requested from the API")
+
+@pytest.fixture
+def api(cache_dir, monkeypatch):
+    monkeypatch.setattr(jolpica_api.JolpicaAPI, "CACHE_DIR", cache_dir)
+    monkeypatch.setattr(jolpica_api.dp, "CLEANED_DIR", cache_dir.parent / "cleaned")
+    monkeypatch.setattr(jolpica_api.warehouse, "WAREHOUSE_FILE", cache_dir.parent / "warehouse.sqlite")
+    monkeypatch.setattr(jolpica_api.transport, "_transport", OfflineTransport())
+    (cache_dir.parent / "cleaned").mkdir()
+    api = jolpica_api.JolpicaAPI("Laps", filters=FILTERS)
+    yield api
+    jolpica_api.dataframe_cache.cleaned_data_cache.invalidate(api.get_file_name())
+
+def test_get_dataset_expired(api, monkeypatch):
+    # Expired cleaned data is resolved as stored instead of being synced
+    api.save_cleaned_data(DF, api.get_cleaned_file_name())
+    handle = dataset_store.register_dataset("Laps", FILTERS, DF)
+    jolpica_api.dataframe_cache.cleaned_data_cache.invalidate(api.get_file_name())
+    monkeypatch.setattr(jolpica_api.cache_manager, "VOLATILE_TTL", -1)
+
+    pd.testing.assert_frame_equal(dataset_store.get_dataset(handle), DF)
+    pd.testing.assert_frame_equal(dataset_store.get_dataset(handle, columns=["Timings.time"]), DF[["Timings.time"]])
+
+@pytest.mark.parametrize("registered", [DF.head(1), DF.astype({"Timings.time": float}), DF.drop(columns="number")])
+def test_get_dataset_stale(api, registered):
+    # Data that no longer matches its handle has to be registered again
+    api.save_cleaned_data(DF, api.get_cleaned_file_name())
+    assert dataset_store.get_dataset(dataset_store.register_dataset("Laps", FILTERS, registered)) is None
+
+def test_get_dataset_unavailable(api):
+    assert dataset_store.get_dataset(dataset_store.register_dataset("Laps", FILTERS, DF)) is None
+
+def test_get_dataset_superset(api, monkeypatch):
+    # Data answered from a superset is resolved from the local data of the superset, e.g. in another worker
+    monkeypatch.setattr(jolpica_api.query_planner, "CACHE_DIR", api.CACHE_DIR)
+    monkeypatch.setattr(jolpica_api.query_planner.dp, "CLEANED_DIR", jolpica_api.dp.CLEANED_DIR)
+    api.save_cleaned_data(DF, api.get_cleaned_file_name())
+    filters = dict(FILTERS, drivers="perez")
+    subset = jolpica_api.JolpicaAPI("Laps", filters=filters)
+    expected = subset.get_local_cleaned_data()
+    assert expected["Timings.driverId"].tolist() == ["perez"]
+    handle = dataset_store.register_dataset("Laps", filters, expected)
+    jolpica_api.dataframe_cache.cleaned_data_cache.clear()
+    monkeypatch.setattr(jolpica_api.cache_manager, "VOLATILE_TTL", -1)
+
+    pd.testing.assert_frame_equal(dataset_store.get_dataset(handle), expected)
+    jolpica_api.dataframe_cache.cleaned_data_cache.invalidate(subset.get_file_name())
@@ -0,0 +1,80 @@
+import pytest
+from api import ergast_import
+
+# A dump of two rounds of 2023 in the Ergast csv format, missing values are \N
+DUMP = {
+    "circuits.csv": "circuitId,circuitRef,name,location,country,lat,lng,alt,url\n"
+                    "3,bahrain,Bahrain International Circuit,Sakhir,Bahrain,26.0325,50.5106,7,http://bahrain\n"
+                    "77,jeddah,Jeddah Corniche Circuit,Jeddah,Saudi Arabia,21.6319,39.1044,15,http://jeddah\n",
+    "constructors.csv": "constructorId,constructorRef,name,nationality,url\n9,red_bull,Red Bull,Austrian,http://red_bull\n",
+    "drivers.csv": "driverId,driverRef,number,code,forename,surname,dob,nationality,url\n"
+                   "830,max_verstappen,33,VER,Max,Verstappen,1997-09-30,Dutch,http://ver\n"
+                   "815,perez,11,PER,Sergio,Pérez,1990-01-26,Mexican,http://per\n",
+    "status.csv": "statusId,status\n1,Finished\n5,Engine\n",
+    "races.csv": "raceId,year,round,circuitId,name,date,time,url\n"
+                 "1098,2023,1,3,Bahrain Grand Prix,2023-03-05,15:00:00,http://r1\n"
+                 "1099,2023,2,77,Saudi Arabian Grand Prix,2023-03-19,\\N,http://r2\n",
+    "results.csv": "resultId,raceId,driverId,constructorId,number,grid,position,positionText,positionOrder,points,laps,"
+                   "time,milliseconds,fastestLap,rank,fastestLapTime,fastestLapSpeed,statusId\n"
+                   "2,1098,815,9,11,2,\\N,R,2,0,10,\\N,\\N,\\N,\\N,\\N,\\N,5\n"
+                   "1,1098,830,9,1,1,1,1,1,25,57,1:33:56.736,5636736,44,6,1:36.236,202.452,1\n"
+                   "3,1099,815,9,11,1,1,1,1,25,50,1:21:14.894,4874894,47,2,1:31.906,241.842,1\n",
+    "lap_times.csv": "raceId,driverId,lap,position,time,milliseconds\n"
+                     "1098,830,1,1,1:39.019,99019\n1098,815,1,2,1:40.101,100101\n"
+                     "1099,815,1,1,1:35.000,95000\n1098,830,2,1,1:38.000,98000\n",
+    "driver_standings.csv": "driverStandingsId,raceId,driverId,points,position,positionText,wins\n"
+                            "1,1098,830,25,1,1,1\n2,1098,815,0,2,2,0\n3,1099,830,25,2,2,1\n4,1099,815,25,1,1,1\n",
+}
+
+@pytest.fixture
+def dump_dir(tmp_path, cache_dir, monkeypatch):
+    monkeypatch.setattr(ergast_import.JolpicaAPI, "CACHE_DIR", cache_dir)
+    monkeypatch.setattr(ergast_import.dp, "CLEANED_DIR", cache_dir.parent / "cleaned")
+    (cache_dir.parent / "cleaned").mkdir()
+    dump_dir = tmp_path / "dump"
+    dump_dir.mkdir()
+    for file_name, content in DUMP.items():
+        (dump_dir / file_name).write_text(content, encoding="utf-8")
+    return dump_dir
+
+def load(resource_type, filters):
+    api = ergast_import.JolpicaAPI(ergast_import.get_endpoint_name(resource_type), filters=filters)
+    return ergast_import.cache_manager.load_cache(api.get_cache_file_path_all())["MRData"]
+
+def test_import_results(dump_dir):
+    written = ergast_import.DumpImporter(dump_dir, chunk_size=2).run()
+    assert written["results"] == 1 and written["laps"] == 2 and written["driverstandings"] == 3
+
+    data = load("results", {"season": "2023"})
+    assert data["total"] == "3"
+    races = data["RaceTable"]["Races"]
+    assert [race["round"] for race in races] == ["1", "2"]
+    assert "time" not in races[1]
+    assert [result["Driver"]["driverId"] for result in races[0]["Results"]] == ["max_verstappen", "perez"]
+    assert races[0]["Results"][0]["FastestLap"] == {"rank": "6", "lap": "44", "Time": {"time": "1:36.236"},
+                                                   "AverageSpeed": {"units": "kph", "speed": "202.452"}}
+    assert races[0]["Results"][1]["status"] == "Engine" and "Time" not in races[0]["Results"][1]
+
+    # The cached response is cleaned like a response of the API
+    df = ergast_import.JolpicaAPI("Results", filters={"season": "2023"}).get_cleaned_data(use_local=False)
+    assert df["Results.Driver.familyName"].tolist() == ["Verstappen", "Pérez", "Pérez"]
+
+def test_import_laps_not_contiguous(dump_dir):
+    ergast_import.DumpImporter(dump_dir, chunk_size=1).run()
+    data = load("laps", {"season": "2023", "round": "1"})
+    laps = data["RaceTable"]["Races"][0]["Laps"]
+    assert data["total"] == "3"
+    assert [lap["number"] for lap in laps] == ["1", "2"]
+    assert [timing["driverId"] for timing in laps[0]["Timings"]] == ["max_verstappen", "perez"]
+
+def test_import_final_standings(dump_dir):
+    ergast_import.DumpImporter(dump_dir).run()
+    standings = load("driverstandings", {"season": "2023"})["StandingsTable"]["StandingsLists"][0]
+    assert standings["round"] == "2"
+    assert [entry["Driver"]["driverId"] for entry in standings["DriverStandings"]] == ["perez", "max_verstappen"]
+    assert standings["DriverStandings"][0]["Constructors"][0]["constructorId"] == "red_bull"
+
+def test_import_keeps_cached(dump_dir):
+    ergast_import.DumpImporter(dump_dir, seasons=[2023]).run()
+    assert ergast_import.DumpImporter(dump_dir, seasons=[2023]).run() == {}
+    assert ergast_import.DumpImporter(dump_dir, seasons=[2023], overwrite=True).run()["results"] == 1
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+import pytest
+import requests
+from api import http_session, standin_server, transport
+
+PAGE = {"MRData": {"total": "1", "RaceTable": {"season": "2023", "Races": [{"season": "2023", "round": "1"}]}}}
+PARAMS = {"limit": 100, "offset": 0}
+
+@pytest.fixture
+def server(tmp_path):
+    store = transport.RecordingStore(tmp_path / "recordings")
+    store.save("2023/Results", PARAMS, PAGE)
+    server = standin_server.StandInServer(store)
+    server.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+# Record the backoff delays of the client instead of sleeping
+@pytest.fixture
+def delays(monkeypatch):
+    delays = []
+    monkeypatch.setattr(http_session, "time", SimpleNamespace(sleep=delays.append))
+    return delays
+
+def test_session_reused():
+    assert http_session.get_session() is http_session.get_session()
+
+@pytest.mark.parametrize("attempt, retry_after, low, high", [
+    (0, "2", 2.0, 2.0),
+    (0, "3600", http_session.BACKOFF_MAX, http_session.BACKOFF_MAX),
+    (3, "soon", 0.0, http_session.BACKOFF_FACTOR * 8),
+    (10, None, 0.0, http_session.BACKOFF_MAX),
+])
+def test_get_backoff(attempt, retry_after, low, high):
+    assert low <= http_session.get_backoff(attempt, retry_after) <= high
+
+def test_retry_after(server, monkeypatch):
+    # The second request is throttled, the retry waits for the Retry-After of the server (which refills its bucket)
+    delays = []
+    monkeypatch.setattr(http_session, "time", SimpleNamespace(
+        sleep=lambda delay: delays.append(delay) or setattr(server, "_allowance", 1.0)))
+    server.rate_limit, server._allowance = 2.0, 1.0
+    url = f"{server.base_url}2023/Results"
+    assert http_session.get_json(url, PARAMS) == PAGE
+    assert http_session.get_json(url, PARAMS) == PAGE
+    assert delays == [0.5]
+    assert [request["limited"] for request in server.requests] == [False, True, False]
+
+def test_retry_exhausted(server, delays, monkeypatch):
+    monkeypatch.setattr(http_session, "MAX_RETRIES", 2)
+    server.error_rate = 1.0
+    with pytest.raises(requests.exceptions.HTTPError):
+        http_session.get_json(f"{server.base_url}2023/Results", PARAMS)
+    assert len(server.requests) == 3 and len(delays) == 2
+
+def test_not_retried(server, delays):
+    # Client errors are not transient
+    with pytest.raises(requests.exceptions.HTTPError):
+        http_session.get_json(f"{server.base_url}2023/Laps", PARAMS)
+    assert len(server.requests) == 1 and delays == []
+
+def test_connection_error_retried(server, delays, monkeypatch):
+    monkeypatch.setattr(http_session, "MAX_RETRIES", 1)
+    url = f"{server.base_url}2023/Results"
+    server.shutdown()
+    server.server_close()
+    with pytest.raises(requests.exceptions.ConnectionError):
+        http_session.get_json(url, PARAMS, timeout=(0.5, 0.5))
+    assert len(delays) == 1
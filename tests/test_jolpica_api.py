@@ -0,0 +1,209 @@
+import threading
+import time
+import pytest
+import pandas as pd
+import requests
+from api import cache_manager, jolpica_api
+from benchmarks.synthetic_data import SyntheticData
+
+class PagedTransport:
+    """
+    Serves the datapoints of endpoints page by page like the API, the datapoints can be changed between requests.
+
+    :param endpoints: Table name, list name and datapoints of each endpoint (e.g. "2023/drivers")
+    :param latency: Returns the seconds a page at the offset is delayed
+    :param failures: Offsets whose pages fail with a connection error
+    """
+
+    def __init__(self, endpoints=None, latency=None, failures=()):
+        self.endpoints = endpoints or {}
+        self.latency = latency
+        self.failures = set(failures)
+        self.calls = []
+        self.in_flight = self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def get_json(self, endpoint, params=None):
+        limit, offset = int(params["limit"]), int(params["offset"])
+        with self._lock:
+            self.calls.append((endpoint, params))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency is not None:
+                time.sleep(self.latency(offset))
+            if offset in self.failures:
+                raise requests.exceptions.ConnectionError(f"page at offset {offset} failed")
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        table, key, datapoints = self.endpoints[endpoint.lower()]
+        return {"MRData": {"limit": str(limit), "offset": str(offset), "total": str(len(datapoints)),
+                           table: {key: datapoints[offset:offset + limit]}}}
+
+def make_races(rounds):
+    return "RaceTable", "Races", [{"season": "2023", "round": str(number)} for number in rounds]
+
+def make_drivers(ids):
+    return "DriverTable", "Drivers", [{"driverId": str(driver_id)} for driver_id in ids]
+
+@pytest.fixture
+def paged_transport(cache_dir, monkeypatch):
+    monkeypatch.setattr(jolpica_api.JolpicaAPI, "CACHE_DIR", cache_dir)
+    paged_transport = PagedTransport()
+    monkeypatch.setattr(jolpica_api.transport, "_transport", paged_transport)
+    return paged_transport
+
+def get_values(data, table, key, field):
+    return [datapoint[field] for datapoint in data["MRData"][table][key]]
+
+@pytest.mark.parametrize("resource_type, filters, append_only", [
+    ("Results", {"season": "2023"}, True),
+    ("PitStops", {"season": "2023", "round": "1"}, True),
+    ("Races", {}, True),
+    ("Drivers", {"season": "2023"}, False),
+    ("Circuits", {}, False),
+    ("Status", {}, False),
+    ("DriverStandings", {"season": "2023", "round": "1"}, False),
+])
+def test_is_append_only(paged_transport, resource_type, filters, append_only):
+    assert jolpica_api.JolpicaAPI(resource_type, filters=filters).is_append_only() == append_only
+
+def test_sync_append_only(paged_transport):
+    paged_transport.endpoints["2023/races"] = make_races(range(1, 151))
+    api = jolpica_api.JolpicaAPI("Races", filters={"season": "2023"})
+    assert get_values(api.get_all_data(), "RaceTable", "Races", "round") == [str(n) for n in range(1, 151)]
+
+    # Only the offsets added since the data was cached are requested
+    paged_transport.endpoints["2023/races"] = make_races(range(1, 153))
+    paged_transport.calls.clear()
+    data, new_inner_data = api.sync_all_data()
+    assert get_values(data, "RaceTable", "Races", "round") == [str(n) for n in range(1, 153)]
+    assert [race["round"] for race in new_inner_data] == ["151", "152"]
+    assert [params["offset"] for _, params in paged_transport.calls] == [0, 150]
+
+def test_sync_refetch(paged_transport):
+    # A datapoint inserted in the middle of an endpoint ordered by id must not be taken for an appended one
+    paged_transport.endpoints["2023/drivers"] = make_drivers(["alonso", "verstappen"])
+    api = jolpica_api.JolpicaAPI("Drivers", filters={"season": "2023"})
+    api.get_all_data()
+    paged_transport.endpoints["2023/drivers"] = make_drivers(["alonso", "perez", "verstappen"])
+    data, new_inner_data = api.sync_all_data()
+    assert get_values(data, "DriverTable", "Drivers", "driverId") == ["alonso", "perez", "verstappen"]
+    assert new_inner_data is None
+
+def test_fetch_all_data_concurrent(paged_transport):
+    # Later pages arrive first, they are still stitched back in offset order
+    paged_transport.endpoints["2023/races"] = make_races(range(1, 451))
+    paged_transport.latency = lambda offset: 0.05 * (5 - offset // 100)
+    api = jolpica_api.JolpicaAPI("Races", filters={"season": "2023"})
+    data = api.fetch_all_data(max_workers=3)
+
+    assert get_values(data, "RaceTable", "Races", "round") == [str(n) for n in range(1, 451)]
+    assert sorted(params["offset"] for _, params in paged_transport.calls) == [0, 100, 200, 300, 400]
+    assert paged_transport.max_in_flight == 3
+
+    # The assembled data is cached and the pages are removed
+    assert cache_manager.is_cached(api.get_cache_file_path_all())
+    assert not any(cache_manager.is_cached(api.get_cache_file_path_params(api.get_page_params(offset)))
+                   for offset in range(0, 500, 100))
+
+def test_fetch_all_data_serial(paged_transport):
+    paged_transport.endpoints["2023/races"] = make_races(range(1, 251))
+    api = jolpica_api.JolpicaAPI("Races", filters={"season": "2023"})
+    data = api.fetch_all_data(max_workers=1)
+    assert len(data["MRData"]["RaceTable"]["Races"]) == 250 and paged_transport.max_in_flight == 1
+
+def test_fetch_all_data_page_error(paged_transport):
+    # A failed page fails the retrieval, truncated data is never returned or cached
+    paged_transport.endpoints["2023/races"] = make_races(range(1, 351))
+    paged_transport.failures = {200}
+    api = jolpica_api.JolpicaAPI("Races", filters={"season": "2023"})
+    data = api.fetch_all_data(max_workers=3)
+    assert data["error"].startswith("Pagination failed at offset 200")
+    assert not cache_manager.is_cached(api.get_cache_file_path_all(), include_expired=True)
+
+def test_fetch_all_data_resumed(paged_transport):
+    # Pages retrieved before a failure stay cached, the next retrieval only requests the missing pages
+    paged_transport.endpoints["2023/races"] = make_races(range(1, 351))
+    paged_transport.failures = {200}
+    api = jolpica_api.JolpicaAPI("Races", filters={"season": "2023"})
+    assert "error" in api.fetch_all_data(max_workers=3)
+    assert cache_manager.is_cached(api.get_cache_file_path_params(api.get_page_params(300)))
+
+    paged_transport.failures.clear()
+    paged_transport.calls.clear()
+    data = api.fetch_all_data(max_workers=3)
+    assert get_values(data, "RaceTable", "Races", "round") == [str(n) for n in range(1, 351)]
+    assert [params["offset"] for _, params in paged_transport.calls] == [200]
+
+    # Once assembled, the data is answered from the cache without requests
+    paged_transport.calls.clear()
+    assert api.get_all_data() == data and paged_transport.calls == []
+
+@pytest.mark.parametrize("codec", ["json", "gzip", "zstd"])
+def test_stream_cleaned_data(paged_transport, monkeypatch, codec):
+    # Cleaned data streamed in chunks matches the cleaned data of the whole file, for plain and compressed files
+    if codec not in jolpica_api.cache_manager.CODECS:
+        pytest.skip(f"{codec} is not available")
+    monkeypatch.setattr(jolpica_api.cache_manager, "CODEC", codec)
+    monkeypatch.setattr(jolpica_api.JolpicaAPI, "STREAM_CHUNK_SIZE", 2)
+    response = SyntheticData(seasons=1, rounds=5, drivers=4, laps=3).generate_results()[0]
+    api = jolpica_api.JolpicaAPI("Results", filters={"season": response["MRData"]["RaceTable"]["season"]})
+    jolpica_api.cache_manager.cache_data(api.get_cache_file_path_all(), response)
+
+    streamed = api.stream_cleaned_data(min_size=0)
+    pd.testing.assert_frame_equal(streamed, api.clean_data(api.get_inner_data(), api.resource_type))
+    assert len(streamed) == 20 and paged_transport.calls == []
+
+def test_stream_cleaned_data_corrupt(paged_transport):
+    # Corrupt files are removed and left to be loaded or retrieved as a whole
+    api = jolpica_api.JolpicaAPI("Races", filters={"season": "2023"})
+    jolpica_api.cache_manager.cache_data(api.get_cache_file_path_all(), {"MRData": {"RaceTable": {"Races": []}}})
+    stored_path = jolpica_api.cache_manager.get_stored_path(api.get_cache_file_path_all())
+    stored_path.write_bytes(stored_path.read_bytes()[:-4])
+    assert api.stream_cleaned_data(min_size=0) is None
+    assert not stored_path.exists()
+
+def test_stream_cleaned_data_error(paged_transport, monkeypatch):
+    # Errors other than unreadable data are not hidden by loading the data as a whole
+    api = jolpica_api.JolpicaAPI("Races", filters={"season": "2023"})
+    jolpica_api.cache_manager.cache_data(api.get_cache_file_path_all(), {"MRData": {"RaceTable": {"Races": [{}]}}})
+    def iter_inner_data(stream, prefix):
+        raise KeyError(prefix)
+        yield
+    monkeypatch.setattr(jolpica_api.json_handler, "iter_inner_data", iter_inner_data)
+    with pytest.raises(KeyError):
+        api.stream_cleaned_data(min_size=0)
+
+@pytest.fixture
+def cleaned_dir(cache_dir, monkeypatch):
+    if jolpica_api.dp.CLEANED_FORMAT != "feather":
+        pytest.skip("pyarrow is not installed")
+    cleaned_dir = cache_dir.parent / "cleaned"
+    cleaned_dir.mkdir()
+    monkeypatch.setattr(jolpica_api.dp, "CLEANED_DIR", cleaned_dir)
+    yield cleaned_dir
+    jolpica_api.dataframe_cache.cleaned_data_cache.clear()
+
+def test_migrate_cleaned_data(cleaned_dir):
+    # Cleaned data stored as csv is converted to feather and the csv is removed
+    api = jolpica_api.JolpicaAPI("Results", filters={"season": "2023"})
+    df = pd.DataFrame({"round": [1, 1], "Results.Driver.driverId": ["max_verstappen", "perez"],
+                       "Results.points": [25, 18]})
+    df.to_csv(cleaned_dir / api.get_legacy_cleaned_file_name(), index=False)
+    api.migrate_cleaned_data()
+
+    assert not (cleaned_dir / api.get_legacy_cleaned_file_name()).exists()
+    jolpica_api.dataframe_cache.cleaned_data_cache.clear()
+    loaded = api.load_cleaned_data(api.get_cleaned_file_name())
+    pd.testing.assert_frame_equal(loaded, jolpica_api.dp.convert_to_numeric(df, api.resource_type))
+
+def test_load_cleaned_data_corrupt(cleaned_dir):
+    # Unreadable cleaned data is removed and reported as corrupt
+    api = jolpica_api.JolpicaAPI("Results", filters={"season": "2023"})
+    (cleaned_dir / api.get_cleaned_file_name()).write_bytes(b"not a feather file")
+    with pytest.raises(jolpica_api.cache_manager.CacheCorruptError):
+        api.load_cleaned_data(api.get_cleaned_file_name())
+    assert not (cleaned_dir / api.get_cleaned_file_name()).exists()
+    assert api.get_local_cleaned_data() is None
@@ -0,0 +1,66 @@
+import copy
+import pytest
+from api import json_handler
+
+# One race of laps with timings, split into pages of page_size timings like the API paginates them
+def get_lap_pages(page_size):
+    laps = [{"number": str(lap), "Timings": [{"driverId": f"driver_{driver}", "position": str(driver + 1)}
+                                             for driver in range(20)]} for lap in range(1, 11)]
+    rows = [(lap["number"], timing) for lap in laps for timing in lap["Timings"]]
+    pages = []
+    for offset in range(0, len(rows), page_size):
+        page = []
+        for number, timing in rows[offset:offset + page_size]:
+            if page and page[-1]["number"] == number:
+                page[-1]["Timings"].append(timing)
+            else:
+                page.append({"number": number, "Timings": [timing]})
+        pages.append(page)
+    return laps, pages
+
+@pytest.mark.parametrize("page_size", [1, 7, 20, 30, 100])
+def test_merge_split_laps(page_size):
+    laps, pages = get_lap_pages(page_size)
+
+    merger = json_handler.InnerDataMerger(copy.deepcopy(pages[0]), "Laps")
+    for page in pages[1:]:
+        merger.extend(copy.deepcopy(page))
+
+    assert merger.data == laps
+
+def test_merge_overlapping_races():
+    results = [{"number": str(number), "Driver": {"driverId": f"driver_{number}"}} for number in range(20)]
+    races = [{"season": "2023", "round": str(round), "Results": copy.deepcopy(results)} for round in range(1, 4)]
+
+    # The second page repeats part of the last race of the first page and a race before it
+    data = copy.deepcopy(races[:2])
+    data[1]["Results"] = data[1]["Results"][:5]
+    additional_data = copy.deepcopy(races)
+    additional_data[1]["Results"] = additional_data[1]["Results"][3:]
+
+    assert json_handler.extend_inner_data(data, additional_data) == races
+
+def test_extend_inner_data_without_identifiers():
+    data = json_handler.extend_inner_data([{"value": "1"}, {"value": "2"}], [{"value": "2"}, {"value": "3"}])
+    assert data == [{"value": "1"}, {"value": "2"}, {"value": "3"}]
+
+    with pytest.raises(TypeError):
+        json_handler.extend_inner_data({}, [])
+
+@pytest.mark.parametrize("resource_type, table, expected_path", [
+    ("results", {"RaceTable": {"season": "2023", "Races": [{"round": "1", "Results": []}]}}, ["RaceTable", "Races"]),
+    ("laps", {"RaceTable": {"Races": [{"round": "1", "Laps": [{"number": "1"}]}]}}, ["RaceTable", "Races", "Laps"]),
+    ("laps", {"RaceTable": {"Races": []}}, ["RaceTable", "Races", "Laps"]),
+    ("driver standings", {"StandingsTable": {"StandingsLists": [{"DriverStandings": []}]}},
+     ["StandingsTable", "StandingsLists", "DriverStandings"]),
+    ("unknown", {"UnknownTable": {"Unknown": [{"value": "1"}]}}, ["UnknownTable", "Unknown"]),
+])
+def test_inner_key_path(resource_type, table, expected_path):
+    data = {"MRData": {"total": "1", **table}}
+    assert json_handler.get_inner_key_path(data, resource_type) == expected_path
+    assert isinstance(json_handler.get_inner_data(data, expected_path), list)
+
+@pytest.mark.parametrize("data", [{"error": "503 Server Error"}, {"MRData": {"total": "0"}}])
+def test_inner_key_path_error(data):
+    with pytest.raises(json_handler.InnerKeyPathError):
+        json_handler.get_inner_key_path(data, "results")
@@ -0,0 +1,52 @@
+import os
+import pytest
+from api import metrics
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = metrics.Registry()
+    registry.counter("test_requests_total", "Requests", ("result",))
+    registry.histogram("test_seconds", "Durations", ("outcome",), buckets=(0.1, 1.0))
+    return registry
+
+def test_render(registry):
+    registry.metrics["test_requests_total"].inc(result="hit")
+    registry.metrics["test_requests_total"].inc(2, result='mi"ss')
+    registry.metrics["test_seconds"].observe(0.5, outcome="success")
+    registry.metrics["test_seconds"].observe(2.0, outcome="success")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE test_requests_total counter" in lines
+    assert 'test_requests_total{result="hit"} 1' in lines
+    assert 'test_requests_total{result="mi\\"ss"} 2' in lines
+    assert 'test_seconds_bucket{outcome="success",le="0.1"} 0' in lines
+    assert 'test_seconds_bucket{outcome="success",le="1.0"} 1' in lines
+    assert 'test_seconds_bucket{outcome="success",le="+Inf"} 2' in lines
+    assert 'test_seconds_sum{outcome="success"} 2.5' in lines
+    assert 'test_seconds_count{outcome="success"} 2' in lines
+
+def test_time_labels(registry):
+    histogram = registry.metrics["test_seconds"]
+    with histogram.time() as labels:
+        labels["outcome"] = "success"
+    with pytest.raises(KeyError):
+        with histogram.time():
+            raise KeyError("failed")
+    assert set(histogram.collect()) == {("success",), ("error",)}
+
+    with pytest.raises(ValueError):
+        registry.metrics["test_requests_total"].inc(outcome="hit")
+
+def test_merge_processes(registry, tmp_path):
+    registry.metrics["test_requests_total"].inc(result="hit")
+    registry.metrics["test_seconds"].observe(0.5, outcome="success")
+    registry.directory = tmp_path
+    registry.flush()
+
+    # Another live process (the parent of this one) wrote the same samples, a process that exited is dropped
+    os.rename(tmp_path / f"{os.getpid()}.json", tmp_path / f"{os.getppid()}.json")
+    (tmp_path / "999999999.json").write_text((tmp_path / f"{os.getppid()}.json").read_text())
+    lines = registry.render().splitlines()
+    assert 'test_requests_total{result="hit"} 2' in lines
+    assert 'test_seconds_count{outcome="success"} 2' in lines
+    assert not (tmp_path / "999999999.json").exists()
@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+from api import cache_manager, query_planner
+
+RESULTS = pd.DataFrame({
+    "season": [2023] * 4,
+    "round": [1, 1, 2, 2],
+    "Results.Driver.driverId": ["verstappen", "perez", "verstappen", "perez"],
+    "Results.Driver.code": ["VER", "PER", "VER", "PER"],
+    "Results.Constructor.constructorId": ["red_bull"] * 4,
+    "Results.position": [1, 2, 2, 1],
+})
+
+@pytest.mark.parametrize("source_resource_type, source_filters, filters, expected", [
+    ("results", {"season": "2023"}, {"season": "2023", "drivers": "verstappen"},
+     {"Results.Driver.driverId": "verstappen"}),
+    ("results", {"season": "2023"}, {"season": "2023", "round": "2", "results": "1"},
+     {"round": "2", "Results.position": "1"}),
+    ("results", {"season": "2023"}, {"season": "2022", "drivers": "verstappen"}, None),
+    ("results", {"season": "2023"}, {"season": "2023", "status": "1"}, None),
+    ("results", {"season": "2023"}, {"season": "2023", "round": "last"}, None),
+    ("laps", {"season": "2023"}, {"season": "2023", "drivers": "verstappen"}, None),
+    ("laps", {"season": "2023", "round": "1"}, {"season": "2023", "round": "1", "laps": "5"}, {"number": "5"}),
+])
+def test_local_filters(source_resource_type, source_filters, filters, expected):
+    assert query_planner.get_local_filters(source_resource_type, source_filters, filters) == expected
+
+def test_execute_subset():
+    plan = query_planner.QueryPlan("results", "results", {"season": "2023"}, {"Results.Driver.driverId": "perez",
+                                                                               "round": "2"})
+    df = plan.execute(RESULTS)
+    assert df["Results.position"].tolist() == [1]
+    assert list(df.columns) == list(RESULTS.columns)
+
+def test_execute_derived():
+    plan = query_planner.QueryPlan("drivers", "results", {"season": "2023"}, {})
+    df = plan.execute(RESULTS)
+    assert df.to_dict("records") == [{"driverId": "verstappen", "code": "VER"}, {"driverId": "perez", "code": "PER"}]
+
+def test_execute_subset_dtypes():
+    # A retirement leaves the positions of the season as floats and a column without values for the finishers
+    df = RESULTS.assign(**{"Results.position": [1, None, 2, 1], "Results.Time.time": ["1:33:56.736", None] * 2})
+    plan = query_planner.QueryPlan("results", "results", {"season": "2023"}, {"Results.Driver.driverId": "verstappen"})
+    assert df["Results.position"].dtype.kind == "f"
+    assert plan.execute(df)["Results.position"].dtype.kind == "i"
+
+    plan = query_planner.QueryPlan("results", "results", {"season": "2023"}, {"Results.Driver.driverId": "perez"})
+    assert "Results.Time.time" not in plan.execute(df).columns
+
+def test_get_cached_requests(cache_dir, monkeypatch):
+    monkeypatch.setattr(query_planner, "CACHE_DIR", cache_dir)
+    monkeypatch.setattr(query_planner.dp, "CLEANED_DIR", cache_dir.parent / "cleaned")
+    cache_manager.cache_data(cache_dir / "2023_results_all.json", {"MRData": {"total": "1"}})
+    cache_manager.cache_data(cache_dir / "2022_results_all.json", {"MRData": {"total": "1"}})
+    monkeypatch.setattr(query_planner.cache_manager, "VOLATILE_TTL", -1)
+    cache_manager.cache_data(cache_dir / "2021_results_all.json", {"MRData": {"total": "1"}}, cache_manager.TTL_IMMUTABLE)
+    (cache_dir / "2020_results_1_0.json").write_text("{}")
+
+    # Expired responses and pages are not considered, file names are only parsed again when the directory changes
+    parsed = []
+    parse_key = query_planner.cache_keys.parse_key
+    monkeypatch.setattr(query_planner.cache_keys, "parse_key", lambda key: parsed.append(key) or parse_key(key))
+    assert query_planner.get_cached_requests() == {"2021_results": ("results", {"season": "2021"})}
+    assert query_planner.get_cached_requests() == {"2021_results": ("results", {"season": "2021"})}
+    assert sorted(parsed) == ["2021_results", "2022_results", "2023_results"]
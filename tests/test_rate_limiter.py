@@ -0,0 +1,50 @@
+import pytest
+from api import rate_limiter
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    return clock
+
+def make_limiter(tmp_path, buckets=(("burst", 2.0, 2),)):
+    return rate_limiter.RateLimiter(tmp_path / "rate_limit.json", list(buckets))
+
+def test_reserve_queues(tmp_path, clock):
+    # A full bucket allows a burst, further reservations are queued one interval apart
+    limiter = make_limiter(tmp_path)
+    assert [limiter.reserve() for _ in range(5)] == [0.0, 0.0, 0.5, 1.0, 1.5]
+
+    # Tokens accumulate while time passes, up to the capacity
+    clock.now += 10
+    assert limiter.get_wait_time() == 0.0
+    assert [limiter.reserve() for _ in range(3)] == [0.0, 0.0, 0.5]
+
+def test_shared_state(tmp_path, clock):
+    # Limiters of different workers share the budget through the state file
+    workers = [make_limiter(tmp_path) for _ in range(2)]
+    assert [worker.reserve() for worker in workers * 2] == [0.0, 0.0, 0.5, 1.0]
+
+def test_slowest_bucket(tmp_path, clock):
+    limiter = make_limiter(tmp_path, [("burst", 4.0, 4), ("sustained", 0.5, 2)])
+    assert [limiter.reserve() for _ in range(4)] == [0.0, 0.0, 2.0, 4.0]
+
+def test_unreadable_state(tmp_path, clock):
+    (tmp_path / "rate_limit.json").write_text("{")
+    assert make_limiter(tmp_path).reserve() == 0.0
+
+def test_acquire(tmp_path, clock):
+    limiter = make_limiter(tmp_path)
+    assert [limiter.acquire() for _ in range(3)] == [0.0, 0.0, 0.5]
+    assert clock.sleeps == [0.5]
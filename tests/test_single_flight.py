@@ -0,0 +1,90 @@
+import threading
+import time
+import pytest
+from api.single_flight import SingleFlight
+
+THREADS = 8
+
+# Wait until the given number of callers are waiting for the call in flight
+def wait_for_followers(group, followers):
+    deadline = time.monotonic() + 5
+    while group.get_stats()["followers"] < followers:
+        assert time.monotonic() < deadline, "followers did not join the call in flight"
+        time.sleep(0.01)
+
+# Run the target in threads and return the results (or exceptions) in thread order
+def run_threads(target, count=THREADS):
+    results = [None] * count
+
+    def run(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert not any(thread.is_alive() for thread in threads)
+    return results
+
+@pytest.fixture
+def group(tmp_path):
+    return SingleFlight(tmp_path / "locks")
+
+def test_single_execution(group):
+    calls = []
+
+    def function():
+        calls.append(1)
+        wait_for_followers(group, THREADS - 1)
+        return {"MRData": {"total": "1"}}
+
+    results = run_threads(lambda: group.do("2023_results", function))
+    assert len(calls) == 1
+    assert all(data == {"MRData": {"total": "1"}} for data, _ in results)
+    assert sorted(shared for _, shared in results) == [False] + [True] * (THREADS - 1)
+
+    # Followers receive copies, so modifying a result does not affect the others
+    assert len({id(data) for data, _ in results}) == THREADS
+    assert group.get_stats() == {"leaders": 1, "followers": THREADS - 1, "in_flight": 0}
+
+def test_exception_propagated(group):
+    def function():
+        wait_for_followers(group, THREADS - 1)
+        raise ValueError("retrieval failed")
+
+    results = run_threads(lambda: group.do("2023_results", function))
+    assert all(isinstance(result, ValueError) and str(result) == "retrieval failed" for result in results)
+
+    # The failed call is no longer in flight, the next call runs again
+    assert group.do("2023_results", lambda: 1) == (1, False)
+
+def test_reentrant(group):
+    # A leader calling itself for its own key runs the function directly instead of waiting for itself
+    results = run_threads(lambda: group.do("2023_results", lambda: group.do("2023_results", lambda: 1)), count=1)
+    assert results == [((1, False), False)]
+
+def test_lock_across_groups(tmp_path):
+    # Groups sharing a lock directory stand in for worker processes, their leaders for the same key run one at a time
+    groups = [SingleFlight(tmp_path / "locks") for _ in range(2)]
+    started, release, events = threading.Event(), threading.Event(), []
+
+    def first():
+        started.set()
+        release.wait(timeout=5)
+        events.append("first")
+
+    threads = [threading.Thread(target=groups[0].do, args=("key", first)),
+               threading.Thread(target=groups[1].do, args=("key", lambda: events.append("second")))]
+    threads[0].start()
+    started.wait(timeout=5)
+    threads[1].start()
+    time.sleep(0.1)
+    assert events == []
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert events == ["first", "second"]
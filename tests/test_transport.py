@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+import pytest
+import requests
+from api import jolpica_api, standin_server, transport
+
+PAGE = {"MRData": {"total": "1", "RaceTable": {"season": "2023", "Races": [{"season": "2023", "round": "1"}]}}}
+PARAMS = {"limit": 100, "offset": 0}
+
+class FakeTransport:
+    def __init__(self):
+        self.calls = []
+
+    def get_json(self, endpoint, params=None):
+        self.calls.append((endpoint, params))
+        return PAGE
+
+@pytest.fixture
+def store(tmp_path):
+    return transport.RecordingStore(tmp_path / "recordings")
+
+@pytest.fixture
+def server(store):
+    store.save("2023/Results", PARAMS, PAGE)
+    server = standin_server.StandInServer(store)
+    server.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_record_replay(store):
+    recording = transport.RecordingTransport(FakeTransport(), store)
+    assert recording.get_json("2023/Results", PARAMS) == PAGE
+
+    # Parameters are matched by value, endpoints regardless of casing and suffix
+    replay = transport.ReplayTransport(store)
+    assert replay.get_json("2023/results.json", {"offset": "0", "limit": "100"}) == PAGE
+    with pytest.raises(transport.RecordingNotFoundError):
+        replay.get_json("2023/Results", {"limit": 100, "offset": 100})
+
+def test_replay_api(store, monkeypatch):
+    store.save("2023/Results", PARAMS, PAGE)
+    monkeypatch.setattr(jolpica_api.transport, "_transport", jolpica_api.transport.ReplayTransport(store))
+    api = jolpica_api.JolpicaAPI("Results", params=PARAMS, filters={"season": "2023"})
+    assert api.get_data(use_cache=False) == PAGE
+    assert "error" in api.get_data(use_cache=False, params={"limit": 100, "offset": 100})
+
+def test_server(server):
+    http = transport.HttpTransport(server.base_url, rate_limited=False)
+    assert http.get_json("2023/Results", PARAMS) == PAGE
+    assert requests.get(f"{server.base_url}2023/Results", params={"limit": 30, "offset": 0}).status_code == 404
+    assert server.requests[0] == {"endpoint": "2023/Results", "params": {"limit": "100", "offset": "0"},
+                                  "failed": False, "limited": False}
+
+def test_server_failures(server):
+    server.error_rate = 1.0
+    assert requests.get(f"{server.base_url}2023/Results", params=PARAMS).status_code == 503
+
+    server.error_rate, server.rate_limit, server._allowance = 0.0, 1.0, 1.0
+    statuses = [requests.get(f"{server.base_url}2023/Results", params=PARAMS) for _ in range(2)]
+    assert [response.status_code for response in statuses] == [200, 429]
+    assert float(statuses[1].headers["Retry-After"]) == 1.0
+
+def test_server_rate_limit_below_one(store, monkeypatch):
+    # Limits below one request per second still serve a request every 1 / rate_limit seconds
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(standin_server, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    server = standin_server.StandInServer(store, rate_limit=0.5)
+    try:
+        assert [server.is_rate_limited() for _ in range(2)] == [False, True]
+        clock.now += 1.0
+        assert server.is_rate_limited()
+        clock.now += 1.0
+        assert [server.is_rate_limited() for _ in range(2)] == [False, True]
+        clock.now += 10.0
+        assert [server.is_rate_limited() for _ in range(2)] == [False, True]
+    finally:
+        server.server_close()
+
+class FailingTransport(transport.HttpTransport):
+    def get_json(self, endpoint, params=None):
+        raise requests.exceptions.ConnectionError("connection refused")
+
+def test_get_url(store, monkeypatch, caplog):
+    http = transport.HttpTransport("http://127.0.0.1:8000/ergast/f1")
+    assert http.get_url("2023/results") == "http://127.0.0.1:8000/ergast/f1/2023/results"
+    assert transport.get_url("2023/results", transport.RecordingTransport(http, store)) == http.get_url("2023/results")
+    assert transport.get_url("2023/results", transport.ReplayTransport(store)) == "2023/results"
+
+    # Requests are logged with the url of the transport of the process
+    monkeypatch.setattr(jolpica_api.transport, "_transport", FailingTransport("http://127.0.0.1:8000/ergast/f1/"))
+    api = jolpica_api.JolpicaAPI("Results", params=PARAMS, filters={"season": "2023"})
+    assert "error" in api.get_data(use_cache=False)
+    assert "from http://127.0.0.1:8000/ergast/f1/2023/Results " in caplog.text
@@ -0,0 +1,88 @@
+import pandas as pd
+import pytest
+import requests
+import f1dataanalysistool.api.jolpica_api as jolpica_api
+from api import warehouse
+
+RESULTS = pd.DataFrame({
+    "season": [2023] * 4,
+    "round": [1, 1, 2, 2],
+    "raceName": ["Bahrain Grand Prix"] * 2 + ["Saudi Arabian Grand Prix"] * 2,
+    "Results.position": [1, 2, 2, 1],
+    "Circuit.circuitId": ["bahrain"] * 2 + ["jeddah"] * 2,
+    "Circuit.circuitName": ["Bahrain International Circuit"] * 2 + ["Jeddah Corniche Circuit"] * 2,
+    "Results.Driver.driverId": ["max_verstappen", "perez", "max_verstappen", "perez"],
+    "Results.Driver.code": ["VER", "PER", "VER", "PER"],
+    "Results.Constructor.constructorId": ["red_bull"] * 4,
+})
+
+@pytest.fixture
+def warehouse_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(warehouse, "WAREHOUSE_FILE", tmp_path / "warehouse.sqlite")
+    warehouse.store("results", {"season": "2023"}, RESULTS)
+    return tmp_path / "warehouse.sqlite"
+
+def test_query_results(warehouse_file):
+    df = warehouse.query("results", {"season": "2023"})
+    assert list(df.columns) == list(RESULTS.columns)
+    assert df.astype(str).equals(RESULTS.astype(str))
+
+    df = warehouse.query("results", {"season": "2023", "drivers": "perez", "circuits": "jeddah"})
+    assert df["Results.position"].tolist() == [1]
+
+def test_query_derived(warehouse_file):
+    df = warehouse.query("drivers", {"season": "2023", "round": "2"})
+    assert df.to_dict("records") == [{"driverId": "max_verstappen", "code": "VER"}, {"driverId": "perez", "code": "PER"}]
+
+def test_query_standings(warehouse_file):
+    standings = pd.DataFrame({"season": [2023] * 2, "round": [22] * 2, "position": [1, 2], "points": [575, 285],
+                              "Driver.driverId": ["max_verstappen", "perez"], "Driver.code": ["VER", "PER"]})
+    warehouse.store("driverstandings", {"season": "2023", "round": "21"}, standings.assign(round=21, points=[549, 273]))
+    warehouse.store("driverstandings", {"season": "2023"}, standings)
+
+    # Standings of the season are the standings after its latest round, earlier rounds keep their own rows
+    df = warehouse.query("driverstandings", {"season": "2023"})
+    assert df.astype(str).equals(standings.astype(str))
+    assert warehouse.query("driverstandings", {"season": "2023", "round": "21"})["points"].tolist() == [549, 273]
+    assert warehouse.query("driverstandings", {"season": "2023", "drivers": "perez"})["position"].tolist() == [2]
+    assert warehouse.query("driverstandings", {"season": "2023", "drivers": "alonso"}) is None
+
+@pytest.mark.parametrize("resource_type, filters", [
+    ("results", {"season": "2022"}),
+    ("results", {"season": "2023", "status": "1"}),
+    ("results", {}),
+    ("laps", {"season": "2023", "round": "1"}),
+])
+def test_query_not_synced(warehouse_file, resource_type, filters):
+    assert warehouse.query(resource_type, filters) is None
+
+def test_parse_seasons():
+    assert warehouse.parse_seasons(["2018-2020", "2023"]) == [2018, 2019, 2020, 2023]
+
+# Serves the races of a season, every other endpoint fails
+class RacesOnlyTransport:
+    def __init__(self):
+        self.calls = []
+
+    def get_json(self, endpoint, params=None):
+        self.calls.append(endpoint)
+        if endpoint.lower() != "2023/races":
+            raise requests.exceptions.ConnectionError(f"{endpoint} failed")
+        races = [{"season": "2023", "round": "1", "raceName": "Bahrain Grand Prix",
+                  "Circuit": {"circuitId": "bahrain", "circuitName": "Bahrain International Circuit"}}]
+        return {"MRData": {"limit": params["limit"], "offset": params["offset"], "total": "1",
+                           "RaceTable": {"season": "2023", "Races": races}}}
+
+def test_sync_season_failed(cache_dir, tmp_path, monkeypatch):
+    # A failed request is retrieved once, nothing is stored for it and it is not marked as synced
+    monkeypatch.setattr(warehouse, "WAREHOUSE_FILE", tmp_path / "warehouse.sqlite")
+    monkeypatch.setattr(jolpica_api.JolpicaAPI, "CACHE_DIR", cache_dir)
+    monkeypatch.setattr(jolpica_api.dp, "CLEANED_DIR", tmp_path / "cleaned")
+    (tmp_path / "cleaned").mkdir()
+    races_only = RacesOnlyTransport()
+    monkeypatch.setattr(jolpica_api.transport, "_transport", races_only)
+
+    assert warehouse.sync_season(2023, ["drivers"]) == {"races": 1, "drivers": 0}
+    assert races_only.calls.count("2023/Drivers") == 1
+    assert [path.name for path in (tmp_path / "cleaned").iterdir()] == ["2023_races_cleaned.feather"]
+    assert [status["resource"] for status in warehouse.get_status()] == ["races"]